@@ -0,0 +1,132 @@
+import os
+import pickle
+import zlib
+
+from quote import Quote
+from momentum_strategy import MomentumStrategy
+from trade_situation import TradeSituation
+from limit_order_book import LimitOrderBook
+from quote_conflator import QuoteConflator
+
+# Increment when the layout of the saved state changes: older snapshots are then refused instead of misread.
+SNAPSHOT_FORMAT_VERSION = 10
+
+
+class BacktestSnapshot:
+    # Position in the input file (in bytes) of the first line that was NOT replayed yet
+    __byte_offset: int
+    # Number of lines replayed so far (used for the user interface statistics)
+    __lines_read: float
+    # Last quote replayed (needed to close the pending position at the end of the replay)
+    __last_quote: Quote
+    # Replayed objects
+    __strategy: MomentumStrategy
+    __limit_order_book: LimitOrderBook
+    # Conflation stage of the book (None without conflation): its last emitted state decides the next strategy update
+    __quote_conflator: QuoteConflator
+    # Class level ID generators at the time of the snapshot
+    __last_strategy_id: int
+    __last_trade_situation_id: int
+
+    def __init__(self, byte_offset: int, lines_read: float, last_quote: Quote, strategy: MomentumStrategy,
+                 limit_order_book: LimitOrderBook, quote_conflator: QuoteConflator = None):
+        """
+        Captures the whole state of a replay between two lines of the input file.
+        :param byte_offset: offset of the next line to read in the input file
+        :param lines_read: number of lines already replayed
+        :param last_quote: last replayed quote (None if no line was replayed)
+        :param strategy: the replayed strategy (with its indicators, open position and positions history)
+        :param limit_order_book: the replayed order book
+        :param quote_conflator: the conflation stage of the replayed order book (None if the replay is not conflated)
+        """
+        self.__byte_offset = byte_offset
+        self.__lines_read = lines_read
+        self.__last_quote = last_quote
+        self.__strategy = strategy
+        self.__limit_order_book = limit_order_book
+        self.__quote_conflator = quote_conflator
+        self.__last_strategy_id = MomentumStrategy.get_last_generated_id()
+        self.__last_trade_situation_id = TradeSituation.get_last_generated_id()
+
+    def save(self, file_name: str):
+        """
+        Writes the snapshot to a compressed binary file. The file is replaced atomically so a crash while saving
+        leaves the previous snapshot untouched.
+        :param file_name: the snapshot file
+        :return:
+        """
+        # The book, the strategy and the positions share the same Quote instances: pickling them in one call keeps
+        # those references shared after the restore.
+        payload = zlib.compress(pickle.dumps((SNAPSHOT_FORMAT_VERSION, self), protocol=pickle.HIGHEST_PROTOCOL))
+        temporary_file_name = file_name + ".tmp"
+        with open(temporary_file_name, 'wb') as file_writer:
+            file_writer.write(payload)
+        os.replace(temporary_file_name, file_name)
+
+    @staticmethod
+    def load(file_name: str):
+        """
+        Reads a snapshot written by save() and restores the class level state (ID generators and the common order
+        book of MomentumStrategy and TradeSituation) so that the replay continues exactly where it stopped.
+        :param file_name: the snapshot file
+        :return: BacktestSnapshot instance
+        """
+        with open(file_name, 'rb') as file_reader:
+            format_version, snapshot = pickle.loads(zlib.decompress(file_reader.read()))
+        if format_version != SNAPSHOT_FORMAT_VERSION:
+            raise RuntimeError("The snapshot {0} has the format version {1} (expected {2})"
+                               .format(file_name, format_version, SNAPSHOT_FORMAT_VERSION))
+        snapshot.restore_class_state()
+        return snapshot
+
+    def restore_class_state(self):
+        """
+        Sets the ID generators and the common order book back to the values they had when the snapshot was taken.
+        :return:
+        """
+        MomentumStrategy.set_last_generated_id(self.__last_strategy_id)
+        TradeSituation.set_last_generated_id(self.__last_trade_situation_id)
+        MomentumStrategy.set_limit_order_book(self.__limit_order_book)
+        TradeSituation.set_limit_order_book(self.__limit_order_book)
+
+    def byte_offset(self) -> int:
+        """
+        Returns the offset (in bytes) of the next line to replay
+        :return:
+        """
+        return self.__byte_offset
+
+    def lines_read(self) -> float:
+        """
+        Returns the number of lines replayed before the snapshot
+        :return:
+        """
+        return self.__lines_read
+
+    def last_quote(self) -> Quote:
+        """
+        Returns the last replayed quote
+        :return:
+        """
+        return self.__last_quote
+
+    def strategy(self) -> MomentumStrategy:
+        """
+        Returns the restored strategy
+        :return:
+        """
+        return self.__strategy
+
+    def limit_order_book(self) -> LimitOrderBook:
+        """
+        Returns the restored order book
+        :return:
+        """
+        return self.__limit_order_book
+
+    def quote_conflator(self) -> QuoteConflator:
+        """
+        Returns the restored conflation stage (None if the replay was not conflated)
+        :return:
+        """
+        return self.__quote_conflator
@@ -0,0 +1,207 @@
+# Time bars of the best BID/OFFER of a book: open, high, low and close of the mid price and of the spread over fixed
+# intervals (100 ms, 1 s, 1 min...).
+#
+# BarBuilder is fed with the top of the book after every change and returns each bar once its interval is over: it
+# only keeps the bar in progress (constant memory). build_bars() calculates the same bars at once from stored arrays
+# of best prices with NumPy (one pass of vectorized operations, no Python loop over the events).
+#
+# Updates with an empty side are ignored, and an interval without any update gives no bar.
+from array import array
+from typing import NamedTuple
+
+import numpy as np
+
+from book_recovery_policy import BookRecoveryPolicy
+from curr_pair import CurrPair
+from limit_order_book import LimitOrderBook
+from log_reader import LogReader
+from new_cancel import NewCancel
+from quote import Quote, QUOTE_TIME_UNITS_PER_MILLISECOND
+from top_of_book import TopOfBook
+
+
+class Bar(NamedTuple):
+    # Start of the interval (Quote.time() units, a multiple of the interval)
+    start_time: int
+    open_mid: float
+    high_mid: float
+    low_mid: float
+    close_mid: float
+    open_spread: float
+    high_spread: float
+    low_spread: float
+    close_spread: float
+    # Number of updates of the best prices in the interval
+    update_count: int
+
+
+class BarArrays(NamedTuple):
+    # Bars calculated by build_bars(): one NumPy array per field of Bar
+    start_time: np.ndarray
+    open_mid: np.ndarray
+    high_mid: np.ndarray
+    low_mid: np.ndarray
+    close_mid: np.ndarray
+    open_spread: np.ndarray
+    high_spread: np.ndarray
+    low_spread: np.ndarray
+    close_spread: np.ndarray
+    update_count: np.ndarray
+
+    def __len__(self):
+        return len(self.start_time)
+
+    def bars(self) -> list:
+        """
+        Returns the bars as Bar records
+        :return: list of Bar
+        """
+        return [Bar(*values) for values in zip(*(column.tolist() for column in self))]
+
+
+class BarBuilder:
+    # Length of a bar (Quote.time() units)
+    __interval: int
+    # Bar in progress: start of its interval (None before the first update), mid and spread prices, update count
+    __start_time: int
+    __open_mid: float
+    __high_mid: float
+    __low_mid: float
+    __close_mid: float
+    __open_spread: float
+    __high_spread: float
+    __low_spread: float
+    __close_spread: float
+    __update_count: int
+    # Number of completed bars
+    __bar_count: int
+
+    def __init__(self, interval_ms: float):
+        """
+        Creates a builder of bars of interval_ms milliseconds
+        :param interval_ms: length of a bar (milliseconds, e.g. 100, 1000, 60000)
+        """
+        interval = int(round(interval_ms * QUOTE_TIME_UNITS_PER_MILLISECOND))
+        if interval <= 0:
+            raise Exception("Please init the class with an interval higher than 0")
+        self.__interval = interval
+        self.__start_time = None
+        self.__update_count = 0
+        self.__bar_count = 0
+
+    def on_top_of_book(self, quote_time: int, top_of_book: TopOfBook) -> Bar:
+        """
+        Adds an update of the best prices
+        :param quote_time: time of the event (Quote.time(), not decreasing)
+        :param top_of_book: the best prices after the event
+        :return: the previous bar if this update starts a new interval, None otherwise
+        """
+        if not top_of_book.is_bid_set or not top_of_book.is_offer_set:
+            return None
+        mid = top_of_book.mid_price
+        spread = top_of_book.spread
+        start_time = quote_time - quote_time % self.__interval
+        completed_bar = None
+        if start_time != self.__start_time:
+            completed_bar = self.flush()
+            self.__start_time = start_time
+            self.__open_mid = self.__high_mid = self.__low_mid = mid
+            self.__open_spread = self.__high_spread = self.__low_spread = spread
+        else:
+            if mid > self.__high_mid:
+                self.__high_mid = mid
+            elif mid < self.__low_mid:
+                self.__low_mid = mid
+            if spread > self.__high_spread:
+                self.__high_spread = spread
+            elif spread < self.__low_spread:
+                self.__low_spread = spread
+        self.__close_mid = mid
+        self.__close_spread = spread
+        self.__update_count += 1
+        return completed_bar
+
+    def flush(self) -> Bar:
+        """
+        Completes the bar in progress (e.g. at the end of the data)
+        :return: the bar, None if there was no update since the last bar
+        """
+        if self.__update_count == 0:
+            return None
+        bar = Bar(self.__start_time, self.__open_mid, self.__high_mid, self.__low_mid, self.__close_mid,
+                  self.__open_spread, self.__high_spread, self.__low_spread, self.__close_spread, self.__update_count)
+        self.__update_count = 0
+        self.__bar_count += 1
+        return bar
+
+    def bar_count(self) -> int:
+        return self.__bar_count
+
+    def interval(self) -> int:
+        return self.__interval
+
+
+def load_best_prices(file_name: str, curr_pair: CurrPair) -> tuple:
+    """
+    Replays a log file through a book and stores the best prices after every event of the pair
+    :param file_name: the log file (plain or compressed)
+    :param curr_pair: the replayed currency pair
+    :return: (quote times, best BID prices, best OFFER prices) NumPy arrays, the input of build_bars()
+    """
+    limit_order_book = LimitOrderBook(curr_pair, BookRecoveryPolicy.COUNT_AND_SKIP)
+    quote_times = array('q')
+    bid_prices = array('d')
+    offer_prices = array('d')
+    with LogReader(file_name) as reader_obj:
+        for row in reader_obj:
+            if row.strip() == b'':
+                continue
+            quote = Quote(row.decode())
+            if quote.currency_pair() != curr_pair:
+                continue
+            if quote.type() == NewCancel.NEW:
+                limit_order_book.on_new_order(quote)
+            else:
+                limit_order_book.on_cancel_order(quote)
+            quote_times.append(quote.time())
+            bid_prices.append(limit_order_book.get_best_bid_price())
+            offer_prices.append(limit_order_book.get_best_offer_price())
+    return np.frombuffer(quote_times, dtype=np.int64), np.frombuffer(bid_prices), np.frombuffer(offer_prices)
+
+
+def build_bars(quote_times: np.ndarray, bid_prices: np.ndarray, offer_prices: np.ndarray,
+               interval_ms: float) -> BarArrays:
+    """
+    Calculates the bars of stored best prices (same bars as BarBuilder)
+    :param quote_times: times of the updates (Quote.time() units, not decreasing)
+    :param bid_prices: best BID price after each update (0.00 when the side is empty, as in TopOfBook)
+    :param offer_prices: best OFFER price after each update (0.00 when the side is empty)
+    :param interval_ms: length of a bar (milliseconds)
+    :return: BarArrays
+    """
+    interval = int(round(interval_ms * QUOTE_TIME_UNITS_PER_MILLISECOND))
+    if interval <= 0:
+        raise Exception("Please provide an interval higher than 0")
+    quote_times = np.asarray(quote_times, dtype=np.int64)
+    bid_prices = np.asarray(bid_prices, dtype=np.float64)
+    offer_prices = np.asarray(offer_prices, dtype=np.float64)
+    is_valid = (bid_prices > 0.0) & (offer_prices > 0.0)
+    if not is_valid.all():
+        quote_times, bid_prices, offer_prices = quote_times[is_valid], bid_prices[is_valid], offer_prices[is_valid]
+    # Same operations as TopOfBook, so the values are the same as the streaming bars
+    mids = (bid_prices + offer_prices) / 2.0
+    spreads = offer_prices - bid_prices
+    start_times = quote_times - quote_times % interval
+    if len(start_times) == 0:
+        empty_prices = np.empty(0)
+        return BarArrays(np.empty(0, dtype=np.int64), *([empty_prices] * 8), np.empty(0, dtype=np.int64))
+
+    # First update of every bar
+    bar_starts = np.flatnonzero(np.r_[True, start_times[1:] != start_times[:-1]])
+    bar_ends = np.r_[bar_starts[1:], len(start_times)] - 1
+    return BarArrays(start_times[bar_starts],
+                     mids[bar_starts], np.maximum.reduceat(mids, bar_starts), np.minimum.reduceat(mids, bar_starts),
+                     mids[bar_ends],
+                     spreads[bar_starts], np.maximum.reduceat(spreads, bar_starts),
+                     np.minimum.reduceat(spreads, bar_starts), spreads[bar_ends],
+                     bar_ends - bar_starts + 1)
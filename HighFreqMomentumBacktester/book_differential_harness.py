@@ -0,0 +1,215 @@
+# Differential test of order book engines: the reference LimitOrderBook and an alternative engine are driven with the
+# same random NEW/CANCEL streams and their observable state is compared after every event.
+#
+# An engine is created by a factory called with the currency pair and has to provide on_new_order, on_cancel_order,
+# get_best_bid, get_best_bid_price, get_best_offer, get_best_offer_price, get_best_orders_by_amount, count_bids and
+# count_offers with the semantics of LimitOrderBook.
+#
+# Usage:
+#   python book_differential_harness.py --engine my_fast_book:FastLimitOrderBook --streams 20 --events 20000
+import argparse
+import importlib
+import time
+from random import Random
+from typing import NamedTuple
+
+from book_recovery_policy import BookRecoveryPolicy
+from buy_sell import BuySell
+from curr_pair import CurrPair
+from limit_order_book import LimitOrderBook
+from new_cancel import NewCancel
+from quote import Quote
+
+# Amounts checked with get_best_orders_by_amount after every event
+CHECKED_AMOUNTS = (500000.00, 1000000.00, 3000000.00, 10000000.00)
+# Number of mismatches kept per stream
+MAX_REPORTED_MISMATCHES = 10
+
+
+class DifferentialResult(NamedTuple):
+    # Outcome of one stream
+    seed: int
+    event_count: int
+    # Descriptions of the first mismatches (empty if the engines agreed on every event)
+    mismatches: list
+    # Replay throughput without the checks (events per second)
+    reference_events_per_second: float
+    candidate_events_per_second: float
+
+
+def generate_random_events(seed: int, event_count: int, price_levels: int = 6, cancel_probability: float = 0.45,
+                           invalid_event_probability: float = 0.0) -> list:
+    """
+    Generates a random stream of USD/CHF events. The prices are drawn on a few levels around a slowly moving mid so
+    the levels often hold several orders and the sides are often emptied.
+    :param seed: seed of the stream
+    :param event_count: number of events
+    :param price_levels: number of price levels on each side
+    :param cancel_probability: probability that an event cancels a live order
+    :param invalid_event_probability: probability of a duplicated NEW order or a CANCEL of an unknown order (the
+    engines then need a non strict recovery policy)
+    :return: list of Quote
+    """
+    random_generator = Random(seed)
+    quotes = []
+    live_ids = []
+    next_id = 1
+    mid_ticks = 89150
+    for event_index in range(event_count):
+        local_time = 39136466000000 + event_index * 1000
+        draw = random_generator.random()
+        if draw < invalid_event_probability / 2.0:
+            # CANCEL of an order that does not exist (any more)
+            quotes.append(Quote("C;{0};USD/CHF;{1};1610963536459".format(next_id + 1000000, local_time)))
+            continue
+        if draw < invalid_event_probability and live_ids:
+            # NEW order with the ID of a live order
+            quote_id = random_generator.choice(live_ids)
+        elif live_ids and draw < invalid_event_probability + cancel_probability:
+            cancelled_id = live_ids.pop(random_generator.randrange(len(live_ids)))
+            quotes.append(Quote("C;{0};USD/CHF;{1};1610963536459".format(cancelled_id, local_time)))
+            continue
+        else:
+            quote_id = next_id
+            next_id += 1
+            live_ids.append(quote_id)
+        mid_ticks += random_generator.choice((-1, 0, 0, 1))
+        is_bid = random_generator.random() < 0.5
+        level = random_generator.randint(1, price_levels)
+        price = (mid_ticks - level if is_bid else mid_ticks + level) / 100000.0
+        amount = random_generator.choice((100000.00, 500000.00, 1000000.00, 2000000.00, 5000000.00))
+        quotes.append(Quote("N;{0};USD/CHF;{1};1610963536459;{2:.2f};0.00;0.00;{3:.5f};{4};0"
+                            .format(quote_id, local_time, amount, price, 'B' if is_bid else 'S')))
+    return quotes
+
+
+def observe_book(order_book) -> tuple:
+    """
+    Reads the observable state of an engine
+    :param order_book: LimitOrderBook or an alternative engine
+    :return: tuple of comparable values (order IDs instead of the Quote instances)
+    """
+    best_bid = order_book.get_best_bid()
+    best_offer = order_book.get_best_offer()
+    best_orders = []
+    for amount in CHECKED_AMOUNTS:
+        for way in (BuySell.BUY, BuySell.SELL):
+            best_order = order_book.get_best_orders_by_amount(way, amount)
+            best_orders.append(None if best_order is None else best_order.id())
+    return (None if best_bid is None else best_bid.id(), order_book.get_best_bid_price(),
+            None if best_offer is None else best_offer.id(), order_book.get_best_offer_price(),
+            order_book.count_bids(), order_book.count_offers(), tuple(best_orders))
+
+
+def apply_event(order_book, quote: Quote):
+    if quote.type() == NewCancel.NEW:
+        order_book.on_new_order(quote)
+    else:
+        order_book.on_cancel_order(quote)
+
+
+def measure_throughput(engine_factory, quotes: list) -> float:
+    """
+    Replays the events without checks
+    :param engine_factory: callable(CurrPair) returning an empty engine
+    :param quotes: the events
+    :return: events per second
+    """
+    order_book = engine_factory(CurrPair.USDCHF)
+    start_time = time.perf_counter()
+    for quote in quotes:
+        apply_event(order_book, quote)
+    elapsed_time = time.perf_counter() - start_time
+    return len(quotes) / elapsed_time if elapsed_time > 0.0 else float("inf")
+
+
+def compare_engines(reference_factory, candidate_factory, quotes: list, seed: int = None) -> DifferentialResult:
+    """
+    Drives both engines with the same events and compares their state after every event
+    :param reference_factory: callable(CurrPair) returning the reference engine
+    :param candidate_factory: callable(CurrPair) returning the engine under test
+    :param quotes: the events
+    :param seed: seed of the stream (reported only)
+    :return: DifferentialResult
+    """
+    reference_book = reference_factory(CurrPair.USDCHF)
+    candidate_book = candidate_factory(CurrPair.USDCHF)
+    mismatches = []
+    for event_index, quote in enumerate(quotes):
+        reference_error = candidate_error = None
+        try:
+            apply_event(reference_book, quote)
+        except RuntimeError as error:
+            reference_error = str(error)
+        try:
+            apply_event(candidate_book, quote)
+        except RuntimeError as error:
+            candidate_error = str(error)
+        if (reference_error is None) != (candidate_error is None):
+            mismatches.append("event {0} ({1} {2}): reference error {3}, candidate error {4}"
+                              .format(event_index, quote.type().name, quote.id(), reference_error, candidate_error))
+        else:
+            reference_state = observe_book(reference_book)
+            candidate_state = observe_book(candidate_book)
+            if reference_state != candidate_state:
+                mismatches.append("event {0} ({1} {2}): reference {3}, candidate {4}"
+                                  .format(event_index, quote.type().name, quote.id(), reference_state,
+                                          candidate_state))
+        if len(mismatches) >= MAX_REPORTED_MISMATCHES:
+            break
+    return DifferentialResult(seed, len(quotes), mismatches, measure_throughput(reference_factory, quotes),
+                              measure_throughput(candidate_factory, quotes))
+
+
+def run_differential_test(candidate_factory, stream_count: int = 10, event_count: int = 5000,
+                          invalid_event_probability: float = 0.0, reference_factory=None, first_seed: int = 1) -> list:
+    """
+    Compares the engines on several random streams
+    :param candidate_factory: callable(CurrPair) returning the engine under test
+    :param stream_count: number of streams
+    :param event_count: events per stream
+    :param invalid_event_probability: share of duplicated NEW orders and unknown CANCEL events
+    :param reference_factory: the reference engine (default: LimitOrderBook, with the resync policy if there are
+    invalid events)
+    :param first_seed: seed of the first stream, the next ones are incremented
+    :return: list of DifferentialResult
+    """
+    if reference_factory is None:
+        recovery_policy = BookRecoveryPolicy.STRICT if invalid_event_probability == 0.0 else BookRecoveryPolicy.RESYNC
+        reference_factory = lambda curr_pair: LimitOrderBook(curr_pair, recovery_policy)
+    results = []
+    for seed in range(first_seed, first_seed + stream_count):
+        quotes = generate_random_events(seed, event_count, invalid_event_probability=invalid_event_probability)
+        results.append(compare_engines(reference_factory, candidate_factory, quotes, seed))
+    return results
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Differential test of an order book engine against LimitOrderBook")
+    parser.add_argument("--engine", default="limit_order_book:LimitOrderBook",
+                        help="module:class of the tested engine, created with the currency pair")
+    parser.add_argument("--streams", type=int, default=10)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--invalid-events", type=float, default=0.0,
+                        help="share of duplicated NEW orders and unknown CANCEL events (resync reference)")
+    arguments = parser.parse_args(argv)
+    module_name, class_name = arguments.engine.split(":")
+    candidate_factory = getattr(importlib.import_module(module_name), class_name)
+    if arguments.invalid_events > 0.0 and candidate_factory is LimitOrderBook:
+        candidate_factory = lambda curr_pair: LimitOrderBook(curr_pair, BookRecoveryPolicy.RESYNC)
+    results = run_differential_test(candidate_factory, arguments.streams, arguments.events, arguments.invalid_events)
+    failed_count = 0
+    for result in results:
+        print("Stream {0}: {1} events, {2} mismatches, reference {3:2.0f} events/s, candidate {4:2.0f} events/s "
+              "({5:2.2f}x)".format(result.seed, result.event_count, len(result.mismatches),
+                                   result.reference_events_per_second, result.candidate_events_per_second,
+                                   result.candidate_events_per_second / result.reference_events_per_second))
+        for mismatch in result.mismatches:
+            print("    " + mismatch)
+        failed_count += 1 if result.mismatches else 0
+    print("{0} of {1} streams differ.".format(failed_count, len(results)))
+    return failed_count
+
+
+if __name__ == "__main__":
+    exit(1 if main() > 0 else 0)
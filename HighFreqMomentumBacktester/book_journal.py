@@ -0,0 +1,180 @@
+# Journal of the changes of a LimitOrderBook.
+#
+# Every change of the book (an order inserted or removed) appends one record: the price level that changed, its new
+# total amount and number of orders, and whether the best price of that side moved. The records are kept in a
+# preallocated ring buffer (one array.array per field), so appending does not allocate. Consumers keep their own
+# cursor (number of records read) and read the records appended since, without querying the book: a consumer that
+# falls more than the capacity behind gets a RuntimeError rather than silently missing changes.
+#
+# BookJournalRecorder drains a journal into a binary file (fixed size records), read back by read_recorded_changes().
+import struct
+from array import array
+from typing import NamedTuple
+
+# Layout of a record in a recorded file (little endian, no padding)
+RECORD_STRUCT = struct.Struct("<qddqbb")
+
+
+class BookChange(NamedTuple):
+    # Sequence of the book after the change (LimitOrderBook.sequence())
+    sequence: int
+    # Price of the changed level, its total amount and number of orders after the change (0 if the level is gone)
+    price: float
+    level_amount: float
+    level_count: int
+    is_bid: bool
+    # The best price of the side changed (a level was added above it, or the best level was emptied)
+    is_best_changed: bool
+
+
+class BookJournal:
+    __capacity: int
+    # Ring buffer: one preallocated column per field of BookChange
+    __sequences: array
+    __prices: array
+    __level_amounts: array
+    __level_counts: array
+    __is_bids: array
+    __is_best_changes: array
+    # Number of records appended since the creation (the next record goes to __count % __capacity)
+    __count: int
+
+    def __init__(self, capacity: int = 65536):
+        """
+        Creates an empty journal
+        :param capacity: number of records kept (older records are overwritten)
+        """
+        if capacity <= 0:
+            raise Exception("Please init the class with a capacity higher than 0")
+        self.__capacity = capacity
+        self.__sequences = array('q', bytes(8 * capacity))
+        self.__prices = array('d', bytes(8 * capacity))
+        self.__level_amounts = array('d', bytes(8 * capacity))
+        self.__level_counts = array('q', bytes(8 * capacity))
+        self.__is_bids = array('b', bytes(capacity))
+        self.__is_best_changes = array('b', bytes(capacity))
+        self.__count = 0
+
+    def __len__(self):
+        return min(self.__count, self.__capacity)
+
+    def append(self, sequence: int, price: float, level_amount: float, level_count: int, is_bid: bool,
+               is_best_changed: bool):
+        """
+        Adds a record (called by the book)
+        :param sequence: sequence of the book after the change
+        :param price: price of the changed level
+        :param level_amount: total amount of the level after the change
+        :param level_count: number of orders of the level after the change
+        :param is_bid: True for a change of the BID side
+        :param is_best_changed: the best price of the side changed
+        :return:
+        """
+        index = self.__count % self.__capacity
+        self.__sequences[index] = sequence
+        self.__prices[index] = price
+        self.__level_amounts[index] = level_amount
+        self.__level_counts[index] = level_count
+        self.__is_bids[index] = is_bid
+        self.__is_best_changes[index] = is_best_changed
+        self.__count += 1
+
+    def count(self) -> int:
+        """
+        Returns the number of records appended since the creation (the cursor of a consumer that read everything)
+        :return:
+        """
+        return self.__count
+
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def read(self, cursor: int, max_count: int = None) -> tuple:
+        """
+        Returns the records appended since a cursor
+        :param cursor: number of records already read by the consumer (0 for a new consumer)
+        :param max_count: maximal number of records returned (all the pending ones if None)
+        :return: (list of BookChange, new cursor)
+        """
+        if cursor < self.__count - self.__capacity:
+            raise RuntimeError("{0} changes of the book were overwritten before they were read: please read the "
+                               "journal more often or increase its capacity"
+                               .format(self.__count - self.__capacity - cursor))
+        end = self.__count if max_count is None else min(self.__count, cursor + max_count)
+        changes = []
+        for position in range(cursor, end):
+            index = position % self.__capacity
+            changes.append(BookChange(self.__sequences[index], self.__prices[index], self.__level_amounts[index],
+                                      self.__level_counts[index], self.__is_bids[index] == 1,
+                                      self.__is_best_changes[index] == 1))
+        return changes, end
+
+
+class BookJournalRecorder:
+    # Writes the records of a journal to a binary file
+    __journal: BookJournal
+    __file_writer: object
+    # Number of records of the journal already written
+    __cursor: int
+
+    def __init__(self, journal: BookJournal, file_name: str):
+        """
+        Starts recording the records appended from now on
+        :param journal: the journal
+        :param file_name: the binary file (overwritten)
+        """
+        self.__journal = journal
+        self.__file_writer = open(file_name, 'wb')
+        self.__cursor = journal.count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def pending_count(self) -> int:
+        return self.__journal.count() - self.__cursor
+
+    def drain(self) -> int:
+        """
+        Writes the records appended since the last call
+        :return: number of written records
+        """
+        changes, self.__cursor = self.__journal.read(self.__cursor)
+        self.__file_writer.write(b"".join(RECORD_STRUCT.pack(*change) for change in changes))
+        return len(changes)
+
+    def drain_if_half_full(self) -> int:
+        """
+        Writes the pending records once they fill half of the journal (cheap to call after every event)
+        :return: number of written records
+        """
+        if self.pending_count() * 2 < self.__journal.capacity():
+            return 0
+        return self.drain()
+
+    def close(self):
+        """
+        Writes the pending records and closes the file
+        :return:
+        """
+        if not self.__file_writer.closed:
+            self.drain()
+            self.__file_writer.close()
+
+
+def read_recorded_changes(file_name: str, block_records: int = 65536):
+    """
+    Reads a file written by BookJournalRecorder
+    :param file_name: the binary file
+    :param block_records: records read at once
+    :return: generator of BookChange
+    """
+    with open(file_name, 'rb') as file_reader:
+        block = file_reader.read(block_records * RECORD_STRUCT.size)
+        while block:
+            for sequence, price, level_amount, level_count, is_bid, is_best_changed in \
+                    RECORD_STRUCT.iter_unpack(block):
+                yield BookChange(sequence, price, level_amount, level_count, is_bid == 1, is_best_changed == 1)
+            block = file_reader.read(block_records * RECORD_STRUCT.size)
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+# Enumerates what the order book does with the inconsistent events of the feed (a CANCEL of an unknown order, a NEW
+# order with an ID already in the book), e.g. in a log that starts in the middle of a session:
+# STRICT raises a RuntimeError, COUNT_AND_SKIP ignores the event, RESYNC ignores the unknown CANCEL and replaces the
+# order of a duplicated ID with the new one. The skipped events are counted by the book in both last modes.
+class BookRecoveryPolicy(Enum):
+    STRICT = 0
+    COUNT_AND_SKIP = 1
+    RESYNC = 2
@@ -0,0 +1,128 @@
+# Transaction costs of the positions.
+#
+# The cost of a position (in the quote currency of the pair, like the total profit) adds up, for the opening and the
+# closing trades:
+# - the commission: traded amount x commission per million (a default one, or the one of the pair),
+# - the spread crossing cost: a share of the spread of the book at the time of the trade (0.5: half the spread),
+# - the slippage: a price impact that grows with the size, coefficient x (amount / reference amount) ^ exponent.
+# With the defaults (no spread cost, no slippage) the cost is the flat price per million used by main.py.
+#
+# The ledger keeps the amount and the spreads of every position, so a stored ledger (e.g. in the result cache) is
+# re-costed under a new schedule with a few vectorized NumPy operations, without replaying the log.
+import numpy as np
+
+from curr_pair import CurrPair, read_string_rep
+from performance_summary import LedgerEntry
+
+
+class CostModel:
+    # Commission per million traded, for each trade (opening and closing)
+    __commission_per_mil: float
+    # CurrPair -> commission per million of the pair (overrides __commission_per_mil)
+    __pair_commissions: dict
+    # Share of the spread paid by each trade
+    __spread_share: float
+    # Price impact of a trade of __slippage_reference_amount, and the exponent of the size dependence
+    __slippage_coefficient: float
+    __slippage_reference_amount: float
+    __slippage_exponent: float
+
+    def __init__(self, commission_per_mil: float = 10.00, pair_commissions: dict = None, spread_share: float = 0.0,
+                 slippage_coefficient: float = 0.0, slippage_reference_amount: float = 1000000.00,
+                 slippage_exponent: float = 0.5):
+        """
+        Creates a cost model
+        :param commission_per_mil: commission per million traded, paid by the opening and by the closing trade
+        :param pair_commissions: commission per million of some pairs: CurrPair (or "XXX/YYY") -> commission
+        :param spread_share: share of the spread of the book paid by each trade (0.0: the PnL already crosses it)
+        :param slippage_coefficient: price impact of a trade of slippage_reference_amount (price units)
+        :param slippage_reference_amount: amount of the slippage_coefficient
+        :param slippage_exponent: size dependence of the impact (0.5: square root, 1.0: linear)
+        """
+        if commission_per_mil < 0.0 or spread_share < 0.0 or slippage_coefficient < 0.0:
+            raise Exception("Please provide costs that are not negative")
+        if slippage_reference_amount <= 0.0:
+            raise Exception("Please provide a slippage reference amount higher than 0")
+        self.__commission_per_mil = commission_per_mil
+        self.__pair_commissions = {}
+        for curr_pair, pair_commission in (pair_commissions or {}).items():
+            if isinstance(curr_pair, str):
+                curr_pair = read_string_rep(curr_pair)
+            self.__pair_commissions[curr_pair] = pair_commission
+        self.__spread_share = spread_share
+        self.__slippage_coefficient = slippage_coefficient
+        self.__slippage_reference_amount = slippage_reference_amount
+        self.__slippage_exponent = slippage_exponent
+
+    def commission_per_mil(self, curr_pair: CurrPair = None) -> float:
+        """
+        Returns the commission per million of a pair
+        :param curr_pair: the pair (None: the default commission)
+        :return:
+        """
+        return self.__pair_commissions.get(curr_pair, self.__commission_per_mil)
+
+    def position_cost(self, amount: float, open_spread: float, close_spread: float,
+                      curr_pair: CurrPair = None) -> float:
+        """
+        Returns the cost of one position (opening and closing trades)
+        :param amount: traded amount
+        :param open_spread: spread of the book at the opening
+        :param close_spread: spread of the book at the closing
+        :param curr_pair: traded pair (for its commission)
+        :return: cost in the quote currency of the pair
+        """
+        commission = amount * 2.0 * self.commission_per_mil(curr_pair) / 1000000.00
+        # A crossed book (negative spread) costs nothing to cross
+        spread_cost = amount * self.__spread_share * (max(open_spread, 0.0) + max(close_spread, 0.0))
+        slippage = 0.0
+        if self.__slippage_coefficient > 0.0:
+            slippage = amount * 2.0 * self.__slippage_coefficient * \
+                (amount / self.__slippage_reference_amount) ** self.__slippage_exponent
+        return commission + spread_cost + slippage
+
+    def costs(self, amounts: np.ndarray, open_spreads: np.ndarray, close_spreads: np.ndarray,
+              curr_pair: CurrPair = None) -> np.ndarray:
+        """
+        Returns the costs of many positions at once (same values as position_cost())
+        :param amounts: traded amounts
+        :param open_spreads: spreads of the book at the openings
+        :param close_spreads: spreads of the book at the closings
+        :param curr_pair: traded pair (for its commission)
+        :return: array of costs
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        costs = amounts * (2.0 * self.commission_per_mil(curr_pair) / 1000000.00)
+        if self.__spread_share > 0.0:
+            spreads = np.maximum(np.asarray(open_spreads, dtype=np.float64), 0.0) + \
+                np.maximum(np.asarray(close_spreads, dtype=np.float64), 0.0)
+            costs += amounts * self.__spread_share * spreads
+        if self.__slippage_coefficient > 0.0:
+            costs += amounts * 2.0 * self.__slippage_coefficient * \
+                (amounts / self.__slippage_reference_amount) ** self.__slippage_exponent
+        return costs
+
+    def ledger_costs(self, ledger: list, curr_pair: CurrPair = None, traded_amount: float = None) -> np.ndarray:
+        """
+        Returns the costs of the positions of a ledger
+        :param ledger: list of LedgerEntry
+        :param curr_pair: traded pair (for its commission)
+        :param traded_amount: amount of the entries without amount (ledgers stored before the amounts were kept)
+        :return: array of costs, in the order of the ledger
+        """
+        amounts, open_spreads, close_spreads = ledger_arrays(ledger)
+        if traded_amount is not None:
+            amounts[amounts == 0.0] = traded_amount
+        return self.costs(amounts, open_spreads, close_spreads, curr_pair)
+
+
+def ledger_arrays(ledger: list) -> tuple:
+    """
+    Extracts the columns of a ledger needed by the costs
+    :param ledger: list of LedgerEntry
+    :return: (amounts, open spreads, close spreads) NumPy arrays
+    """
+    entry: LedgerEntry
+    return (np.fromiter((entry.amount for entry in ledger), dtype=np.float64, count=len(ledger)),
+            np.fromiter((entry.open_spread for entry in ledger), dtype=np.float64, count=len(ledger)),
+            np.fromiter((entry.close_spread for entry in ledger), dtype=np.float64, count=len(ledger)))
@@ -0,0 +1,203 @@
+# Streaming analysis of the feed itself: latency between the exchange and the local timestamps, gaps, bursts and
+# out of order events. It tells whether a slow replay or an odd signal comes from the feed rather than from the
+# strategy. The memory used is constant (StreamingHistogram and a few counters).
+#
+# The local clock (nanoseconds, Quote.time()) and the exchange clock (milliseconds since the epoch,
+# Quote.exchange_time()) have different origins. Unless the offset between them is known (clock_offset_us), the
+# first event is the reference: the latencies are then relative to the first event's latency.
+from collections import deque
+
+from quote import Quote, QUOTE_TIME_UNITS_PER_MILLISECOND, EXCHANGE_TIME_UNITS_PER_MILLISECOND
+from streaming_histogram import StreamingHistogram
+
+# Number of out of order events kept for the report
+MAX_REPORTED_OUT_OF_ORDER_EVENTS = 20
+
+
+class FeedLatencyAnalyser:
+    # Local minus exchange time minus the clock offset, in microseconds
+    __latencies: StreamingHistogram
+    __clock_offset_us: int
+    # Events whose latency was below the reference (only possible when the reference is the first event)
+    __below_reference_count: int
+    __min_relative_latency_us: int
+    # Gaps: time between two events longer than the threshold (Quote.time() units)
+    __gap_threshold: int
+    __gap_count: int
+    __max_gap: int
+    __inter_arrival_times: StreamingHistogram
+    # Bursts: at least __burst_size events within __burst_window (Quote.time() units)
+    __burst_size: int
+    __burst_window: int
+    __last_event_times: deque
+    __is_in_burst: bool
+    __burst_count: int
+    __events_in_bursts: int
+    # Out of order events
+    __exchange_out_of_order_count: int
+    __local_out_of_order_count: int
+    __out_of_order_ids: list
+    __previous_local_time: int
+    __previous_exchange_time: int
+    __event_count: int
+
+    def __init__(self, clock_offset_us: int = None, gap_threshold_ms: float = 1000.0, burst_size: int = 100,
+                 burst_window_ms: float = 1.0):
+        """
+        Creates the analyser
+        :param clock_offset_us: local clock minus exchange clock, in microseconds (None: the first event is the
+        reference)
+        :param gap_threshold_ms: silence (in milliseconds) counted as a gap
+        :param burst_size: number of events ...
+        :param burst_window_ms: ... within this time (in milliseconds) counted as a burst
+        """
+        if burst_size <= 1:
+            raise Exception("Please init the class with a burst size higher than 1")
+        self.__latencies = StreamingHistogram()
+        self.__clock_offset_us = clock_offset_us
+        self.__below_reference_count = 0
+        self.__min_relative_latency_us = None
+        self.__gap_threshold = int(gap_threshold_ms * QUOTE_TIME_UNITS_PER_MILLISECOND)
+        self.__gap_count = 0
+        self.__max_gap = 0
+        self.__inter_arrival_times = StreamingHistogram()
+        self.__burst_size = burst_size
+        self.__burst_window = int(burst_window_ms * QUOTE_TIME_UNITS_PER_MILLISECOND)
+        self.__last_event_times = deque(maxlen=burst_size)
+        self.__is_in_burst = False
+        self.__burst_count = 0
+        self.__events_in_bursts = 0
+        self.__exchange_out_of_order_count = 0
+        self.__local_out_of_order_count = 0
+        self.__out_of_order_ids = []
+        self.__previous_local_time = None
+        self.__previous_exchange_time = None
+        self.__event_count = 0
+
+    def on_quote(self, quote: Quote) -> bool:
+        """
+        Analyses one event of the feed (NEW or CANCEL, any pair)
+        :param quote: the event
+        :return: True if the event is out of order (its local or exchange time is before the previous event's)
+        """
+        self.__event_count += 1
+        local_time = quote.time()
+        exchange_time = quote.exchange_time()
+
+        # Latency
+        latency_us = local_time * 1000 // QUOTE_TIME_UNITS_PER_MILLISECOND - \
+            exchange_time * 1000 // EXCHANGE_TIME_UNITS_PER_MILLISECOND
+        if self.__clock_offset_us is None:
+            self.__clock_offset_us = latency_us
+        relative_latency_us = latency_us - self.__clock_offset_us
+        if self.__min_relative_latency_us is None or relative_latency_us < self.__min_relative_latency_us:
+            self.__min_relative_latency_us = relative_latency_us
+        if relative_latency_us < 0:
+            self.__below_reference_count += 1
+            relative_latency_us = 0
+        self.__latencies.record(relative_latency_us)
+
+        is_out_of_order = False
+        if self.__previous_local_time is not None:
+            # Out of order events
+            if exchange_time < self.__previous_exchange_time:
+                self.__exchange_out_of_order_count += 1
+                is_out_of_order = True
+            if local_time < self.__previous_local_time:
+                self.__local_out_of_order_count += 1
+                is_out_of_order = True
+            if is_out_of_order and len(self.__out_of_order_ids) < MAX_REPORTED_OUT_OF_ORDER_EVENTS:
+                self.__out_of_order_ids.append(quote.id())
+            # Gaps
+            inter_arrival_time = local_time - self.__previous_local_time
+            if inter_arrival_time >= 0:
+                self.__inter_arrival_times.record(inter_arrival_time)
+            if inter_arrival_time > self.__gap_threshold:
+                self.__gap_count += 1
+            if inter_arrival_time > self.__max_gap:
+                self.__max_gap = inter_arrival_time
+        self.__previous_local_time = local_time
+        self.__previous_exchange_time = exchange_time
+
+        # Bursts: the last burst_size events arrived within the burst window
+        self.__last_event_times.append(local_time)
+        is_in_burst = len(self.__last_event_times) == self.__burst_size and \
+            local_time - self.__last_event_times[0] <= self.__burst_window
+        if is_in_burst:
+            if not self.__is_in_burst:
+                self.__burst_count += 1
+                self.__events_in_bursts += self.__burst_size
+            else:
+                self.__events_in_bursts += 1
+        self.__is_in_burst = is_in_burst
+        return is_out_of_order
+
+    def latency_histogram(self) -> StreamingHistogram:
+        """
+        Returns the latencies (microseconds, relative to the clock offset)
+        :return:
+        """
+        return self.__latencies
+
+    def inter_arrival_histogram(self) -> StreamingHistogram:
+        """
+        Returns the times between two consecutive events (Quote.time() units)
+        :return:
+        """
+        return self.__inter_arrival_times
+
+    def clock_offset_us(self) -> int:
+        return self.__clock_offset_us
+
+    def below_reference_count(self) -> int:
+        return self.__below_reference_count
+
+    def gap_count(self) -> int:
+        return self.__gap_count
+
+    def max_gap(self) -> int:
+        return self.__max_gap
+
+    def burst_count(self) -> int:
+        return self.__burst_count
+
+    def events_in_bursts(self) -> int:
+        return self.__events_in_bursts
+
+    def out_of_order_count(self) -> int:
+        """
+        Returns the number of events received before (local or exchange time) the previous event
+        :return:
+        """
+        return self.__exchange_out_of_order_count + self.__local_out_of_order_count
+
+    def out_of_order_ids(self) -> list:
+        """
+        Returns the IDs of the first out of order events
+        :return:
+        """
+        return self.__out_of_order_ids
+
+    def report(self) -> list:
+        """
+        Formats the analysis
+        :return: list of lines
+        """
+        latencies = self.__latencies
+        lines = ["Feed: {0} events, latency us (relative to {1} us): median {2:2.0f}, 99% {3:2.0f}, 99.9% {4:2.0f}, "
+                 "max {5}".format(self.__event_count, self.__clock_offset_us, latencies.percentile(50.0),
+                                  latencies.percentile(99.0), latencies.percentile(99.9), latencies.max())]
+        if self.__below_reference_count > 0:
+            lines.append("    {0} events below the reference latency (min {1} us): give the clock offset to get "
+                         "absolute latencies".format(self.__below_reference_count, self.__min_relative_latency_us))
+        lines.append("    {0} gaps longer than {1:2.1f} ms (max {2:2.3f} ms), {3} bursts of {4}+ events within "
+                     "{5:2.3f} ms ({6} events)".format(self.__gap_count,
+                                                       self.__gap_threshold / QUOTE_TIME_UNITS_PER_MILLISECOND,
+                                                       self.__max_gap / QUOTE_TIME_UNITS_PER_MILLISECOND,
+                                                       self.__burst_count, self.__burst_size,
+                                                       self.__burst_window / QUOTE_TIME_UNITS_PER_MILLISECOND,
+                                                       self.__events_in_bursts))
+        lines.append("    {0} out of order events (exchange time: {1}, local time: {2}), first IDs: {3}"
+                     .format(self.out_of_order_count(), self.__exchange_out_of_order_count,
+                             self.__local_out_of_order_count, self.__out_of_order_ids))
+        return lines
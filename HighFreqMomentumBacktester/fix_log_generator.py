@@ -0,0 +1,261 @@
+# Synthetic FIX logs for load tests: N;... and C;... rows in the format read by Quote.
+#
+# The random numbers are drawn with NumPy one block of NEW orders at a time:
+# - arrival times: exponential intervals, with bursts (runs of events with a much shorter mean interval),
+# - one random walk of the mid price per pair (integer number of ticks, so there is no drift of the rounding),
+# - orders placed 1 to depth ticks away from the mid, sizes drawn from a discrete distribution,
+# - a share of the orders (cancel ratio) is cancelled after an exponential lifetime. A CANCEL always follows its NEW
+#   order, so the logs replay through a strict LimitOrderBook.
+# Only the formatting of the rows is done in Python (one format per row), which is about 1 us per row.
+#
+# Usage:
+#   python fix_log_generator.py synthetic-log.csv --rows 100000000 --pairs EUR/USD USD/CHF --seed 1
+import argparse
+import gzip
+
+import numpy as np
+
+from curr_pair import read_string_rep
+
+# Start mid price and tick size of the pairs of CurrPair
+DEFAULT_PAIR_PRICES = {
+    "EUR/USD": (1.21000, 0.00001),
+    "GBP/USD": (1.36000, 0.00001),
+    "USD/CHF": (0.89150, 0.00001),
+    "USD/JPY": (103.800, 0.001),
+    "EUR/JPY": (125.600, 0.001),
+    "AUD/USD": (0.77000, 0.00001),
+    "NOK/SEK": (0.98000, 0.00001),
+    "USD/CAD": (1.27000, 0.00001),
+}
+
+
+class FixLogGenerator:
+    # Traded pairs: names (XXX/YYY), mid prices in ticks, tick sizes and number of decimals of the prices
+    __pair_names: list
+    __mid_ticks: np.ndarray
+    __tick_sizes: np.ndarray
+    __price_decimals: list
+    # Orders are placed 1 to __depth ticks away from the mid
+    __depth: int
+    __cancel_ratio: float
+    # Mean lifetime of the cancelled orders (ns)
+    __mean_lifetime: float
+    # Probability that the mid moves by one tick on a NEW order of the pair
+    __move_probability: float
+    # Mean interval between two NEW orders outside and inside the bursts (ns)
+    __mean_interval: float
+    __burst_mean_interval: float
+    __burst_probability: float
+    __burst_length: int
+    # Order sizes and their probabilities
+    __sizes: np.ndarray
+    __size_weights: np.ndarray
+    # Mean latency between the exchange and the local timestamps (ns)
+    __mean_latency: float
+    # Local clock (ns) and exchange clock (ms since the epoch) at the start of the log
+    __start_time: int
+    __start_exchange_time: int
+    __random_generator: np.random.Generator
+    # State carried from one block to the next: local time of the last NEW order, next order ID and the cancels
+    # that are not yet due (local times, order IDs, pair indexes)
+    __current_time: int
+    __next_id: int
+    __pending_cancel_times: np.ndarray
+    __pending_cancel_ids: np.ndarray
+    __pending_cancel_pairs: np.ndarray
+
+    def __init__(self, pair_names: list = None, depth: int = 10, cancel_ratio: float = 0.9,
+                 mean_lifetime_ms: float = 50.0, move_probability: float = 0.2, mean_interval_us: float = 100.0,
+                 burst_mean_interval_us: float = 2.0, burst_probability: float = 0.05, burst_length: int = 200,
+                 sizes: tuple = (1000000.00, 2000000.00, 3000000.00, 5000000.00, 10000000.00),
+                 size_weights: tuple = (0.5, 0.2, 0.1, 0.1, 0.1), mean_latency_us: float = 500.0,
+                 start_time: int = 39136466000000, start_exchange_time: int = 1610963536459, seed: int = None):
+        """
+        Creates the generator
+        :param pair_names: list of XXX/YYY of CurrPair (default: USD/CHF)
+        :param depth: the orders are placed 1 to depth ticks away from the mid price
+        :param cancel_ratio: share of the NEW orders that are cancelled (between 0.0 and 1.0)
+        :param mean_lifetime_ms: mean time between a NEW order and its CANCEL
+        :param move_probability: probability that the mid moves by one tick (up or down) on a NEW order of the pair
+        :param mean_interval_us: mean interval between two NEW orders outside the bursts
+        :param burst_mean_interval_us: mean interval between two NEW orders in a burst
+        :param burst_probability: share of the runs of burst_length NEW orders that are bursts
+        :param burst_length: number of NEW orders of a burst
+        :param sizes: order sizes
+        :param size_weights: probabilities of the sizes
+        :param mean_latency_us: mean latency between the exchange and the local timestamps
+        :param start_time: local time (ns) of the first row
+        :param start_exchange_time: exchange time (ms since the epoch) of the first row
+        :param seed: seed of the random generator (None: not reproducible)
+        """
+        if pair_names is None:
+            pair_names = ["USD/CHF"]
+        if depth <= 0:
+            raise Exception("Please init the class with a depth higher than 0")
+        if not 0.0 <= cancel_ratio <= 1.0:
+            raise Exception("The cancel ratio ({0}) has to be between 0 and 1".format(cancel_ratio))
+        if len(sizes) != len(size_weights):
+            raise Exception("Please give one weight per size")
+        for pair_name in pair_names:
+            # Only the pairs known by Quote can be generated
+            read_string_rep(pair_name)
+            if pair_name not in DEFAULT_PAIR_PRICES:
+                raise RuntimeError("Please add {} to DEFAULT_PAIR_PRICES.".format(pair_name))
+        self.__pair_names = list(pair_names)
+        self.__tick_sizes = np.array([DEFAULT_PAIR_PRICES[pair_name][1] for pair_name in pair_names])
+        self.__mid_ticks = np.array([round(DEFAULT_PAIR_PRICES[pair_name][0] / DEFAULT_PAIR_PRICES[pair_name][1])
+                                     for pair_name in pair_names], dtype=np.int64)
+        self.__price_decimals = [len("{0:f}".format(tick_size).rstrip("0").split(".")[1])
+                                 for tick_size in self.__tick_sizes]
+        self.__depth = depth
+        self.__cancel_ratio = cancel_ratio
+        self.__mean_lifetime = mean_lifetime_ms * 1000000.0
+        self.__move_probability = move_probability
+        self.__mean_interval = mean_interval_us * 1000.0
+        self.__burst_mean_interval = burst_mean_interval_us * 1000.0
+        self.__burst_probability = burst_probability
+        self.__burst_length = max(1, burst_length)
+        self.__sizes = np.array(sizes, dtype=np.float64)
+        self.__size_weights = np.array(size_weights, dtype=np.float64) / sum(size_weights)
+        self.__mean_latency = mean_latency_us * 1000.0
+        self.__start_time = start_time
+        self.__start_exchange_time = start_exchange_time
+        self.__random_generator = np.random.default_rng(seed)
+        self.__current_time = start_time
+        self.__next_id = 1
+        self.__pending_cancel_times = np.empty(0, dtype=np.int64)
+        self.__pending_cancel_ids = np.empty(0, dtype=np.int64)
+        self.__pending_cancel_pairs = np.empty(0, dtype=np.int64)
+
+    def generate_block(self, new_order_count: int) -> list:
+        """
+        Generates the next new_order_count NEW orders and the CANCEL rows due before the last of them
+        :param new_order_count: number of NEW orders
+        :return: list of rows (without line feed), in the order of the local times
+        """
+        if new_order_count <= 0:
+            return []
+        random_generator = self.__random_generator
+        # Arrival times: the runs of burst_length orders are bursts with the probability burst_probability
+        run_count = -(-new_order_count // self.__burst_length)
+        is_burst = np.repeat(random_generator.random(run_count) < self.__burst_probability,
+                             self.__burst_length)[:new_order_count]
+        intervals = random_generator.exponential(1.0, new_order_count) * \
+            np.where(is_burst, self.__burst_mean_interval, self.__mean_interval)
+        times = self.__current_time + np.cumsum(intervals.astype(np.int64) + 1)
+        self.__current_time = int(times[-1])
+        ids = np.arange(self.__next_id, self.__next_id + new_order_count, dtype=np.int64)
+        self.__next_id += new_order_count
+
+        # Prices: one random walk of the mid per pair, the order is 1 to depth ticks away on its side
+        pairs = random_generator.integers(0, len(self.__pair_names), new_order_count)
+        steps = random_generator.choice(np.array([-1, 0, 1], dtype=np.int64), new_order_count,
+                                        p=[self.__move_probability / 2.0, 1.0 - self.__move_probability,
+                                           self.__move_probability / 2.0])
+        mid_ticks = np.empty(new_order_count, dtype=np.int64)
+        for pair_index in range(len(self.__pair_names)):
+            is_pair = pairs == pair_index
+            pair_mid_ticks = self.__mid_ticks[pair_index] + np.cumsum(steps[is_pair])
+            mid_ticks[is_pair] = pair_mid_ticks
+            if len(pair_mid_ticks) > 0:
+                self.__mid_ticks[pair_index] = pair_mid_ticks[-1]
+        is_bid = random_generator.random(new_order_count) < 0.5
+        levels = random_generator.integers(1, self.__depth + 1, new_order_count)
+        price_ticks = np.maximum(np.where(is_bid, mid_ticks - levels, mid_ticks + levels), 1)
+        prices = price_ticks * self.__tick_sizes[pairs]
+        amounts = random_generator.choice(self.__sizes, new_order_count, p=self.__size_weights)
+
+        # Cancels: due after the lifetime of the order, the ones due after this block are carried to the next block
+        is_cancelled = random_generator.random(new_order_count) < self.__cancel_ratio
+        lifetimes = random_generator.exponential(self.__mean_lifetime, int(is_cancelled.sum())).astype(np.int64) + 1
+        cancel_times = np.concatenate((self.__pending_cancel_times, times[is_cancelled] + lifetimes))
+        cancel_ids = np.concatenate((self.__pending_cancel_ids, ids[is_cancelled]))
+        cancel_pairs = np.concatenate((self.__pending_cancel_pairs, pairs[is_cancelled]))
+        is_due = cancel_times <= self.__current_time
+        self.__pending_cancel_times = cancel_times[~is_due]
+        self.__pending_cancel_ids = cancel_ids[~is_due]
+        self.__pending_cancel_pairs = cancel_pairs[~is_due]
+        cancel_times = cancel_times[is_due]
+        cancel_ids = cancel_ids[is_due]
+        cancel_pairs = cancel_pairs[is_due]
+
+        # Merge the NEW and CANCEL rows on the local time (a CANCEL is always later than its NEW order)
+        all_times = np.concatenate((times, cancel_times))
+        order = np.argsort(all_times, kind="stable")
+        all_ids = np.concatenate((ids, cancel_ids))[order]
+        all_pairs = np.concatenate((pairs, cancel_pairs))[order]
+        all_times = all_times[order]
+        latencies = random_generator.exponential(self.__mean_latency, len(all_times)).astype(np.int64)
+        exchange_times = self.__start_exchange_time + (all_times - self.__start_time - latencies) // 1000000
+        is_new = order < new_order_count
+        # The NEW order fields of the CANCEL rows are not used
+        new_order_indexes = np.where(is_new, order, 0)
+        all_prices = prices[new_order_indexes]
+        all_amounts = amounts[new_order_indexes]
+        all_ways = np.where(is_bid[new_order_indexes], 'B', 'S')
+
+        pair_names = self.__pair_names
+        price_decimals = self.__price_decimals
+        return ["N;%d;%s;%d;%d;%.2f;0.00;0.00;%.*f;%s;0" % (quote_id, pair_names[pair_index], quote_time,
+                                                             exchange_time, amount, price_decimals[pair_index],
+                                                             price, way)
+                if is_new_row else
+                "C;%d;%s;%d;%d" % (quote_id, pair_names[pair_index], quote_time, exchange_time)
+                for is_new_row, quote_id, pair_index, quote_time, exchange_time, amount, price, way in
+                zip(is_new.tolist(), all_ids.tolist(), all_pairs.tolist(), all_times.tolist(),
+                    exchange_times.tolist(), all_amounts.tolist(), all_prices.tolist(), all_ways.tolist())]
+
+    def generate_rows(self, row_count: int, block_size: int = 100000):
+        """
+        Yields the rows of a log, one block at a time
+        :param row_count: number of rows (NEW and CANCEL)
+        :param block_size: number of NEW orders generated at once
+        :return: generator of lists of rows
+        """
+        rows_left = row_count
+        while rows_left > 0:
+            rows = self.generate_block(min(block_size, rows_left))
+            if len(rows) > rows_left:
+                rows = rows[:rows_left]
+            rows_left -= len(rows)
+            yield rows
+
+    def write(self, file_name: str, row_count: int, block_size: int = 100000):
+        """
+        Writes a log file
+        :param file_name: the log file (gzip compressed if the name ends with .gz)
+        :param row_count: number of rows (NEW and CANCEL)
+        :param block_size: number of NEW orders generated at once
+        :return:
+        """
+        file_writer = gzip.open(file_name, 'wt', compresslevel=1, newline='\n') if file_name.endswith(".gz") \
+            else open(file_name, 'w', newline='\n')
+        with file_writer:
+            for rows in self.generate_rows(row_count, block_size):
+                file_writer.write("\n".join(rows))
+                file_writer.write("\n")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Synthetic FIX log generator")
+    parser.add_argument("file_name", help="generated log file (gzip compressed if the name ends with .gz)")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--pairs", nargs="+", default=["USD/CHF"], help="currency pairs (XXX/YYY)")
+    parser.add_argument("--depth", type=int, default=10, help="levels of the book on each side")
+    parser.add_argument("--cancel-ratio", type=float, default=0.9)
+    parser.add_argument("--mean-lifetime-ms", type=float, default=50.0, help="mean lifetime of the cancelled orders")
+    parser.add_argument("--move-probability", type=float, default=0.2,
+                        help="probability that the mid moves by one tick on a NEW order")
+    parser.add_argument("--mean-interval-us", type=float, default=100.0)
+    parser.add_argument("--burst-probability", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=None)
+    arguments = parser.parse_args(argv)
+    FixLogGenerator(arguments.pairs, arguments.depth, arguments.cancel_ratio, arguments.mean_lifetime_ms,
+                    arguments.move_probability, arguments.mean_interval_us,
+                    burst_probability=arguments.burst_probability, seed=arguments.seed)\
+        .write(arguments.file_name, arguments.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from curr_pair import CurrPair
+from indicators import Indicator, BookIndicator
+
+
+class IndicatorRegistry:
+    # Indicators of one currency pair, deduplicated by (type, window). Strategies running side by side ask the
+    # registry for their indicators: two strategies with the same window length read the same instance, which is
+    # updated once per tick (see Indicator.update). The value is calculated by the update: the other strategies read
+    # it in O(1).
+    __curr_pair: CurrPair
+    # (indicator type, window) -> Indicator fed with a price
+    __indicators: dict
+    # (indicator type, window) -> BookIndicator fed with the top of the book
+    __book_indicators: dict
+    # Sequence number of the last update
+    __last_sequence: int
+    __last_book_sequence: int
+
+    def __init__(self, curr_pair: CurrPair):
+        self.__curr_pair = curr_pair
+        self.__indicators = {}
+        self.__book_indicators = {}
+        self.__last_sequence = -1
+        self.__last_book_sequence = -1
+
+    def get(self, indicator_type: type, window: int = None) -> Indicator:
+        """
+        Returns the registered indicator for (indicator_type, window), creating it on first use.
+        :param indicator_type: an Indicator subclass, e.g. SimpleMovingAverage
+        :param window: the window given to the indicator's constructor (None for indicators without window)
+        :return: the shared Indicator instance
+        """
+        key = (indicator_type, window)
+        collection = self.__book_indicators if issubclass(indicator_type, BookIndicator) else self.__indicators
+        indicator = collection.get(key)
+        if indicator is None:
+            indicator = indicator_type() if window is None else indicator_type(window)
+            collection[key] = indicator
+        return indicator
+
+    def update(self, sequence: int, value: float, time: int = 0):
+        """
+        Updates all the price indicators once for this sequence number
+        :param sequence: sequence number of the tick (TopOfBook.sequence)
+        :param value: the price (e.g. the mid price)
+        :param time: time of the tick (Quote.time()), required by the time window indicators
+        :return:
+        """
+        if sequence == self.__last_sequence:
+            return
+        self.__last_sequence = sequence
+        for indicator in self.__indicators.values():
+            indicator.update_at(sequence, time, value)
+
+    def update_book(self, sequence: int, bid_price: float, bid_amount: float, offer_price: float,
+                    offer_amount: float):
+        """
+        Updates all the book indicators once for this sequence number
+        :param sequence: sequence number of the tick (TopOfBook.sequence)
+        :return:
+        """
+        if sequence == self.__last_book_sequence:
+            return
+        self.__last_book_sequence = sequence
+        for indicator in self.__book_indicators.values():
+            indicator.update_book(sequence, bid_price, bid_amount, offer_price, offer_amount)
+
+    def count(self) -> int:
+        """
+        Returns the number of distinct indicators computed per tick
+        :return:
+        """
+        return len(self.__indicators) + len(self.__book_indicators)
+
+    def currency_pair(self) -> CurrPair:
+        """
+        Returns the currency pair of this registry
+        :return:
+        """
+        return self.__curr_pair
@@ -0,0 +1,466 @@
+# Incremental indicators. Every read costs O(1), and so does every update (amortized for the rolling minimum/maximum)
+# except the one of SimpleMovingAverage that sums its window, as FifoDoublesList.get_mean(), once per update.
+#
+# Each update carries a sequence number (TopOfBook.sequence of the book of the pair): an indicator that already
+# processed a sequence number ignores it. One indicator instance can therefore be shared by all the strategies
+# subscribed to the same pair, the first strategy to see a tick updates it and the others only read the value.
+from collections import deque
+from math import sqrt
+
+
+class Indicator:
+    # Sequence number of the last applied update
+    _last_sequence: int
+
+    def __init__(self):
+        self._last_sequence = -1
+
+    def update(self, sequence: int, value: float):
+        """
+        Feeds the indicator with a new value (once per sequence number)
+        :param sequence: sequence number of the tick (TopOfBook.sequence)
+        :param value: the new value (e.g. the mid price)
+        :return:
+        """
+        if sequence == self._last_sequence:
+            return
+        self._last_sequence = sequence
+        self.put(value)
+
+    def update_at(self, sequence: int, time: int, value: float):
+        """
+        Feeds the indicator with a new value and its time. Tick based indicators ignore the time.
+        :param sequence: sequence number of the tick (TopOfBook.sequence)
+        :param time: time of the value (Quote.time() units)
+        :param value: the new value
+        :return:
+        """
+        self.update(sequence, value)
+
+    def put_at(self, time: int, value: float):
+        """
+        Adds a value and its time without checking the sequence number. Tick based indicators ignore the time.
+        :param time: time of the value (Quote.time() units)
+        :param value: the new value
+        :return:
+        """
+        self.put(value)
+
+    def put(self, value: float):
+        """
+        Adds a value without checking the sequence number
+        :param value: the new value
+        :return:
+        """
+        raise NotImplementedError
+
+    def value(self) -> float:
+        """
+        Returns the current value of the indicator
+        :return:
+        """
+        raise NotImplementedError
+
+    def is_ready(self) -> bool:
+        """
+        Returns True once enough values were received for the value to be meaningful
+        :return:
+        """
+        raise NotImplementedError
+
+
+class BookIndicator(Indicator):
+    # Indicators calculated on the top of the book rather than on a single price.
+
+    def update_book(self, sequence: int, bid_price: float, bid_amount: float, offer_price: float,
+                    offer_amount: float):
+        """
+        Feeds the indicator with the top of the book (once per sequence number)
+        :param sequence: sequence number of the tick (TopOfBook.sequence)
+        :return:
+        """
+        if sequence == self._last_sequence:
+            return
+        self._last_sequence = sequence
+        self.put_book(bid_price, bid_amount, offer_price, offer_amount)
+
+    def put_book(self, bid_price: float, bid_amount: float, offer_price: float, offer_amount: float):
+        raise NotImplementedError
+
+    def put(self, value: float):
+        raise RuntimeError("{0} has to be fed with update_book()".format(type(self).__name__))
+
+
+class SimpleMovingAverage(Indicator):
+    # Ring buffer (pre-filled with 0.00, as FifoDoublesList)
+    __window: int
+    __data_list: list
+    __next_updated_index: int
+    __values_count: int
+    # Mean of the buffer, calculated by put()
+    __mean: float
+
+    def __init__(self, window: int):
+        """
+        Simple moving average over the last window values. The mean is summed again on every update, as
+        FifoDoublesList.get_mean(): a running sum rounds differently and would change the trades of MomentumStrategy.
+        The reads return the stored mean.
+        :param window: number of values
+        """
+        super().__init__()
+        if window <= 1:
+            raise Exception("Please init the class with a window higher than 1")
+        self.__window = window
+        self.__data_list = [0.00] * window
+        self.__next_updated_index = 0
+        self.__values_count = 0
+        self.__mean = 0.00
+
+    def put(self, value: float):
+        self.__data_list[self.__next_updated_index] = value
+        self.__values_count += 1
+        self.__next_updated_index += 1
+        if self.__next_updated_index == self.__window:
+            self.__next_updated_index = 0
+        self.__mean = sum(self.__data_list) / self.__window
+
+    def value(self) -> float:
+        return self.__mean
+
+    def is_ready(self) -> bool:
+        return self.__values_count >= self.__window
+
+    def window(self) -> int:
+        return self.__window
+
+
+class TimeWindowMovingAverage(Indicator):
+    # Values of the window as (time, value), oldest on the left, and their running sum
+    __window: int
+    __values: deque
+    __running_sum: float
+    # Removed values since the running sum was last recalculated
+    __removed_count: int
+    __first_time: int
+    __last_time: int
+
+    def __init__(self, window: int):
+        """
+        Mean of the values received during the last window time units (wall-clock window). Each value enters and
+        leaves the deque once: O(1) amortized per update whatever the quoting activity.
+        :param window: length of the window in Quote.time() units
+        """
+        super().__init__()
+        if window <= 0:
+            raise Exception("Please init the class with a window higher than 0")
+        self.__window = window
+        self.__values = deque()
+        self.__running_sum = 0.00
+        self.__removed_count = 0
+        self.__first_time = None
+        self.__last_time = None
+
+    def update_at(self, sequence: int, time: int, value: float):
+        if sequence == self._last_sequence:
+            return
+        self._last_sequence = sequence
+        self.put_at(time, value)
+
+    def put_at(self, time: int, value: float):
+        """
+        Adds a value received at the given time and drops the values older than the window
+        :param time: time of the value (Quote.time() units, never decreasing)
+        :param value: the new value
+        :return:
+        """
+        if self.__first_time is None:
+            self.__first_time = time
+        self.__last_time = time
+        self.__values.append((time, value))
+        self.__running_sum += value
+        oldest_kept_time = time - self.__window
+        while self.__values[0][0] <= oldest_kept_time:
+            self.__running_sum -= self.__values.popleft()[1]
+            self.__removed_count += 1
+        # Sum again after as many removals as values in the window: no accumulation of rounding errors
+        if self.__removed_count >= len(self.__values):
+            self.__running_sum = sum(each_value for each_time, each_value in self.__values)
+            self.__removed_count = 0
+
+    def put(self, value: float):
+        raise RuntimeError("TimeWindowMovingAverage has to be fed with update_at()")
+
+    def value(self) -> float:
+        if not self.__values:
+            return 0.00
+        return self.__running_sum / len(self.__values)
+
+    def is_ready(self) -> bool:
+        return self.__first_time is not None and self.__last_time - self.__first_time >= self.__window
+
+    def window(self) -> int:
+        return self.__window
+
+
+class ExponentialMovingAverage(Indicator):
+    # Smoothing factor 2 / (window + 1)
+    __alpha: float
+    __current_value: float
+    __values_count: int
+    __window: int
+
+    def __init__(self, window: int):
+        """
+        Exponential moving average. The first value initializes the average.
+        :param window: equivalent number of values (alpha = 2 / (window + 1))
+        """
+        super().__init__()
+        if window <= 0:
+            raise Exception("Please init the class with a window higher than 0")
+        self.__window = window
+        self.__alpha = 2.0 / (window + 1.0)
+        self.__current_value = 0.00
+        self.__values_count = 0
+
+    def put(self, value: float):
+        if self.__values_count == 0:
+            self.__current_value = value
+        else:
+            self.__current_value += self.__alpha * (value - self.__current_value)
+        self.__values_count += 1
+
+    def value(self) -> float:
+        return self.__current_value
+
+    def is_ready(self) -> bool:
+        return self.__values_count >= self.__window
+
+    def window(self) -> int:
+        return self.__window
+
+
+class RollingVariance(Indicator):
+    # Values are stored shifted by the first received value: prices are close to each other, the shift avoids the
+    # cancellation of sum_of_squares / n - mean ** 2.
+    __window: int
+    __data_list: list
+    __next_updated_index: int
+    __values_count: int
+    __shift: float
+    __running_sum: float
+    __running_sum_of_squares: float
+
+    def __init__(self, window: int):
+        """
+        Population variance (and standard deviation) of the last window values
+        :param window: number of values
+        """
+        super().__init__()
+        if window <= 1:
+            raise Exception("Please init the class with a window higher than 1")
+        self.__window = window
+        self.__data_list = [0.00] * window
+        self.__next_updated_index = 0
+        self.__values_count = 0
+        self.__shift = 0.00
+        self.__running_sum = 0.00
+        self.__running_sum_of_squares = 0.00
+
+    def put(self, value: float):
+        if self.__values_count == 0:
+            self.__shift = value
+        shifted_value = value - self.__shift
+        removed_value = self.__data_list[self.__next_updated_index]
+        self.__running_sum += shifted_value - removed_value
+        self.__running_sum_of_squares += shifted_value * shifted_value - removed_value * removed_value
+        self.__data_list[self.__next_updated_index] = shifted_value
+        self.__values_count += 1
+        self.__next_updated_index += 1
+        if self.__next_updated_index == self.__window:
+            self.__next_updated_index = 0
+            # Sum again once per full turn of the buffer: O(1) amortized and no accumulation of rounding errors
+            self.__running_sum = sum(self.__data_list)
+            self.__running_sum_of_squares = sum(each_value * each_value for each_value in self.__data_list)
+
+    def count(self) -> int:
+        return min(self.__values_count, self.__window)
+
+    def mean(self) -> float:
+        if self.__values_count == 0:
+            return 0.00
+        return self.__shift + self.__running_sum / self.count()
+
+    def value(self) -> float:
+        values_count = self.count()
+        if values_count == 0:
+            return 0.00
+        shifted_mean = self.__running_sum / values_count
+        # Rounding can make the difference slightly negative
+        return max(self.__running_sum_of_squares / values_count - shifted_mean * shifted_mean, 0.00)
+
+    def standard_deviation(self) -> float:
+        return sqrt(self.value())
+
+    def is_ready(self) -> bool:
+        return self.__values_count >= self.__window
+
+    def window(self) -> int:
+        return self.__window
+
+
+class ZScore(Indicator):
+    # Distance of the last value to the rolling mean, in rolling standard deviations
+    __variance: RollingVariance
+    __last_value: float
+
+    def __init__(self, window: int):
+        super().__init__()
+        self.__variance = RollingVariance(window)
+        self.__last_value = 0.00
+
+    def put(self, value: float):
+        self.__variance.put(value)
+        self.__last_value = value
+
+    def value(self) -> float:
+        standard_deviation = self.__variance.standard_deviation()
+        if standard_deviation == 0.00:
+            return 0.00
+        return (self.__last_value - self.__variance.mean()) / standard_deviation
+
+    def is_ready(self) -> bool:
+        return self.__variance.is_ready()
+
+    def window(self) -> int:
+        return self.__variance.window()
+
+
+class RollingMaximum(Indicator):
+    # Monotonic deque of (index, value): values are decreasing from left to right, the left one is the maximum
+    __window: int
+    __candidates: deque
+    __values_count: int
+
+    def __init__(self, window: int):
+        """
+        Maximum of the last window values (O(1) amortized per value)
+        :param window: number of values
+        """
+        super().__init__()
+        if window <= 0:
+            raise Exception("Please init the class with a window higher than 0")
+        self.__window = window
+        self.__candidates = deque()
+        self.__values_count = 0
+
+    def put(self, value: float):
+        # Smaller (or equal) older values can never be the maximum again
+        while self.__candidates and self.__candidates[-1][1] <= value:
+            self.__candidates.pop()
+        self.__candidates.append((self.__values_count, value))
+        self.__values_count += 1
+        # Drop the value that left the window
+        if self.__candidates[0][0] <= self.__values_count - 1 - self.__window:
+            self.__candidates.popleft()
+
+    def value(self) -> float:
+        if not self.__candidates:
+            return 0.00
+        return self.__candidates[0][1]
+
+    def is_ready(self) -> bool:
+        return self.__values_count >= self.__window
+
+    def window(self) -> int:
+        return self.__window
+
+
+class RollingMinimum(RollingMaximum):
+    # Minimum of the last window values: maximum of the negated values
+
+    def put(self, value: float):
+        super().put(-value)
+
+    def value(self) -> float:
+        return -super().value()
+
+
+class Microprice(BookIndicator):
+    # Mid price weighted by the opposite side's amount
+    __current_value: float
+    __is_set: bool
+
+    def __init__(self):
+        super().__init__()
+        self.__current_value = 0.00
+        self.__is_set = False
+
+    def put_book(self, bid_price: float, bid_amount: float, offer_price: float, offer_amount: float):
+        total_amount = bid_amount + offer_amount
+        if total_amount <= 0.00:
+            return
+        self.__current_value = (bid_price * offer_amount + offer_price * bid_amount) / total_amount
+        self.__is_set = True
+
+    def value(self) -> float:
+        return self.__current_value
+
+    def is_ready(self) -> bool:
+        return self.__is_set
+
+
+class OrderFlowImbalance(BookIndicator):
+    # Order flow imbalance (Cont, Kukanov, Stoikov) summed over the last window top of book changes
+    __window: int
+    __data_list: list
+    __next_updated_index: int
+    __running_sum: float
+    __values_count: int
+    # Previous top of the book
+    __previous_top: tuple
+
+    def __init__(self, window: int):
+        super().__init__()
+        if window <= 0:
+            raise Exception("Please init the class with a window higher than 0")
+        self.__window = window
+        self.__data_list = [0.00] * window
+        self.__next_updated_index = 0
+        self.__running_sum = 0.00
+        self.__values_count = 0
+        self.__previous_top = None
+
+    def put_book(self, bid_price: float, bid_amount: float, offer_price: float, offer_amount: float):
+        if self.__previous_top is None:
+            self.__previous_top = (bid_price, bid_amount, offer_price, offer_amount)
+            return
+        previous_bid_price, previous_bid_amount, previous_offer_price, previous_offer_amount = self.__previous_top
+        flow = 0.00
+        # Bid side: a higher (or same) bid adds demand, a lower (or same) bid removes the previous demand
+        if bid_price >= previous_bid_price:
+            flow += bid_amount
+        if bid_price <= previous_bid_price:
+            flow -= previous_bid_amount
+        # Offer side: mirrored
+        if offer_price <= previous_offer_price:
+            flow -= offer_amount
+        if offer_price >= previous_offer_price:
+            flow += previous_offer_amount
+        self.__previous_top = (bid_price, bid_amount, offer_price, offer_amount)
+
+        self.__running_sum += flow - self.__data_list[self.__next_updated_index]
+        self.__data_list[self.__next_updated_index] = flow
+        self.__values_count += 1
+        self.__next_updated_index += 1
+        if self.__next_updated_index == self.__window:
+            self.__next_updated_index = 0
+            self.__running_sum = sum(self.__data_list)
+
+    def value(self) -> float:
+        return self.__running_sum
+
+    def is_ready(self) -> bool:
+        return self.__values_count >= self.__window
+
+    def window(self) -> int:
+        return self.__window
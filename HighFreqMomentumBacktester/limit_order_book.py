@@ -1,9 +1,12 @@
-import warnings
+import heapq
 
+from book_journal import BookJournal
+from book_recovery_policy import BookRecoveryPolicy
 from curr_pair import CurrPair
 from buy_sell import BuySell
 from new_cancel import NewCancel
 from quote import Quote
+from top_of_book import TopOfBook
 
 
 class LimitOrderBook:
@@ -12,8 +15,11 @@ class LimitOrderBook:
     # Sorted dictionary with prices
     __limit_bids: dict
     __limit_offers: dict
-    # All orders
-    __all_limit_orders: list
+    # Total amount per price level (same keys as __limit_bids and __limit_offers)
+    __limit_bid_amounts: dict
+    __limit_offer_amounts: dict
+    # All orders: ID -> order (in the order of insertion)
+    __all_limit_orders: dict
     # Best bid, offer
     __best_bid_price: float
     __best_offer_price: float
@@ -22,32 +28,139 @@ class LimitOrderBook:
     # Bid/Offer is set (once)
     __is_not_set_bid = True
     __is_not_set_offer = True
-
-    def __init__(self, curr_pair: CurrPair):
+    # What to do with the inconsistent events, and their counters
+    __recovery_policy: BookRecoveryPolicy
+    __unknown_cancel_count: int
+    __duplicate_order_count: int
+    # Number of changes of the book, and the view of the best prices built (once) for the last change
+    __sequence: int
+    __top_of_book: TopOfBook
+    # Receives one record per change of the book (None: no journal)
+    __journal: BookJournal
+
+    def __init__(self, curr_pair: CurrPair, recovery_policy: BookRecoveryPolicy = BookRecoveryPolicy.COUNT_AND_SKIP,
+                 journal: BookJournal = None):
+        """
+        Creates an empty order book
+        :param curr_pair: the currency pair of the orders
+        :param recovery_policy: what to do with a CANCEL of an unknown order or a NEW order with a known ID (skipped
+        by default, as the duplicated NEW orders always were; STRICT raises)
+        :param journal: journal of the changes of the book (optional)
+        """
         self.__curr_pair = curr_pair
         self.__limit_bids = {}
         self.__limit_offers = {}
-        self.__all_limit_orders = []
+        self.__limit_bid_amounts = {}
+        self.__limit_offer_amounts = {}
+        self.__all_limit_orders = {}
+        self.__recovery_policy = recovery_policy
+        self.__unknown_cancel_count = 0
+        self.__duplicate_order_count = 0
+        self.__sequence = 0
+        self.__top_of_book = None
+        self.__journal = journal
 
     def on_new_order(self, quote: Quote):
-        if quote.way() == BuySell.BUY:
+        # Check all the limits: if the ID was inserted previously -> apply the recovery policy
+        if quote.id() in self.__all_limit_orders:
+            if self.__recovery_policy == BookRecoveryPolicy.STRICT:
+                raise RuntimeError("The order with quote ID {} was already added".format(quote.id()))
+            self.__duplicate_order_count += 1
+            if self.__recovery_policy == BookRecoveryPolicy.COUNT_AND_SKIP:
+                return
+            # The latest event describes the order
+            self._remove_order(quote.id())
+        is_bid = quote.way() == BuySell.BUY
+        previous_best_price = self._side_best_price(is_bid) if self.__journal is not None else None
+        if is_bid:
             self._insert_in_bids(quote)
         else:
             self._insert_in_offers(quote)
+        self.__sequence += 1
+        if self.__journal is not None:
+            self._journal_level(is_bid, quote.price(), previous_best_price)
+
+    def on_cancel_order(self, quote: Quote) -> Quote:
+        """
+        Removes the cancelled order from the book
+        :param quote: the CANCEL quote
+        :return: the removed (NEW) order, with its original time, price and amount (None if the order is unknown
+        and the recovery policy is not strict)
+        """
+        if quote.id() not in self.__all_limit_orders:
+            if self.__recovery_policy == BookRecoveryPolicy.STRICT:
+                raise RuntimeError("The order with quote ID {} wasn't found".format(quote.id()))
+            self.__unknown_cancel_count += 1
+            return None
+        return self._remove_order(quote.id())
+
+    def top_of_book(self) -> TopOfBook:
+        """
+        Returns the best prices after the last change of the book. The view is built once per change and shared by
+        all the callers.
+        :return: TopOfBook
+        """
+        if self.__top_of_book is None or self.__top_of_book.sequence != self.__sequence:
+            bid_price = self.get_best_bid_price()
+            offer_price = self.get_best_offer_price()
+            self.__top_of_book = TopOfBook(self.__sequence, bid_price, self.get_best_bid_amount(), offer_price,
+                                           self.get_best_offer_amount(), (bid_price + offer_price) / 2.0,
+                                           offer_price - bid_price, not self.__is_not_set_bid,
+                                           not self.__is_not_set_offer)
+        return self.__top_of_book
+
+    def sequence(self) -> int:
+        """
+        Returns the number of changes (inserted and removed orders) of the book
+        :return:
+        """
+        return self.__sequence
+
+    def journal(self) -> BookJournal:
+        return self.__journal
+
+    def recovery_policy(self) -> BookRecoveryPolicy:
+        return self.__recovery_policy
 
-    def on_cancel_order(self, quote: Quote):
-        self._remove_order(quote.id())
+    def unknown_cancel_count(self) -> int:
+        """
+        Returns the number of CANCEL events skipped because the order was not in the book
+        :return:
+        """
+        return self.__unknown_cancel_count
+
+    def get_order(self, quote_id: int) -> Quote:
+        """
+        Returns the order of the book with an ID
+        :param quote_id: ID of the order
+        :return: the NEW quote inserted in the book (None if no order of the book has this ID)
+        """
+        return self.__all_limit_orders.get(quote_id)
+
+    def duplicate_order_count(self) -> int:
+        """
+        Returns the number of NEW orders whose ID was already in the book (skipped or replacing the previous order)
+        :return:
+        """
+        return self.__duplicate_order_count
+
+    def currency_pair(self) -> CurrPair:
+        """
+        Returns the currency pair of this order book
+        :return:
+        """
+        return self.__curr_pair
 
     def count_bids(self):
         bids: int = 0
-        for each_order in self.__all_limit_orders:
+        for each_order in self.__all_limit_orders.values():
             if each_order.way() == BuySell.BUY:
                 bids += 1
         return bids
 
     def count_offers(self):
         offers: int = 0
-        for each_order in self.__all_limit_orders:
+        for each_order in self.__all_limit_orders.values():
             if each_order.way() == BuySell.SELL:
                 offers += 1
         return offers
@@ -72,6 +185,48 @@ class LimitOrderBook:
             return None
         return self.__best_offer
 
+    def get_best_bid_amount(self) -> float:
+        """
+        Returns the total amount of the best bid price level
+        :return:
+        """
+        if self.__is_not_set_bid:
+            return 0.00
+        return self.__limit_bid_amounts.get(self.__best_bid_price, 0.00)
+
+    def get_best_offer_amount(self) -> float:
+        """
+        Returns the total amount of the best offer price level
+        :return:
+        """
+        if self.__is_not_set_offer:
+            return 0.00
+        return self.__limit_offer_amounts.get(self.__best_offer_price, 0.00)
+
+    def get_top_levels(self, way: BuySell, depth: int) -> list:
+        """
+        Returns the best price levels of one side
+        :param way: Buy (for BID side); Sell (for OFFER side)
+        :param depth: number of levels
+        :return: list of (price, total amount), best level first
+        """
+        if way == BuySell.BUY:
+            prices = heapq.nlargest(depth, self.__limit_bid_amounts.keys())
+            return [(price, self.__limit_bid_amounts[price]) for price in prices]
+        prices = heapq.nsmallest(depth, self.__limit_offer_amounts.keys())
+        return [(price, self.__limit_offer_amounts[price]) for price in prices]
+
+    def get_level_rank(self, way: BuySell, price: float) -> int:
+        """
+        Returns the rank of a price level: 0 for the best price, 1 for the next one...
+        :param way: Buy (for BID side); Sell (for OFFER side)
+        :param price: the price of the level
+        :return: number of levels with a better price on that side
+        """
+        if way == BuySell.BUY:
+            return sum(1 for level_price in self.__limit_bid_amounts if level_price > price)
+        return sum(1 for level_price in self.__limit_offer_amounts if level_price < price)
+
     def get_best_orders_by_amount(self, way: BuySell, amount: float) -> Quote:
         """
         Returns the best limit order for the given way and amount
@@ -84,7 +239,7 @@ class LimitOrderBook:
             return None
         each_order: Quote
         retained_order: Quote = None
-        for each_order in self.__all_limit_orders:
+        for each_order in self.__all_limit_orders.values():
             # Match volume
             if each_order.way() == way and each_order.amount() >= amount:
                 # First time check
@@ -108,12 +263,6 @@ class LimitOrderBook:
             self.__best_bid_price = quote.price()
             self.__is_not_set_bid = False
 
-        # Check all the limits: if the ID was inserted previously -> skip
-        for each_order in self.__all_limit_orders:
-            if each_order.id() == quote.id():
-                warnings.warn("Duplicate ID added. Skipping", RuntimeWarning)
-                return
-
         # Check that the price is a new level.
         if quote.price() not in self.__limit_bids.keys():
             # Create a new list. Insert.
@@ -121,8 +270,9 @@ class LimitOrderBook:
         else:
             # This bid doesn't exist in the collection. Add it to the end.
             self.__limit_bids[quote.price()].append(quote)
+        self.__limit_bid_amounts[quote.price()] = self.__limit_bid_amounts.get(quote.price(), 0.00) + quote.amount()
 
-        self.__all_limit_orders.append(quote)
+        self.__all_limit_orders[quote.id()] = quote
 
         # Update the most used statistics
         if self.__best_bid.compare(quote) > 0:
@@ -141,12 +291,6 @@ class LimitOrderBook:
             self.__best_offer_price = quote.price()
             self.__is_not_set_offer = False
 
-        # Check all the limits: if the ID was inserted previously -> skip
-        for each_order in self.__all_limit_orders:
-            if each_order.id() == quote.id():
-                warnings.warn("Duplicate ID added. Skipping", RuntimeWarning)
-                return
-
         # Check that the price is a new level.
         if quote.price() not in self.__limit_offers.keys():
             # Create a new list. Insert.
@@ -154,8 +298,10 @@ class LimitOrderBook:
         else:
             # This offer doesn't exist in the collection. Add it to the end.
             self.__limit_offers[quote.price()].append(quote)
+        self.__limit_offer_amounts[quote.price()] = self.__limit_offer_amounts.get(quote.price(), 0.00) + \
+            quote.amount()
 
-        self.__all_limit_orders.append(quote)
+        self.__all_limit_orders[quote.id()] = quote
 
         # Update the most used statistics
         if self.__best_offer.compare(quote) > 0:
@@ -165,24 +311,46 @@ class LimitOrderBook:
     def _remove_order(self, quote_id: int):
         """
         Finds the order by its ID in the whole collection and removes it
-        :param quote_id:
-        :return:
+        :param quote_id: ID of an order of the book
+        :return: the removed order
         """
-        order_found: Quote = None
-        for order in self.__all_limit_orders:
-            if order.id() == quote_id:
-                order_found = order
-                break
-
-        if order_found is None:
-            raise RuntimeError("The order with quote ID {} wasn't found".format(quote_id))
+        order_found: Quote = self.__all_limit_orders.pop(quote_id)
 
-        if order_found.way() == BuySell.BUY:
+        is_bid = order_found.way() == BuySell.BUY
+        previous_best_price = self._side_best_price(is_bid) if self.__journal is not None else None
+        if is_bid:
             self._remove_from_bids(order_found)
         else:
             self._remove_from_offers(order_found)
+        self.__sequence += 1
+        if self.__journal is not None:
+            self._journal_level(is_bid, order_found.price(), previous_best_price)
+        return order_found
 
-        self.__all_limit_orders.remove(order_found)
+    def _side_best_price(self, is_bid: bool) -> float:
+        """
+        Returns the best price of a side, None if the side is empty
+        """
+        if is_bid:
+            return None if self.__is_not_set_bid else self.__best_bid_price
+        return None if self.__is_not_set_offer else self.__best_offer_price
+
+    def _journal_level(self, is_bid: bool, price: float, previous_best_price: float):
+        """
+        Appends the new state of a changed price level to the journal
+        :param is_bid: side of the level
+        :param price: price of the level
+        :param previous_best_price: best price of the side before the change (None if it was empty)
+        """
+        level_orders = (self.__limit_bids if is_bid else self.__limit_offers).get(price)
+        if level_orders is None:
+            level_amount = 0.00
+            level_count = 0
+        else:
+            level_amount = (self.__limit_bid_amounts if is_bid else self.__limit_offer_amounts)[price]
+            level_count = len(level_orders)
+        self.__journal.append(self.__sequence, price, level_amount, level_count, is_bid,
+                              self._side_best_price(is_bid) != previous_best_price)
 
     def _remove_from_bids(self, quote):
         """
@@ -195,16 +363,18 @@ class LimitOrderBook:
 
         # Remove the order from the limit
         self.__limit_bids[quote.price()].remove(quote)
+        self.__limit_bid_amounts[quote.price()] -= quote.amount()
         # There are no bids left on this limit => remove it from the dictionary
         if len(self.__limit_bids[quote.price()]) == 0:
             self.__limit_bids.pop(quote.price())
+            self.__limit_bid_amounts.pop(quote.price())
 
         # Check that there is still some data in the collection.
         if len(self.__limit_bids) == 0:
-            self.__is_not_set_offer = True
+            self.__is_not_set_bid = True
 
         # Find new best bid
-        if is_updating_best_bid and not self.__is_not_set_offer:
+        if is_updating_best_bid and not self.__is_not_set_bid:
             new_best_bid = 0.00
             for next_bid in self.__limit_bids.keys():
                 if new_best_bid < next_bid:
@@ -225,9 +395,11 @@ class LimitOrderBook:
 
         # Remove the order from the limit
         self.__limit_offers[quote.price()].remove(quote)
+        self.__limit_offer_amounts[quote.price()] -= quote.amount()
         # There are no bids left on this limit => remove it from the dictionary
         if len(self.__limit_offers[quote.price()]) == 0:
             self.__limit_offers.pop(quote.price())
+            self.__limit_offer_amounts.pop(quote.price())
 
         # Check that there is still some data in the collection.
         if len(self.__limit_offers) == 0:
@@ -0,0 +1,15 @@
+# Small reproducible logs for the tests, written by FixLogGenerator.
+from fix_log_generator import FixLogGenerator
+
+
+def generate_rows(row_count: int, seed: int, pair_names: list = None) -> list:
+    """
+    Generates a reproducible list of NEW/CANCEL rows, orders placed 1 to 4 ticks away from the mid
+    :param row_count: number of rows
+    :param seed: seed of the generator
+    :param pair_names: pairs of the rows (default: USD/CHF)
+    :return: list of rows
+    """
+    generator = FixLogGenerator(pair_names if pair_names is not None else ["USD/CHF"], depth=4, cancel_ratio=0.7,
+                                seed=seed)
+    return [row for block in generator.generate_rows(row_count) for row in block]
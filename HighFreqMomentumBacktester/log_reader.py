@@ -0,0 +1,224 @@
+# Reads the FIX logs line by line, plain or compressed (gzip or zstd).
+#
+# For a compressed log the decompression runs in a background thread that feeds decompressed blocks to the parser
+# through a bounded queue. zlib and zstandard release the GIL while they decompress, so the decompression of the
+# next blocks overlaps with the book replay of the current one; the bounded queue caps the memory used when the
+# replay is the slower side.
+import gzip
+import queue
+import threading
+
+# First bytes of the compressed files
+GZIP_MAGIC_NUMBER = b'\x1f\x8b'
+ZSTD_MAGIC_NUMBER = b'\x28\xb5\x2f\xfd'
+
+# Size of the decompressed blocks
+DEFAULT_BLOCK_SIZE = 1 << 20
+# Decompressed blocks waiting for the parser
+DEFAULT_MAX_PENDING_BLOCKS = 16
+
+
+def detect_compression(file_name: str) -> str:
+    """
+    Detects the compression of a file from its first bytes
+    :param file_name: the log file
+    :return: "gzip", "zstd" or None for a plain text file
+    """
+    with open(file_name, 'rb') as file_reader:
+        magic_number = file_reader.read(4)
+    if magic_number.startswith(GZIP_MAGIC_NUMBER):
+        return "gzip"
+    if magic_number.startswith(ZSTD_MAGIC_NUMBER):
+        return "zstd"
+    return None
+
+
+def open_decompressed_stream(file_name: str):
+    """
+    Opens the file and returns a binary stream of its decompressed content
+    :param file_name: the log file (plain, gzip or zstd)
+    :return: a binary file object
+    """
+    compression = detect_compression(file_name)
+    if compression == "gzip":
+        return gzip.open(file_name, 'rb')
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Please install the zstandard package to read the zstd compressed file {0}"
+                               .format(file_name))
+        return zstandard.ZstdDecompressor().stream_reader(open(file_name, 'rb'), closefd=True)
+    return open(file_name, 'rb')
+
+
+def count_lines(file_name: str, block_size: int = DEFAULT_BLOCK_SIZE) -> int:
+    """
+    Counts the lines of a (possibly compressed) log file. A last line without a line feed is counted.
+    :param file_name: the log file
+    :param block_size: size of the blocks read
+    :return: number of lines
+    """
+    line_count = 0
+    last_block = b''
+    with open_decompressed_stream(file_name) as stream:
+        block = stream.read(block_size)
+        while block:
+            line_count += block.count(b'\n')
+            last_block = block
+            block = stream.read(block_size)
+    if last_block and not last_block.endswith(b'\n'):
+        line_count += 1
+    return line_count
+
+
+class LogReader:
+    # Decompressed stream (plain files only: the compressed ones are read by the decompression thread)
+    __plain_stream: object
+    # Decompression thread and its queue of blocks (None marks the end of the stream)
+    __decompression_thread: threading.Thread
+    __blocks: queue.Queue
+    __stop_event: threading.Event
+    # Current block and position of the next line in it
+    __buffer: bytes
+    __buffer_position: int
+    # Offset, in the decompressed stream, of the start of __buffer
+    __buffer_offset: int
+    __is_end_of_stream: bool
+
+    def __init__(self, file_name: str, block_size: int = DEFAULT_BLOCK_SIZE,
+                 max_pending_blocks: int = DEFAULT_MAX_PENDING_BLOCKS):
+        """
+        Opens a log file. Plain files are read directly, compressed files are decompressed by a background thread.
+        :param file_name: the log file (plain, gzip or zstd)
+        :param block_size: size of the decompressed blocks
+        :param max_pending_blocks: maximal number of decompressed blocks waiting for the parser
+        """
+        self.__plain_stream = None
+        self.__decompression_thread = None
+        self.__blocks = None
+        self.__stop_event = threading.Event()
+        self.__buffer = b''
+        self.__buffer_position = 0
+        self.__buffer_offset = 0
+        self.__is_end_of_stream = False
+        if detect_compression(file_name) is None:
+            self.__plain_stream = open(file_name, 'rb')
+        else:
+            self.__blocks = queue.Queue(maxsize=max_pending_blocks)
+            self.__decompression_thread = threading.Thread(target=self._decompress,
+                                                           args=(file_name, block_size), daemon=True)
+            self.__decompression_thread.start()
+
+    def readline(self) -> bytes:
+        """
+        Returns the next line (with its line feed), b'' at the end of the file
+        :return:
+        """
+        if self.__plain_stream is not None:
+            return self.__plain_stream.readline()
+        line_end = self.__buffer.find(b'\n', self.__buffer_position)
+        while line_end < 0 and not self.__is_end_of_stream:
+            # The line continues in the next block
+            self._append_next_block()
+            line_end = self.__buffer.find(b'\n', self.__buffer_position)
+        if line_end < 0:
+            # Last line without line feed (or end of file)
+            line_end = len(self.__buffer) - 1
+        line = self.__buffer[self.__buffer_position:line_end + 1]
+        self.__buffer_position = line_end + 1
+        return line
+
+    def tell(self) -> int:
+        """
+        Returns the offset of the next line in the decompressed content
+        :return:
+        """
+        if self.__plain_stream is not None:
+            return self.__plain_stream.tell()
+        return self.__buffer_offset + self.__buffer_position
+
+    def seek(self, offset: int):
+        """
+        Moves to an offset of the decompressed content (e.g. a snapshot's byte offset). A compressed stream can only
+        move forward: the skipped content is decompressed but not parsed.
+        :param offset: offset returned by tell()
+        :return:
+        """
+        if self.__plain_stream is not None:
+            self.__plain_stream.seek(offset)
+            return
+        if offset < self.tell():
+            raise RuntimeError("A compressed log cannot be read backwards (from {0} to {1})"
+                               .format(self.tell(), offset))
+        while self.__buffer_offset + len(self.__buffer) < offset and not self.__is_end_of_stream:
+            self.__buffer_offset += len(self.__buffer)
+            self.__buffer = b''
+            self.__buffer_position = 0
+            self._append_next_block()
+        self.__buffer_position = min(offset - self.__buffer_offset, len(self.__buffer))
+
+    def close(self):
+        if self.__plain_stream is not None:
+            self.__plain_stream.close()
+        if self.__decompression_thread is not None:
+            self.__stop_event.set()
+            self.__decompression_thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        line = self.readline()
+        while line:
+            yield line
+            line = self.readline()
+
+    def _append_next_block(self):
+        """
+        Appends the next decompressed block to the unread part of the buffer
+        :return:
+        """
+        block = self.__blocks.get()
+        if isinstance(block, Exception):
+            self.__is_end_of_stream = True
+            raise block
+        if block is None:
+            self.__is_end_of_stream = True
+            return
+        # Drop the lines already read
+        self.__buffer_offset += self.__buffer_position
+        self.__buffer = self.__buffer[self.__buffer_position:] + block
+        self.__buffer_position = 0
+
+    def _decompress(self, file_name: str, block_size: int):
+        """
+        Body of the decompression thread: reads blocks until the end of the file or close()
+        """
+        try:
+            with open_decompressed_stream(file_name) as stream:
+                block = stream.read(block_size)
+                while block:
+                    if not self._put_block(block):
+                        return
+                    block = stream.read(block_size)
+            self._put_block(None)
+        except Exception as exception:
+            # Raised again by the reader
+            self._put_block(exception)
+
+    def _put_block(self, block) -> bool:
+        """
+        Waits for room in the queue
+        :return: False if the reader was closed
+        """
+        while not self.__stop_event.is_set():
+            try:
+                self.__blocks.put(block, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
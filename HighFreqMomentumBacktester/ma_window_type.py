@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+# Enumerates the units of the moving averages windows: number of NEW quotes or wall-clock milliseconds
+class MaWindowType(Enum):
+    TICKS = 0
+    MILLISECONDS = 1
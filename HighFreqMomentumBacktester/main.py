@@ -1,93 +1,580 @@
 # Entry point for the backtester.
-from quote import Quote
-from momentum_strategy import MomentumStrategy
-from trade_situation import TradeSituation
-from limit_order_book import LimitOrderBook
-from curr_pair import CurrPair
-from new_cancel import NewCancel
-from reduce_mem_usage import reduce_mem_usage
-
-
-# Some static functions
-def count_rows_in_file(file_name: str) -> int:
-    row_count_local: int = 0
-    with open(file_name, 'r') as file_reader:
-        chunk = file_reader.readline()
-        while chunk != '':
-            row_count_local += 1
-            chunk = file_reader.readline()
-    return row_count_local
-
-
-# Filename
-data_file_name = "/C:\Users\pierr\Documents\Etudes\Dauphine\M2_IEF\Analyse Quantitative avec Python\Projet/livefix-log-18Jan-09-52-10-774.csv"
-
-# count lines
-row_count: float = count_rows_in_file(data_file_name)
-print("Total {0} rows in {1}.".format(row_count, data_file_name))
-
-# Create a placeholder for all the data:
-quotes: tuple = (None,) * row_count
-
-# Create an instance of MomentumStrategy class
-# THE AMOUNT IS USED FOR PRICE REFERENCE!
-traded_amount = 300000.00
-target_profit = 0.00003
-curr_pair = CurrPair.EURUSD
-strategy = MomentumStrategy(10, 2, target_profit, traded_amount, True)
-limit_order_book = LimitOrderBook(curr_pair)
-
-MomentumStrategy.set_limit_order_book(limit_order_book)
-TradeSituation.set_limit_order_book(limit_order_book)
-
-# FOR loop on quotes: create the Quote instance objects (one per quote line) and feed it (step()) to the strategy object
-lines_read_so_far: float = 0.0
-with open(data_file_name, 'r') as reader_obj:
-    while lines_read_so_far < row_count:
-        row = reader_obj.readline()
-        # recognize the row's contents
-        quote = Quote(row)
-        if quote.currency_pair() == curr_pair:
-            # Update order book
+#
+# Usage:
+#   python main.py livefix-log.csv --pair EUR/USD --ma-slow 10 --ma-fast 2 --target-profit 0.00003
+#   python main.py livefix-log.csv --resume
+#   python main.py livefix-log.csv --cache-dir ~/.backtest-cache
+#   python main.py livefix-log.csv --robustness-samples 10000 --robustness-method reorder
+#   python main.py livefix-log.csv --mode portfolio --pairs EUR/USD USD/CHF --exposure-limit USD=2000000
+#   python main.py livefix-log.csv --mode walk-forward --in-sample 200000 --out-of-sample 50000 --grid-ma-slow 10 20
+#
+# Only the standard library is imported at start up: the backtester modules are imported by the mode that needs them,
+# so scripted runs over many small session files are not dominated by the import time.
+import time
+
+startup_begin_time = time.perf_counter()
+
+import argparse
+import os
+
+MODE_BACKTEST = "backtest"
+MODE_WALK_FORWARD = "walk-forward"
+MODE_PORTFOLIO = "portfolio"
+BOOK_RECOVERY_STRICT = "strict"
+BOOK_RECOVERY_SKIP = "skip"
+BOOK_RECOVERY_RESYNC = "resync"
+# Columns of the bars file (--bars-ms)
+BARS_HEADER = "start_time;open_mid;high_mid;low_mid;close_mid;open_spread;high_spread;low_spread;close_spread;" \
+              "update_count\n"
+BARS_ROW_FORMAT = "{0};{1:.6f};{2:.6f};{3:.6f};{4:.6f};{5:.6f};{6:.6f};{7:.6f};{8:.6f};{9}\n"
+ROBUSTNESS_BLOCK_BOOTSTRAP = "block-bootstrap"
+ROBUSTNESS_REORDER = "reorder"
+
+
+def parse_arguments(argv: list = None) -> argparse.Namespace:
+    """
+    Reads the command line
+    :param argv: the arguments (sys.argv[1:] if None)
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="High frequency momentum backtester")
+    parser.add_argument("data_file_name", help="FIX log file (N;... and C;... rows), plain or gzip/zstd compressed")
+    parser.add_argument("--mode", choices=[MODE_BACKTEST, MODE_WALK_FORWARD, MODE_PORTFOLIO], default=MODE_BACKTEST)
+    parser.add_argument("--pair", default="EUR/USD", help="traded currency pair (XXX/YYY)")
+    # Strategy parameters
+    parser.add_argument("--ma-slow", type=int, default=10, help="slow moving average window")
+    parser.add_argument("--ma-fast", type=int, default=2, help="fast moving average window")
+    parser.add_argument("--ma-window-ms", action="store_true",
+                        help="the moving average windows are milliseconds instead of numbers of NEW quotes")
+    parser.add_argument("--target-profit", type=float, default=0.00003)
+    parser.add_argument("--max-open-positions", type=int, default=1,
+                        help="pyramiding: positions opened while the trading way does not change")
+    # THE AMOUNT IS USED FOR PRICE REFERENCE!
+    parser.add_argument("--traded-amount", type=float, default=300000.00)
+    parser.add_argument("--price-by-amount", action="store_true",
+                        help="calculate the PnL with the best order for the traded amount instead of the best price")
+    parser.add_argument("--price-per-mil", type=float, default=10.00, help="transaction price per million")
+    parser.add_argument("--pair-commission", nargs="+", default=[], metavar="XXX/YYY=PRICE",
+                        help="transaction price per million of some pairs (instead of --price-per-mil)")
+    parser.add_argument("--spread-cost-share", type=float, default=0.0,
+                        help="share of the spread of the book paid at the opening and at the closing")
+    parser.add_argument("--slippage", type=float, default=0.0,
+                        help="price impact of a trade of --slippage-reference-amount (price units)")
+    parser.add_argument("--slippage-reference-amount", type=float, default=1000000.00)
+    parser.add_argument("--slippage-exponent", type=float, default=0.5, help="size dependence of the price impact")
+    # Backtest mode
+    parser.add_argument("--resume", action="store_true", help="continue from the last snapshot")
+    parser.add_argument("--snapshot-every", type=int, default=1000000,
+                        help="save the replay state every N lines (0 disables the snapshots)")
+    parser.add_argument("--conflation-depth", type=int, default=0,
+                        help="step the strategy only when the N best levels changed (0 disables the conflation)")
+    parser.add_argument("--conflation-interval-us", type=int, default=0,
+                        help="step the strategy at most once per N microseconds")
+    parser.add_argument("--book-recovery", choices=[BOOK_RECOVERY_STRICT, BOOK_RECOVERY_SKIP, BOOK_RECOVERY_RESYNC],
+                        default=BOOK_RECOVERY_SKIP,
+                        help="on a CANCEL of an unknown order or a duplicated NEW order: raise, skip, or skip the "
+                             "CANCEL and replace the order (the skipped events are counted)")
+    parser.add_argument("--lifecycle-stats", action="store_true",
+                        help="report order resting times, cancel/new ratio and update rates")
+    parser.add_argument("--latency-analysis", action="store_true",
+                        help="report the feed latency, gaps, bursts and out of order events (all pairs)")
+    parser.add_argument("--clock-offset-us", type=int, default=None,
+                        help="local minus exchange clock in microseconds (default: the first event is the reference)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="reuse the results of the same file, parameters and code stored in this directory (not "
+                             "used with --resume or the options only produced by a replay)")
+    parser.add_argument("--cache-max-mb", type=int, default=256, help="size of the result cache (least recently "
+                                                                      "used results are deleted)")
+    parser.add_argument("--record-book-changes", default=None, metavar="FILE",
+                        help="record one binary record per change of the book (price level, amount, best change)")
+    parser.add_argument("--journal-capacity", type=int, default=65536,
+                        help="records kept in memory by the book journal before they are written")
+    parser.add_argument("--bars-ms", type=float, default=0.0,
+                        help="build OHLC bars of the mid and the spread over intervals of N ms (e.g. 100, 1000)")
+    parser.add_argument("--bars-file", default=None, help="CSV file of the bars (default: <data file>.bars.csv)")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="trace the allocations (slower) and report the memory per component over the replay")
+    parser.add_argument("--memory-every", type=int, default=1000000, help="lines between two memory samples")
+    parser.add_argument("--memory-frames", type=int, default=1,
+                        help="frames per traced allocation (more frames attribute the standard library to callers)")
+    parser.add_argument("--parse-workers", type=int, default=1,
+                        help="parse the (plain text) file with N processes before the replay (no snapshots)")
+    parser.add_argument("--robustness-samples", type=int, default=0,
+                        help="resample the positions N times and report confidence intervals of the statistics")
+    parser.add_argument("--robustness-method", choices=[ROBUSTNESS_BLOCK_BOOTSTRAP, ROBUSTNESS_REORDER],
+                        default=ROBUSTNESS_BLOCK_BOOTSTRAP)
+    parser.add_argument("--block-length", type=int, default=None,
+                        help="positions per block of the bootstrap (default: cube root of the number of positions)")
+    parser.add_argument("--robustness-seed", type=int, default=None)
+    # Portfolio mode
+    parser.add_argument("--pairs", nargs="+", default=None, help="pairs traded together (default: --pair)")
+    parser.add_argument("--base-currency", default="USD", help="currency of the portfolio PnL")
+    parser.add_argument("--exposure-limit", nargs="+", default=[], metavar="CCY=AMOUNT",
+                        help="maximal absolute net exposure per currency")
+    # Walk-forward mode
+    parser.add_argument("--in-sample", type=int, default=200000, help="in-sample length (events of the pair)")
+    parser.add_argument("--out-of-sample", type=int, default=50000, help="out-of-sample length (events of the pair)")
+    parser.add_argument("--grid-ma-slow", type=int, nargs="+", default=[10, 20, 50])
+    parser.add_argument("--grid-ma-fast", type=int, nargs="+", default=[2, 5])
+    parser.add_argument("--grid-target-profit", type=float, nargs="+", default=[0.00002, 0.00003, 0.00005])
+    parser.add_argument("--objective", default="net_profit", help="PerformanceSummary field maximised in-sample")
+    # Walk-forward mode and robustness analysis
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all the cores)")
+    return parser.parse_args(argv)
+
+
+def run_backtest(arguments: argparse.Namespace):
+    """
+    Replays the log file through the order book and the strategy, then prints the statistics
+    :param arguments: the parsed command line
+    :return:
+    """
+    from quote import Quote
+    from momentum_strategy import MomentumStrategy
+    from trade_situation import TradeSituation
+    from limit_order_book import LimitOrderBook
+    from curr_pair import read_string_rep
+    from new_cancel import NewCancel
+    from ma_window_type import MaWindowType
+    from book_recovery_policy import BookRecoveryPolicy
+    from backtest_snapshot import BacktestSnapshot
+    from quote_conflator import QuoteConflator
+    from log_reader import LogReader, count_lines, detect_compression
+    from order_lifecycle_statistics import OrderLifecycleStatistics
+
+    data_file_name = arguments.data_file_name
+    curr_pair = read_string_rep(arguments.pair)
+    cost_model = build_cost_model(arguments)
+
+    memory_report = None
+    if arguments.memory_report:
+        from memory_report import MemoryReport
+        # Started before the book and the strategy are created so their allocations are traced
+        memory_report = MemoryReport(arguments.memory_every, traceback_frames=arguments.memory_frames)
+
+    result_cache = None
+    # The changes of the book, the bars and the diagnostics (lifecycle, feed latency, memory) are only produced by a
+    # replay
+    is_replay_output = arguments.record_book_changes is not None or arguments.bars_ms > 0.0 or \
+        arguments.lifecycle_stats or arguments.latency_analysis or arguments.memory_report
+    if arguments.cache_dir is not None and not arguments.resume and not is_replay_output:
+        from result_cache import ResultCache
+        result_cache = ResultCache(arguments.cache_dir, arguments.cache_max_mb * 1024 * 1024)
+        # The costs are calculated from the cached ledger: a new schedule does not need a replay
+        cached_result = result_cache.get(data_file_name, result_parameters(arguments), arguments.traded_amount,
+                                         arguments.price_per_mil, cost_model, curr_pair)
+        if cached_result is not None:
+            print("Result of {0} read from the cache {1}.".format(data_file_name, arguments.cache_dir))
+            print_ledger_statistics(*cached_result, cost_model, curr_pair)
+            print_robustness(cached_result[0], arguments)
+            return
+    # Snapshots: the replay state is saved every snapshot_every_lines lines. Run with --resume to continue from the
+    # last snapshot after a crash.
+    snapshot_file_name = data_file_name + ".snapshot"
+    snapshot_every_lines = arguments.snapshot_every
+
+    is_parallel_parsing = arguments.parse_workers > 1
+    if is_parallel_parsing and arguments.resume:
+        raise RuntimeError("--resume cannot be used with --parse-workers: the snapshots need the sequential reader")
+    if arguments.record_book_changes is not None and arguments.resume:
+        raise RuntimeError("--resume cannot be used with --record-book-changes: the recording starts with the file")
+    if arguments.bars_ms > 0.0 and arguments.resume:
+        raise RuntimeError("--resume cannot be used with --bars-ms: the bars are built from the first line")
+
+    # Imports and set up only: the counting (or the parallel parsing) below reads the whole file
+    print("Startup time: {0:2.1f} ms.".format(1000.0 * (time.perf_counter() - startup_begin_time)))
+
+    if is_parallel_parsing:
+        from parallel_parser import parse_file_in_parallel
+        # The rows are parsed by all the processes at once. The replay below stays sequential.
+        parsed_columns = parse_file_in_parallel(data_file_name, arguments.parse_workers)
+        row_count: float = len(parsed_columns)
+        snapshot_every_lines = 0
+    elif detect_compression(data_file_name) is None:
+        # count lines
+        row_count: float = count_lines(data_file_name)
+    else:
+        # Counting the lines would decompress the whole file once more, in this thread: the progress shows the
+        # decompressed size instead
+        row_count: float = None
+    if row_count is not None:
+        print("Total {0} rows in {1}.".format(row_count, data_file_name))
+    else:
+        print("Reading the compressed file {0}.".format(data_file_name))
+
+    quote: Quote = None
+    lines_read_so_far: float = 0.0
+    start_byte_offset: int = 0
+    snapshot: BacktestSnapshot = None
+    if arguments.resume and os.path.exists(snapshot_file_name):
+        # Restore the strategy, the order book and the ID generators. The replay continues after the last saved line.
+        snapshot = BacktestSnapshot.load(snapshot_file_name)
+        strategy = snapshot.strategy()
+        limit_order_book = snapshot.limit_order_book()
+        quote = snapshot.last_quote()
+        lines_read_so_far = snapshot.lines_read()
+        start_byte_offset = snapshot.byte_offset()
+        print("Resuming from {0} after {1} lines.".format(snapshot_file_name, lines_read_so_far))
+    else:
+        # Create an instance of MomentumStrategy class
+        ma_window_type = MaWindowType.MILLISECONDS if arguments.ma_window_ms else MaWindowType.TICKS
+        strategy = MomentumStrategy(arguments.ma_slow, arguments.ma_fast, arguments.target_profit,
+                                    arguments.traded_amount, not arguments.price_by_amount,
+                                    ma_window_type=ma_window_type, max_open_positions=arguments.max_open_positions)
+        recovery_policy = {BOOK_RECOVERY_STRICT: BookRecoveryPolicy.STRICT,
+                           BOOK_RECOVERY_SKIP: BookRecoveryPolicy.COUNT_AND_SKIP,
+                           BOOK_RECOVERY_RESYNC: BookRecoveryPolicy.RESYNC}[arguments.book_recovery]
+        book_journal = None
+        if arguments.record_book_changes is not None:
+            from book_journal import BookJournal
+            book_journal = BookJournal(arguments.journal_capacity)
+        limit_order_book = LimitOrderBook(curr_pair, recovery_policy, book_journal)
+
+        MomentumStrategy.set_limit_order_book(limit_order_book)
+        TradeSituation.set_limit_order_book(limit_order_book)
+
+    quote_conflator: QuoteConflator = None
+    if arguments.conflation_depth > 0:
+        if snapshot is not None and snapshot.quote_conflator() is not None:
+            # The restored stage compares the next events with the last state emitted before the snapshot
+            quote_conflator = snapshot.quote_conflator()
+        else:
+            quote_conflator = QuoteConflator(limit_order_book, arguments.conflation_depth,
+                                             arguments.conflation_interval_us)
+
+    order_lifecycle_statistics: OrderLifecycleStatistics = None
+    if arguments.lifecycle_stats:
+        order_lifecycle_statistics = OrderLifecycleStatistics()
+
+    book_journal_recorder = None
+    if limit_order_book.journal() is not None:
+        from book_journal import BookJournalRecorder
+        book_journal_recorder = BookJournalRecorder(limit_order_book.journal(), arguments.record_book_changes)
+
+    bar_builder = None
+    bars_writer = None
+    if arguments.bars_ms > 0.0:
+        from bar_builder import BarBuilder
+        bar_builder = BarBuilder(arguments.bars_ms)
+        bars_file_name = arguments.bars_file if arguments.bars_file is not None else data_file_name + ".bars.csv"
+
+    feed_latency_analyser = None
+    if arguments.latency_analysis:
+        from feed_latency_analyser import FeedLatencyAnalyser
+        feed_latency_analyser = FeedLatencyAnalyser(arguments.clock_offset_us)
+
+    # FOR loop on quotes: create the Quote instance objects (one per quote line) and feed it (step()) to the strategy
+    # object. tell() returns the byte offset (in the decompressed content) stored in the snapshots.
+    if is_parallel_parsing:
+        reader_obj = None
+        quotes_source = parsed_columns.iter_quotes()
+    else:
+        reader_obj = LogReader(data_file_name)
+        reader_obj.seek(start_byte_offset)
+        # recognize the rows' contents
+        quotes_source = (Quote(row.decode()) for row in reader_obj)
+    try:
+        if bar_builder is not None:
+            bars_writer = open(bars_file_name, 'w')
+            bars_writer.write(BARS_HEADER)
+        for quote in quotes_source:
+            if feed_latency_analyser is not None:
+                feed_latency_analyser.on_quote(quote)
+            if quote.currency_pair() == curr_pair:
+                # Update order book
+                if quote.type() == NewCancel.NEW:
+                    limit_order_book.on_new_order(quote)
+                    if order_lifecycle_statistics is not None:
+                        order_lifecycle_statistics.on_new_order(quote, limit_order_book)
+                    # Update strategy: by construction this ECN sends an update to the price immediately.
+                    # The cancels are ignored for the strategy updates.
+                    if quote_conflator is None or quote_conflator.on_book_update(quote):
+                        strategy.step(quote, limit_order_book.top_of_book())
+                else:
+                    removed_order = limit_order_book.on_cancel_order(quote)
+                    if order_lifecycle_statistics is not None:
+                        order_lifecycle_statistics.on_cancel_order(quote, removed_order)
+                if book_journal_recorder is not None:
+                    book_journal_recorder.drain_if_half_full()
+                if bar_builder is not None:
+                    bar = bar_builder.on_top_of_book(quote.time(), limit_order_book.top_of_book())
+                    if bar is not None:
+                        bars_writer.write(BARS_ROW_FORMAT.format(*bar))
+            # Update user interface statistics
+            lines_read_so_far += 1.0
+            if memory_report is not None:
+                memory_report.on_lines_read(int(lines_read_so_far))
+            # Output statistics to user:
+            if lines_read_so_far % 100000 == 0:
+                if row_count is not None:
+                    print("Read {0} lines ({1:2.2f}%)".format(lines_read_so_far,
+                                                             100.00 * lines_read_so_far / row_count))
+                else:
+                    print("Read {0} lines ({1:2.1f} MB decompressed)".format(lines_read_so_far,
+                                                                           reader_obj.tell() / (1024.0 * 1024.0)))
+            # Save the replay state
+            if snapshot_every_lines > 0 and lines_read_so_far % snapshot_every_lines == 0:
+                BacktestSnapshot(reader_obj.tell(), lines_read_so_far, quote, strategy, limit_order_book,
+                                 quote_conflator).save(snapshot_file_name)
+    finally:
+        quotes_source.close()
+        if book_journal_recorder is not None:
+            book_journal_recorder.close()
+        if bars_writer is not None:
+            bar = bar_builder.flush()
+            if bar is not None:
+                bars_writer.write(BARS_ROW_FORMAT.format(*bar))
+            bars_writer.close()
+        if reader_obj is not None:
+            reader_obj.close()
+        else:
+            parsed_columns.close()
+
+    if limit_order_book.unknown_cancel_count() > 0 or limit_order_book.duplicate_order_count() > 0:
+        print("Order book recovery ({0}): {1} CANCEL of unknown orders, {2} duplicated NEW orders."
+              .format(limit_order_book.recovery_policy().name, limit_order_book.unknown_cancel_count(),
+                      limit_order_book.duplicate_order_count()))
+
+    if book_journal_recorder is not None:
+        print("Book journal: {0} changes recorded in {1}.".format(limit_order_book.journal().count(),
+                                                                  arguments.record_book_changes))
+
+    if bar_builder is not None:
+        print("Bars: {0} bars of {1} ms written to {2}.".format(bar_builder.bar_count(), arguments.bars_ms,
+                                                              bars_file_name))
+
+    if quote_conflator is not None:
+        print("Conflation: {0} strategy updates out of {1} NEW orders ({2} saved)."
+              .format(quote_conflator.events_emitted(), quote_conflator.events_received(),
+                      quote_conflator.events_saved()))
+
+    if order_lifecycle_statistics is not None:
+        for line in order_lifecycle_statistics.report():
+            print(line)
+
+    if feed_latency_analyser is not None:
+        for line in feed_latency_analyser.report():
+            print(line)
+
+    # Close remaining position to output trade statistics
+    strategy.close_pending_position(quote)
+    ledger = print_statistics(strategy.all_positions(), arguments.traded_amount, arguments.price_per_mil, cost_model,
+                              curr_pair)
+    if result_cache is not None:
+        result_cache.put(data_file_name, result_parameters(arguments), ledger)
+    if memory_report is not None:
+        memory_report.sample(int(lines_read_so_far))
+        memory_report.stop()
+        for line in memory_report.report():
+            print(line)
+    print_robustness(ledger, arguments)
+
+
+def result_parameters(arguments: argparse.Namespace) -> dict:
+    """
+    Returns the arguments that change the positions of a backtest (the key of the result cache)
+    :param arguments: the parsed command line
+    :return:
+    """
+    return {"pair": arguments.pair, "ma_slow": arguments.ma_slow, "ma_fast": arguments.ma_fast,
+            "ma_window_ms": arguments.ma_window_ms, "target_profit": arguments.target_profit,
+            "max_open_positions": arguments.max_open_positions, "traded_amount": arguments.traded_amount,
+            "is_best_px_calc": not arguments.price_by_amount,
+            "conflation_depth": arguments.conflation_depth, "conflation_interval_us": arguments.conflation_interval_us,
+            "book_recovery": arguments.book_recovery}
+
+
+def build_cost_model(arguments: argparse.Namespace):
+    """
+    Creates the cost model of the command line
+    :param arguments: the parsed command line
+    :return: CostModel, None if the flat --price-per-mil is enough
+    """
+    if not arguments.pair_commission and arguments.spread_cost_share == 0.0 and arguments.slippage == 0.0:
+        return None
+    from cost_model import CostModel
+
+    pair_commissions = {}
+    for pair_commission in arguments.pair_commission:
+        pair_name, price_per_mil = pair_commission.split("=")
+        pair_commissions[pair_name] = float(price_per_mil)
+    return CostModel(arguments.price_per_mil, pair_commissions, arguments.spread_cost_share, arguments.slippage,
+                     arguments.slippage_reference_amount, arguments.slippage_exponent)
+
+
+def print_statistics(positions: list, traded_amount: float, price_per_mil: float, cost_model=None,
+                     curr_pair=None) -> list:
+    """
+    Prints the positions and the statistics of the backtest
+    :param positions: list of TradeSituation
+    :param traded_amount: traded amount
+    :param price_per_mil: transaction price per million USD
+    :param cost_model: CostModel of the transaction costs (None: price_per_mil for every position)
+    :param curr_pair: traded pair (for the cost model)
+    :return: the ledger of the positions (list of LedgerEntry)
+    """
+    from performance_summary import build_ledger, summarize_ledger
+
+    ledger = build_ledger(positions)
+    print_ledger_statistics(ledger, summarize_ledger(ledger, traded_amount, price_per_mil, cost_model, curr_pair),
+                            cost_model, curr_pair)
+    return ledger
+
+
+def print_ledger_statistics(ledger: list, summary, cost_model=None, curr_pair=None):
+    """
+    Prints the positions and the statistics of the backtest
+    :param ledger: list of LedgerEntry
+    :param summary: PerformanceSummary of the ledger
+    :param cost_model: CostModel of the transaction costs (prints the cost of every position)
+    :param curr_pair: traded pair (for the cost model)
+    :return:
+    """
+    if cost_model is None:
+        for entry in ledger:
+            print("Position {0}: profit bps {1:2.6f}, draw down bps {2:2.6f}".format(entry.trade_situation_id,
+                                                                                     entry.pnl_bps,
+                                                                                     entry.draw_down_bps))
+    else:
+        for entry in ledger:
+            print("Position {0}: profit bps {1:2.6f}, draw down bps {2:2.6f}, cost {3:2.2f}"
+                  .format(entry.trade_situation_id, entry.pnl_bps, entry.draw_down_bps,
+                          cost_model.position_cost(entry.amount, entry.open_spread, entry.close_spread, curr_pair)))
+    print("Total {0} positions opened.".format(summary.positions_opened))
+    print("Total profit (loss) in basis points is: {0:2.2f}.".format(summary.total_pnl))
+    print("Maximal draw down in basis points is: {0:2.6f}.".format(summary.maximal_draw_down))
+    print("Calmar ratio: {0:2.6f}.".format(summary.calmar_ratio))
+    print("Total transaction price: {0:2.2f}.".format(summary.transaction_price))
+    print("Total profit (loss): {0:2.2f}.".format(summary.total_profit))
+    print("Net profit (loss): {0:2.2f}.".format(summary.net_profit))
+
+
+def print_robustness(ledger: list, arguments: argparse.Namespace):
+    """
+    Prints the confidence intervals of the statistics if --robustness-samples is given
+    :param ledger: list of LedgerEntry
+    :param arguments: the parsed command line
+    :return:
+    """
+    if arguments.robustness_samples <= 0 or len(ledger) == 0:
+        return
+    from robustness_analysis import run_robustness_analysis, format_report
+    from resampling_method import ResamplingMethod
+
+    method = ResamplingMethod.REORDER if arguments.robustness_method == ROBUSTNESS_REORDER \
+        else ResamplingMethod.BLOCK_BOOTSTRAP
+    start_time = time.perf_counter()
+    report = run_robustness_analysis(ledger, method, arguments.robustness_samples, arguments.block_length,
+                                     seed=arguments.robustness_seed, max_workers=arguments.workers)
+    for line in format_report(report):
+        print(line)
+    print("Robustness analysis time: {0:2.1f} s.".format(time.perf_counter() - start_time))
+
+
+def run_portfolio(arguments: argparse.Namespace):
+    """
+    Replays the log file through one order book and one strategy per pair, the positions being netted in one
+    portfolio with exposure limits
+    :param arguments: the parsed command line
+    :return:
+    """
+    from quote import Quote
+    from momentum_strategy import MomentumStrategy
+    from limit_order_book import LimitOrderBook
+    from curr_pair import read_string_rep
+    from new_cancel import NewCancel
+    from ma_window_type import MaWindowType
+    from book_recovery_policy import BookRecoveryPolicy
+    from log_reader import LogReader
+    from portfolio import Portfolio
+
+    exposure_limits = {}
+    for exposure_limit in arguments.exposure_limit:
+        currency, amount = exposure_limit.split("=")
+        exposure_limits[currency] = float(amount)
+    portfolio = Portfolio(arguments.base_currency, exposure_limits)
+    ma_window_type = MaWindowType.MILLISECONDS if arguments.ma_window_ms else MaWindowType.TICKS
+    recovery_policy = {BOOK_RECOVERY_STRICT: BookRecoveryPolicy.STRICT,
+                       BOOK_RECOVERY_SKIP: BookRecoveryPolicy.COUNT_AND_SKIP,
+                       BOOK_RECOVERY_RESYNC: BookRecoveryPolicy.RESYNC}[arguments.book_recovery]
+    # One book and one strategy per pair
+    order_books = {}
+    strategies = {}
+    pair_names = arguments.pairs if arguments.pairs is not None else [arguments.pair]
+    for pair_name in pair_names:
+        curr_pair = read_string_rep(pair_name)
+        order_books[curr_pair] = LimitOrderBook(curr_pair, recovery_policy)
+        strategies[curr_pair] = MomentumStrategy(arguments.ma_slow, arguments.ma_fast, arguments.target_profit,
+                                                 arguments.traded_amount, not arguments.price_by_amount,
+                                                 ma_window_type=ma_window_type,
+                                                 max_open_positions=arguments.max_open_positions,
+                                                 limit_order_book=order_books[curr_pair], portfolio=portfolio)
+    portfolio.check_rates(list(order_books))
+    last_quotes = {}
+    with LogReader(arguments.data_file_name) as reader_obj:
+        for row in reader_obj:
+            quote = Quote(row.decode())
+            limit_order_book = order_books.get(quote.currency_pair())
+            if limit_order_book is None:
+                continue
             if quote.type() == NewCancel.NEW:
                 limit_order_book.on_new_order(quote)
-                # Update strategy: by construction this ECN sends an update to the price immediately.
-                # The cancels are ignored for the strategy updates.
-                strategy.step(quote)
+                top_of_book = limit_order_book.top_of_book()
+                portfolio.on_book_update(quote.currency_pair(), top_of_book)
+                strategies[quote.currency_pair()].step(quote, top_of_book)
             else:
                 limit_order_book.on_cancel_order(quote)
-        # Update user interface statistics
-        lines_read_so_far += 1.0
-        # Output statistics to user:
-        if lines_read_so_far % 100000 == 0:
-            print("Read {0} lines ({1:2.2f}%)".format(lines_read_so_far, 100.00 * lines_read_so_far / row_count))
-
-# Close remaining position to output trade statistics
-strategy.close_pending_position(quote)
-
-total_pnl: float = 0.0
-maximal_draw_down: float = 0.0
-position: TradeSituation
-for position in strategy.all_positions():
-    total_pnl += position.return_current_pnl()
-    if position.return_current_draw_down() > maximal_draw_down:
-        maximal_draw_down = position.return_current_draw_down()
-    print("Position {0}: profit bps {1:2.6f}, draw down bps {2:2.6f}".format(position.trade_situation_id(),
-                                                                             position.return_current_pnl(),
-                                                                             position.return_current_draw_down()))
-
-positions_opened: int = len(strategy.all_positions())
-print("Total {0} positions opened.".format(positions_opened))
-print("Total profit (loss) in basis points is: {0:2.2f}.".format(total_pnl))
-print("Maximal draw down in basis points is: {0:2.6f}.".format(maximal_draw_down))
-print("Calmar ratio: {0:2.6f}.".format(total_pnl/maximal_draw_down))
-
-
-# Transaction price per million USD:
-price_per_mil = 10.00
-# We buy then we sell => thus it's traded amount X 2
-transaction_price_per_trade = traded_amount * 2.0 * price_per_mil / 1000000.00
-print("Total transaction price: {0:2.2f}.".format(transaction_price_per_trade * positions_opened))
-print("Total profit (loss): {0:2.2f}.".format(traded_amount * total_pnl))
-print("Net profit (loss): {0:2.2f}.".format(traded_amount * total_pnl - transaction_price_per_trade * positions_opened))
+                # A CANCEL of a best order moves the mid too
+                portfolio.on_book_update(quote.currency_pair(), limit_order_book.top_of_book())
+            last_quotes[quote.currency_pair()] = quote
+
+    for pair_name in pair_names:
+        curr_pair = read_string_rep(pair_name)
+        if curr_pair in last_quotes:
+            strategies[curr_pair].close_pending_position(last_quotes[curr_pair])
+        print("{0}: {1} positions.".format(pair_name, len(strategies[curr_pair].all_positions())))
+    print("Portfolio: {0} positions opened, {1} rejected by the exposure limits.".format(portfolio.opened_count(),
+                                                                                       portfolio.rejected_count()))
+    for currency, exposure in sorted(portfolio.exposures().items()):
+        print("    {0}: net flow {1:2.2f}".format(currency, exposure))
+    print("Portfolio profit (loss) in {0}: {1:2.2f}.".format(portfolio.base_currency(), portfolio.total_pnl()))
+
+
+def run_walk_forward_mode(arguments: argparse.Namespace):
+    """
+    Runs the walk-forward optimisation and prints one line per window
+    :param arguments: the parsed command line
+    :return:
+    """
+    from curr_pair import read_string_rep
+    from walk_forward import run_walk_forward, build_parameter_grid
+
+    parameter_grid = build_parameter_grid(arguments.grid_ma_slow, arguments.grid_ma_fast,
+                                          arguments.grid_target_profit)
+    print("Startup time: {0:2.1f} ms.".format(1000.0 * (time.perf_counter() - startup_begin_time)))
+    results = run_walk_forward([arguments.data_file_name], read_string_rep(arguments.pair), parameter_grid,
+                               arguments.in_sample, arguments.out_of_sample, arguments.traded_amount,
+                               not arguments.price_by_amount, arguments.price_per_mil, arguments.objective,
+                               arguments.workers)
+    total_net_profit: float = 0.0
+    for result in results:
+        total_net_profit += result.out_of_sample.net_profit
+        print("Window {0}-{1}-{2}: parameters {3}, in-sample {4}: {5:2.2f}, out-of-sample net profit: {6:2.2f}"
+              .format(result.window.start, result.window.split, result.window.end, result.best_parameters,
+                      arguments.objective, getattr(result.in_sample, arguments.objective),
+                      result.out_of_sample.net_profit))
+    print("Total out-of-sample net profit (loss): {0:2.2f}.".format(total_net_profit))
+
+
+def main(argv: list = None):
+    arguments = parse_arguments(argv)
+    if arguments.mode == MODE_WALK_FORWARD:
+        run_walk_forward_mode(arguments)
+    elif arguments.mode == MODE_PORTFOLIO:
+        run_portfolio(arguments)
+    else:
+        run_backtest(arguments)
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# Opt-in memory report of a replay.
+#
+# tracemalloc traces the Python allocations; a snapshot taken at intervals gives the memory still allocated, grouped by
+# component of the backtester: each allocation is attributed to the most recent frame of its traceback that belongs to
+# a known module. The built-in types have no frame, so a list grown or an object created by LimitOrderBook is
+# attributed to the book with one frame per traceback; more frames also attribute the allocations of the pure Python
+# modules of the standard library to their callers. The resident set size (RSS) of the process is read from the
+# operating system, as it also includes the memory that tracemalloc does not see (NumPy buffers, the interpreter
+# itself, fragmentation).
+#
+# Tracing slows the replay down (about 5 times with one frame per traceback, 10 to 35 times with more frames): the
+# report is only built on demand.
+import os
+import sys
+import time
+import tracemalloc
+from typing import NamedTuple
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: no peak RSS
+    resource = None
+
+# Module file name -> component. Allocations in other files are attributed to their callers, or to OTHER_COMPONENT.
+COMPONENT_MODULES = {
+    "limit_order_book.py": "book", "top_of_book.py": "book", "book_journal.py": "book",
+    "quote_conflator.py": "book", "order_lifecycle_statistics.py": "book",
+    "quote.py": "parser", "log_reader.py": "parser", "parallel_parser.py": "parser", "curr_pair.py": "parser",
+    "main.py": "replay loop",
+    "momentum_strategy.py": "strategy", "indicators.py": "strategy", "indicator_registry.py": "strategy",
+    "take_profit_index.py": "strategy", "bar_builder.py": "strategy",
+    "trade_situation.py": "position ledger", "performance_summary.py": "position ledger",
+    "portfolio.py": "position ledger",
+}
+OTHER_COMPONENT = "other"
+# Frames kept per allocation by default
+DEFAULT_TRACEBACK_FRAMES = 1
+BYTES_PER_MEGABYTE = 1024.0 * 1024.0
+
+
+class MemorySample(NamedTuple):
+    # One point of the timeline
+    lines_read: int
+    elapsed_time: float
+    # Memory allocated by Python (tracemalloc): now, and the highest value since the start
+    traced_size: int
+    traced_peak_size: int
+    # Resident set size of the process: now, and the highest value since the start (None if not available)
+    rss: int
+    peak_rss: int
+    # Component -> bytes still allocated
+    component_sizes: dict
+
+
+def current_rss() -> int:
+    """
+    Returns the resident set size of the process (Linux /proc only)
+    :return: bytes, None if not available
+    """
+    try:
+        with open("/proc/self/statm", 'r') as file_reader:
+            return int(file_reader.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss() -> int:
+    """
+    Returns the highest resident set size of the process since it started
+    :return: bytes, None if not available
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def component_of(traceback: tracemalloc.Traceback) -> str:
+    """
+    Returns the component of an allocation: the one of the most recent frame in a module of COMPONENT_MODULES
+    :param traceback: traceback of the allocation (oldest frame first)
+    :return:
+    """
+    for frame in reversed(traceback):
+        component = COMPONENT_MODULES.get(os.path.basename(frame.filename))
+        if component is not None:
+            return component
+    return OTHER_COMPONENT
+
+
+class MemoryReport:
+    # Number of lines between two samples
+    __sample_every_lines: int
+    # Number of allocation sites listed by the report
+    __top_count: int
+    __start_time: float
+    __samples: list
+    # Largest allocation sites of the last sample: list of (file:line, bytes)
+    __top_sites: list
+    # tracemalloc was started by the report (and has to be stopped by it)
+    __is_tracing_owner: bool
+
+    def __init__(self, sample_every_lines: int = 1000000, top_count: int = 10,
+                 traceback_frames: int = DEFAULT_TRACEBACK_FRAMES):
+        """
+        Starts tracing the allocations
+        :param sample_every_lines: number of lines between two samples of the timeline
+        :param top_count: number of allocation sites listed by the report
+        :param traceback_frames: frames kept per allocation (ignored if tracemalloc is already tracing)
+        """
+        if sample_every_lines <= 0:
+            raise Exception("Please init the class with a sampling interval higher than 0")
+        self.__sample_every_lines = sample_every_lines
+        self.__top_count = top_count
+        self.__samples = []
+        self.__top_sites = []
+        self.__is_tracing_owner = not tracemalloc.is_tracing()
+        if self.__is_tracing_owner:
+            tracemalloc.start(traceback_frames)
+        self.__start_time = time.perf_counter()
+
+    def on_lines_read(self, lines_read: int):
+        """
+        Takes a sample every sample_every_lines lines (cheap to call after every line)
+        :param lines_read: number of lines read so far
+        :return:
+        """
+        if lines_read % self.__sample_every_lines == 0:
+            self.sample(lines_read)
+
+    def sample(self, lines_read: int) -> MemorySample:
+        """
+        Takes a snapshot of the allocations and adds it to the timeline
+        :param lines_read: number of lines read so far
+        :return: the new sample
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        component_sizes = {}
+        site_sizes = {}
+        for trace in snapshot.traces:
+            component = component_of(trace.traceback)
+            component_sizes[component] = component_sizes.get(component, 0) + trace.size
+            frame = trace.traceback[-1]
+            site = "{0}:{1}".format(os.path.basename(frame.filename), frame.lineno)
+            site_sizes[site] = site_sizes.get(site, 0) + trace.size
+        self.__top_sites = sorted(site_sizes.items(), key=lambda item: item[1], reverse=True)[:self.__top_count]
+        traced_size, traced_peak_size = tracemalloc.get_traced_memory()
+        rss = current_rss()
+        max_rss = peak_rss()
+        # The peak from the operating system is rounded differently (and may be updated later) than the current RSS
+        if rss is not None and max_rss is not None and rss > max_rss:
+            max_rss = rss
+        memory_sample = MemorySample(lines_read, time.perf_counter() - self.__start_time, traced_size,
+                                     traced_peak_size, rss, max_rss, component_sizes)
+        self.__samples.append(memory_sample)
+        return memory_sample
+
+    def stop(self):
+        """
+        Stops tracing (if the report started it)
+        :return:
+        """
+        if self.__is_tracing_owner and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def samples(self) -> list:
+        return list(self.__samples)
+
+    def top_sites(self) -> list:
+        return list(self.__top_sites)
+
+    def report(self) -> list:
+        """
+        Formats the timeline and the largest allocation sites of the last sample
+        :return: list of lines
+        """
+        if not self.__samples:
+            return ["Memory: no sample."]
+        components = sorted({component for memory_sample in self.__samples
+                             for component in memory_sample.component_sizes})
+        lines = ["Memory timeline (MB): lines; seconds; traced; traced peak; RSS; peak RSS; " + "; ".join(components)]
+        for memory_sample in self.__samples:
+            values = [memory_sample.traced_size, memory_sample.traced_peak_size, memory_sample.rss,
+                      memory_sample.peak_rss] + [memory_sample.component_sizes.get(component, 0)
+                                                 for component in components]
+            lines.append("    {0}; {1:2.1f}; ".format(memory_sample.lines_read, memory_sample.elapsed_time) +
+                         "; ".join("n/a" if value is None else "{0:2.1f}".format(value / BYTES_PER_MEGABYTE)
+                                   for value in values))
+        lines.append("Largest allocation sites (MB):")
+        for site, size in self.__top_sites:
+            lines.append("    {0}: {1:2.1f}".format(site, size / BYTES_PER_MEGABYTE))
+        return lines
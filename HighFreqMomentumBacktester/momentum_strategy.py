@@ -1,7 +1,14 @@
-from fifo_doubles_list import FifoDoublesList
+from indicators import Indicator, SimpleMovingAverage, TimeWindowMovingAverage
+from indicator_registry import IndicatorRegistry
 from quote import Quote
 from trade_situation import TradeSituation
+from take_profit_index import TakeProfitIndex
+from buy_sell import BuySell
+from portfolio import Portfolio
 from limit_order_book import LimitOrderBook
+from top_of_book import TopOfBook
+from ma_window_type import MaWindowType
+from quote import QUOTE_TIME_UNITS_PER_MILLISECOND
 
 
 class MomentumStrategy:
@@ -10,23 +17,37 @@ class MomentumStrategy:
     __common_momentum_strategy_id: int = 0
     # This is a global reference to the order book
     __common_order_book: LimitOrderBook
+    # Order book of the traded pair (None: the common order book)
+    __order_book: LimitOrderBook
+    # Portfolio checking the exposure limits and following the exposures (None: no portfolio)
+    __portfolio: Portfolio
     # Unique ID of the momentum strategy
     __strategy_id: int
     # Set to final value in constructor.
     __ma_slow_var: int
     __ma_fast_var: int
+    # Unit of __ma_slow_var and __ma_fast_var (number of NEW quotes or milliseconds)
+    __ma_window_type: MaWindowType
 
-    # Set to final value in constructor.
-    __ma_slow_fifo_list: FifoDoublesList
-    __ma_fast_fifo_list: FifoDoublesList
+    # Set to final value in constructor. Simple moving averages unless other indicators are given to the constructor.
+    __ma_slow_indicator: Indicator
+    __ma_fast_indicator: Indicator
+    # The indicators come from a registry or from the caller and may be read by other strategies
+    __is_sharing_indicators: bool
 
     # Position is open in this way currently
     # False: sold
     # True: bought
     __current_trading_way: bool
 
-    # Currently opened position
-    __open_position: TradeSituation
+    # Currently opened positions, by way (only the positions reaching their take profit are visited on a tick)
+    __long_positions: TakeProfitIndex
+    __short_positions: TakeProfitIndex
+    # Pyramiding: number of positions opened in the current trading way, at most __max_open_positions
+    __max_open_positions: int
+    __positions_in_trading_way: int
+    # Number of steps so far
+    __step_count: int
 
     # List of trade situation
     __positions_history: list
@@ -39,15 +60,32 @@ class MomentumStrategy:
     # This is the strategy's traded amount
     __traded_amount: float
 
-    def __init__(self, ma_slow: int, ma_fast: int, target_profit_arg: float, traded_amount: float, is_best_px_calc: bool):
+    def __init__(self, ma_slow: int, ma_fast: int, target_profit_arg: float, traded_amount: float, is_best_px_calc: bool,
+                 ma_slow_indicator: Indicator = None, ma_fast_indicator: Indicator = None,
+                 indicator_registry: IndicatorRegistry = None, ma_window_type: MaWindowType = MaWindowType.TICKS,
+                 max_open_positions: int = 1, limit_order_book: LimitOrderBook = None, portfolio: Portfolio = None):
         """
         Initializes the trading strategy calculator. Please feed it with arguments for your moving average trading
         strategy. The MA_SLOW > MA_FAST. By construction the FAST average is low-period.
         :param ma_slow: slow moving moving average
         :param ma_fast: fast moving moving average
         :param target_profit_arg: target profit for this strategy
+        :param ma_slow_indicator: optional indicator replacing the slow simple moving average (e.g. an EMA). It is fed
+        with the mid price and can be shared with other strategies on the same pair.
+        :param ma_fast_indicator: optional indicator replacing the fast simple moving average
+        :param indicator_registry: optional registry of the traded pair. The default moving averages are taken from it
+        so strategies with the same window lengths compute each average once per tick.
+        :param ma_window_type: MaWindowType.TICKS (default): ma_slow and ma_fast are numbers of NEW quotes.
+        MaWindowType.MILLISECONDS: ma_slow and ma_fast are wall-clock durations measured with Quote.time().
+        :param max_open_positions: pyramiding: while the trading way does not change, a new position is opened on
+        every step until max_open_positions positions were opened in that way (1: one position per change of way)
+        :param limit_order_book: the order book of the traded pair, for the strategies of several pairs (default: the
+        common order book)
+        :param portfolio: optional portfolio: a position is opened only if the exposure limits allow it
         """
         self.__strategy_id = MomentumStrategy.generate_next_id()
+        self.__order_book = limit_order_book
+        self.__portfolio = portfolio
         self.__is_best_price_calculation = is_best_px_calc
         self.__traded_amount = traded_amount
         # Arguments sanity check
@@ -57,72 +95,114 @@ class MomentumStrategy:
         elif ma_fast <= 0 or ma_slow <= 0:
             raise Exception("The Moving average fast and slow ({0} and {1}) have to be more that 0"
                             .format(ma_fast, ma_slow))
+        elif max_open_positions <= 0:
+            raise Exception("The maximal number of open positions ({0}) has to be more than 0"
+                            .format(max_open_positions))
         # Save input arguments
         self.__ma_slow_var = ma_slow
         self.__ma_fast_var = ma_fast
+        self.__ma_window_type = ma_window_type
         self.__target_profit = target_profit_arg
 
-        # Init the FiFo arrays (FifoDoublesList class)
-        self.__ma_slow_fifo_list = FifoDoublesList(self.__ma_slow_var)
-        self.__ma_fast_fifo_list = FifoDoublesList(self.__ma_fast_var)
+        # Init the indicators (simple moving averages by default, shared through the registry if there is one)
+        if ma_window_type == MaWindowType.MILLISECONDS:
+            average_type = TimeWindowMovingAverage
+            slow_window = self.__ma_slow_var * QUOTE_TIME_UNITS_PER_MILLISECOND
+            fast_window = self.__ma_fast_var * QUOTE_TIME_UNITS_PER_MILLISECOND
+        else:
+            average_type = SimpleMovingAverage
+            slow_window = self.__ma_slow_var
+            fast_window = self.__ma_fast_var
+        self.__is_sharing_indicators = indicator_registry is not None or ma_slow_indicator is not None or \
+            ma_fast_indicator is not None
+        if ma_slow_indicator is None:
+            ma_slow_indicator = average_type(slow_window) if indicator_registry is None \
+                else indicator_registry.get(average_type, slow_window)
+        if ma_fast_indicator is None:
+            ma_fast_indicator = average_type(fast_window) if indicator_registry is None \
+                else indicator_registry.get(average_type, fast_window)
+        self.__ma_slow_indicator = ma_slow_indicator
+        self.__ma_fast_indicator = ma_fast_indicator
 
         # Init locals
         self.__current_trading_way = False
-        self.__open_position = None
+        self.__long_positions = TakeProfitIndex(True)
+        self.__short_positions = TakeProfitIndex(False)
+        self.__max_open_positions = max_open_positions
+        self.__positions_in_trading_way = 0
+        self.__step_count = 0
         self.__positions_history = []
         self.__is_filled_start_data = False
         self.__filled_data_points = 0
 
-    def step(self, quote: Quote):
+    def step(self, quote: Quote, top_of_book: TopOfBook = None):
         """
         Calculates the indicator and performs update/open/close action on the TradeSituation class
         (representing investment position)
         :param quote: float; the price of the invested stock
+        :param top_of_book: the best prices after the quote was applied to the book. Read from the common book if
+        None; give it when several strategies are stepped on the same event.
         :return: no return
         """
-        # Update values (prices) in the fifo_lists (with put method)
-        price_mid: float = (MomentumStrategy.__common_order_book.get_best_bid_price() +\
-                            MomentumStrategy.__common_order_book.get_best_offer_price()) / 2.0
-        self.__ma_slow_fifo_list.put(price_mid)
-        self.__ma_fast_fifo_list.put(price_mid)
+        if top_of_book is None:
+            top_of_book = self._order_book().top_of_book()
+        # Update the indicators with the mid price. The sequence of the book is the tick's sequence number: a shared
+        # indicator is updated only once per change of the book. The indicators of this strategy only are updated on
+        # every step. The time is used by the time window averages.
+        price_mid: float = top_of_book.mid_price
+        if self.__is_sharing_indicators:
+            self.__ma_slow_indicator.update_at(top_of_book.sequence, quote.time(), price_mid)
+            self.__ma_fast_indicator.update_at(top_of_book.sequence, quote.time(), price_mid)
+        else:
+            self.__ma_slow_indicator.put_at(quote.time(), price_mid)
+            self.__ma_fast_indicator.put_at(quote.time(), price_mid)
 
-        # Update position with arrived quote
-        if self.__open_position is not None:
-            # We closed the position (returns true if the position is closed)
-            if self.__open_position.update_on_order(quote):
-                self.__open_position = None
+        # Update the positions with the arrived quote: one reference price per way, only the positions that reached
+        # their take profit are visited and closed
+        self.__step_count += 1
+        for positions in (self.__long_positions, self.__short_positions):
+            if len(positions) > 0:
+                reference_price = self._reference_price(positions.is_long(), top_of_book)
+                if reference_price is not None:
+                    for position in positions.on_reference_price(self.__step_count, reference_price,
+                                                                 self.__target_profit):
+                        position.close_position(quote)
+                        if self.__portfolio is not None:
+                            self.__portfolio.on_close(position)
 
-        # The fifo_list(s) are filled?
+        # The indicators are filled?
         if self.__is_filled_start_data:
-            # Calculate fast and slow lists means
-            fast_mean = self.__ma_fast_fifo_list.get_mean()
-            slow_mean = self.__ma_slow_fifo_list.get_mean()
+            # Read fast and slow indicators
+            fast_mean = self.__ma_fast_indicator.value()
+            slow_mean = self.__ma_slow_indicator.value()
 
             # If MA short > MA long => BUY
             # If MA long > MA short => SELL
             # You must not reopen the position if the trading direction (__current_trading_way) has not changed.
             if fast_mean > slow_mean and not self.__current_trading_way:
-                # Buy: open position if there is none; close the position if it's hanging in the other way; append the
-                # positions history (to save how much it gained); save the new __current_trading_way (repeat for SELL)
-                if self.__open_position is not None:
-                    self.__open_position.close_position(quote)
-                self.__open_position = TradeSituation(quote, True, self.__target_profit, self.__traded_amount,
-                                                      self.__is_best_price_calculation)
-                self.__open_position.open_position(quote)
+                # Buy: open position; close the positions hanging in the other way; append the positions history
+                # (to save how much it gained); save the new __current_trading_way (repeat for SELL)
+                self._close_positions(self.__short_positions, quote)
                 self.__current_trading_way = True
-                self.__positions_history.append(self.__open_position)
+                self.__positions_in_trading_way = 0
+                self._open_position(quote, top_of_book)
             elif fast_mean < slow_mean and self.__current_trading_way:
                 # Sell
-                if self.__open_position is not None:
-                    self.__open_position.close_position(quote)
-                self.__open_position = TradeSituation(quote, False, self.__target_profit, self.__traded_amount,
-                                                      self.__is_best_price_calculation)
+                self._close_positions(self.__long_positions, quote)
                 self.__current_trading_way = False
-                self.__positions_history.append(self.__open_position)
+                self.__positions_in_trading_way = 0
+                self._open_position(quote, top_of_book)
+            elif 0 < self.__positions_in_trading_way < self.__max_open_positions and \
+                    (fast_mean > slow_mean if self.__current_trading_way else fast_mean < slow_mean):
+                # Pyramiding: the signal confirms the trading way
+                self._open_position(quote, top_of_book)
         else:
-            # The fifo_list(s) are not yet filled. Do the necessary updates and checks
+            # The indicators are not yet filled. Do the necessary updates and checks
             self.__filled_data_points += 1
-            if self.__filled_data_points > self.__ma_slow_var:
+            if self.__ma_window_type == MaWindowType.MILLISECONDS:
+                # The slow average covers a full window of time
+                self.__is_filled_start_data = self.__ma_slow_indicator.is_ready()
+            elif self.__filled_data_points > self.__ma_slow_var:
                 self.__is_filled_start_data = True
 
     def close_pending_position(self, quote: Quote):
@@ -131,9 +211,68 @@ class MomentumStrategy:
         :param quote: last quote available in the data set
         :return:
         """
-        # If there is still a position --> close it with the quote provided to you in arguments.
-        if self.__open_position is not None and not self.__open_position.is_closed():
-            self.__open_position.close_position(quote)
+        # If there are still positions --> close them with the quote provided to you in arguments.
+        self._close_positions(self.__long_positions, quote)
+        self._close_positions(self.__short_positions, quote)
+
+    def _open_position(self, quote: Quote, top_of_book: TopOfBook):
+        """
+        Opens a position in the current trading way, if the exposure limits of the portfolio allow it
+        :param quote: the current quote
+        :param top_of_book: the best prices of the current event
+        :return:
+        """
+        if self.__portfolio is not None and \
+                not self.__portfolio.can_open(self._order_book().currency_pair(), self.__current_trading_way,
+                                              self.__traded_amount, top_of_book.mid_price):
+            return
+        position = TradeSituation(quote, self.__current_trading_way, self.__target_profit, self.__traded_amount,
+                                  self.__is_best_price_calculation, self.__order_book)
+        if self.__portfolio is not None:
+            self.__portfolio.on_open(position, self._order_book().currency_pair())
+        if self.__current_trading_way:
+            self.__long_positions.add(position, self.__step_count)
+        else:
+            self.__short_positions.add(position, self.__step_count)
+        self.__positions_in_trading_way += 1
+        self.__positions_history.append(position)
+
+    def _close_positions(self, positions: TakeProfitIndex, quote: Quote):
+        """
+        Closes all the open positions of one way
+        :param positions: the positions of the way
+        :param quote: the current quote
+        :return:
+        """
+        for position in positions.pop_all():
+            position.close_position(quote)
+            if self.__portfolio is not None:
+                self.__portfolio.on_close(position)
+
+    def _order_book(self) -> LimitOrderBook:
+        return self.__order_book if self.__order_book is not None else MomentumStrategy.__common_order_book
+
+    def _reference_price(self, is_long: bool, top_of_book: TopOfBook) -> float:
+        """
+        Returns the price at which the positions of one way are valued (as in TradeSituation.calculate_pnl_and_dd)
+        :param is_long: True for the LONG positions (closed on the BID side)
+        :param top_of_book: the best prices of the current event
+        :return: the price, None if there is no price available
+        """
+        if self.__is_best_price_calculation:
+            if is_long:
+                return top_of_book.bid_price if top_of_book.is_bid_set else None
+            return top_of_book.offer_price if top_of_book.is_offer_set else None
+        corresponding_order = self._order_book().get_best_orders_by_amount(
+            BuySell.BUY if is_long else BuySell.SELL, self.__traded_amount)
+        return None if corresponding_order is None else corresponding_order.price()
+
+    def open_positions_count(self) -> int:
+        """
+        Returns the number of positions currently open
+        :return:
+        """
+        return len(self.__long_positions) + len(self.__short_positions)
 
     def all_positions(self) -> list:
         """
@@ -157,6 +296,20 @@ class MomentumStrategy:
         """
         return self.__ma_fast_var
 
+    def get_max_open_positions(self) -> int:
+        """
+        Returns the maximal number of positions opened in one trading way
+        :return:
+        """
+        return self.__max_open_positions
+
+    def get_ma_window_type(self) -> MaWindowType:
+        """
+        Returns the unit of the moving averages windows
+        :return:
+        """
+        return self.__ma_window_type
+
     def get_target_profit(self) -> float:
         """
         Returns the target profit of this strategy
@@ -176,6 +329,23 @@ class MomentumStrategy:
         MomentumStrategy.__common_momentum_strategy_id += 1
         return MomentumStrategy.__common_momentum_strategy_id
 
+    @staticmethod
+    def get_last_generated_id() -> int:
+        """
+        Returns the last strategy ID handed out by generate_next_id(). Used to snapshot the ID generator.
+        :return:
+        """
+        return MomentumStrategy.__common_momentum_strategy_id
+
+    @staticmethod
+    def set_last_generated_id(last_generated_id: int):
+        """
+        Restores the ID generator (after a snapshot was loaded). The next generated ID will be last_generated_id + 1.
+        :param last_generated_id: the value returned by get_last_generated_id() at the time of the snapshot
+        :return:
+        """
+        MomentumStrategy.__common_momentum_strategy_id = last_generated_id
+
     @staticmethod
     def set_limit_order_book(limit_order_book: LimitOrderBook):
         MomentumStrategy.__common_order_book = limit_order_book
@@ -0,0 +1,201 @@
+# Order lifecycle statistics computed during the replay (no second pass over the data).
+#
+# For every pair: resting time of the cancelled orders per price level (level of the order when it was inserted),
+# cancel to new ratio and quote update rates. The distributions are kept in StreamingHistogram instances, so the
+# memory does not grow with the length of the replay.
+from quote import Quote, QUOTE_TIME_UNITS_PER_MILLISECOND
+from curr_pair import CurrPair, dict_all_values
+from limit_order_book import LimitOrderBook
+from streaming_histogram import StreamingHistogram
+
+# Quote.time() units per second
+QUOTE_TIME_UNITS_PER_SECOND = QUOTE_TIME_UNITS_PER_MILLISECOND * 1000
+
+
+class PairLifecycleStatistics:
+    # Orders of the levels >= __max_level are counted in the last level
+    __max_level: int
+    # Level of the live orders of the book when they were inserted: ID -> level. The entry is removed with the order.
+    __live_order_levels: dict
+    # Resting time (Quote.time() units) of the cancelled orders, one histogram per level
+    __resting_times: list
+    __new_count: int
+    __cancel_count: int
+    # Number of updates (NEW and CANCEL) per second of activity
+    __updates_per_second: StreamingHistogram
+    __current_second: int
+    __current_second_updates: int
+    __first_time: int
+    __last_time: int
+
+    def __init__(self, max_level: int):
+        self.__max_level = max_level
+        self.__live_order_levels = {}
+        self.__resting_times = [StreamingHistogram() for level in range(max_level + 1)]
+        self.__new_count = 0
+        self.__cancel_count = 0
+        self.__updates_per_second = StreamingHistogram()
+        self.__current_second = None
+        self.__current_second_updates = 0
+        self.__first_time = None
+        self.__last_time = None
+
+    def on_new_order(self, quote: Quote, level: int):
+        """
+        Records a NEW order
+        :param quote: the order
+        :param level: rank of the order's price level when it was inserted (None if the book skipped the order)
+        :return:
+        """
+        self.__new_count += 1
+        if level is not None:
+            self.__live_order_levels[quote.id()] = min(level, self.__max_level)
+        self._count_update(quote.time())
+
+    def on_cancel_order(self, quote: Quote, removed_order: Quote):
+        """
+        Records a CANCEL
+        :param quote: the CANCEL quote
+        :param removed_order: the cancelled order as removed from the book (None if the book did not know it)
+        :return:
+        """
+        self.__cancel_count += 1
+        self._count_update(quote.time())
+        level = self.__live_order_levels.pop(quote.id(), None)
+        if removed_order is not None and level is not None:
+            self.__resting_times[level].record(max(quote.time() - removed_order.time(), 0))
+
+    def _count_update(self, quote_time: int):
+        if self.__first_time is None:
+            self.__first_time = quote_time
+        self.__last_time = quote_time
+        second = quote_time // QUOTE_TIME_UNITS_PER_SECOND
+        if second != self.__current_second:
+            if self.__current_second is not None:
+                self.__updates_per_second.record(self.__current_second_updates)
+            self.__current_second = second
+            self.__current_second_updates = 0
+        self.__current_second_updates += 1
+
+    def resting_time_histogram(self, level: int) -> StreamingHistogram:
+        """
+        Returns the resting times (Quote.time() units) of the cancelled orders of a level
+        :param level: 0 for the best level; max_level groups the deeper ones
+        :return:
+        """
+        return self.__resting_times[min(level, self.__max_level)]
+
+    def updates_per_second_histogram(self) -> StreamingHistogram:
+        """
+        Returns the distribution of the number of updates per second (seconds without update are not counted,
+        the current second is included)
+        :return:
+        """
+        histogram = StreamingHistogram()
+        histogram.merge(self.__updates_per_second)
+        if self.__current_second is not None:
+            histogram.record(self.__current_second_updates)
+        return histogram
+
+    def new_count(self) -> int:
+        return self.__new_count
+
+    def cancel_count(self) -> int:
+        return self.__cancel_count
+
+    def cancel_to_new_ratio(self) -> float:
+        if self.__new_count == 0:
+            return 0.0
+        return self.__cancel_count / self.__new_count
+
+    def update_rate(self) -> float:
+        """
+        Returns the average number of updates per second over the observed period
+        :return:
+        """
+        if self.__first_time is None or self.__last_time == self.__first_time:
+            return 0.0
+        return (self.__new_count + self.__cancel_count) * QUOTE_TIME_UNITS_PER_SECOND / \
+            (self.__last_time - self.__first_time)
+
+    def max_level(self) -> int:
+        return self.__max_level
+
+
+class OrderLifecycleStatistics:
+    # Number of distinguished price levels (the deeper levels are grouped)
+    __max_level: int
+    # CurrPair -> PairLifecycleStatistics
+    __pairs: dict
+
+    def __init__(self, max_level: int = 5):
+        """
+        Creates the statistics engine
+        :param max_level: levels from 0 (best price) to max_level - 1 are distinguished, the deeper ones are grouped
+        """
+        if max_level <= 0:
+            raise Exception("Please init the class with a max level higher than 0")
+        self.__max_level = max_level
+        self.__pairs = {}
+
+    def on_new_order(self, quote: Quote, limit_order_book: LimitOrderBook):
+        """
+        To be called after the book processed the order
+        :param quote: the NEW order
+        :param limit_order_book: the order book of the quote's pair
+        :return:
+        """
+        level = None
+        # A NEW with the ID of a live order is skipped by the book (BookRecoveryPolicy.COUNT_AND_SKIP): the level of
+        # the live order is kept
+        if limit_order_book.get_order(quote.id()) is quote:
+            level = limit_order_book.get_level_rank(quote.way(), quote.price())
+        self.pair_statistics(quote.currency_pair()).on_new_order(quote, level)
+
+    def on_cancel_order(self, quote: Quote, removed_order: Quote):
+        """
+        To be called with the order returned by LimitOrderBook.on_cancel_order
+        :param quote: the CANCEL quote
+        :param removed_order: the removed order (None if the book did not know it)
+        :return:
+        """
+        self.pair_statistics(quote.currency_pair()).on_cancel_order(quote, removed_order)
+
+    def pair_statistics(self, curr_pair: CurrPair) -> PairLifecycleStatistics:
+        """
+        Returns the statistics of one pair (created on first use)
+        :param curr_pair: the currency pair
+        :return:
+        """
+        pair_statistics = self.__pairs.get(curr_pair)
+        if pair_statistics is None:
+            pair_statistics = PairLifecycleStatistics(self.__max_level)
+            self.__pairs[curr_pair] = pair_statistics
+        return pair_statistics
+
+    def report(self) -> list:
+        """
+        Formats the statistics of all the pairs
+        :return: list of lines
+        """
+        pair_names = {curr_pair: name for name, curr_pair in dict_all_values.items()}
+        lines = []
+        for curr_pair, pair_statistics in self.__pairs.items():
+            updates_per_second = pair_statistics.updates_per_second_histogram()
+            lines.append("{0}: {1} NEW, {2} CANCEL, cancel/new ratio {3:2.3f}, {4:2.1f} updates/s "
+                         "(median {5:2.0f}, 99% {6:2.0f} in active seconds)"
+                         .format(pair_names.get(curr_pair, curr_pair), pair_statistics.new_count(),
+                                 pair_statistics.cancel_count(), pair_statistics.cancel_to_new_ratio(),
+                                 pair_statistics.update_rate(), updates_per_second.percentile(50.0),
+                                 updates_per_second.percentile(99.0)))
+            for level in range(self.__max_level + 1):
+                resting_times = pair_statistics.resting_time_histogram(level)
+                if resting_times.count() == 0:
+                    continue
+                lines.append("    level {0}{1}: {2} cancels, resting time ms: median {3:2.3f}, 90% {4:2.3f}, "
+                             "99% {5:2.3f}"
+                             .format(level, "+" if level == self.__max_level else "", resting_times.count(),
+                                     resting_times.percentile(50.0) / QUOTE_TIME_UNITS_PER_MILLISECOND,
+                                     resting_times.percentile(90.0) / QUOTE_TIME_UNITS_PER_MILLISECOND,
+                                     resting_times.percentile(99.0) / QUOTE_TIME_UNITS_PER_MILLISECOND))
+        return lines
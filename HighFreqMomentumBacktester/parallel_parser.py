@@ -0,0 +1,218 @@
+# Parses one large (plain text) log file with all the cores.
+#
+# The file is split at line boundaries into chunks. Each worker process parses its chunk into columns (array.array)
+# and copies them into a shared memory block; the parent maps the blocks without copying or unpickling the data and
+# reads the rows back in the order of the file. Only the parsing is parallel: the book replay stays sequential.
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+from buy_sell import BuySell
+from curr_pair import dict_all_values, read_string_rep
+from new_cancel import NewCancel
+from quote import Quote
+from log_reader import detect_compression
+
+# Columns: (name, array type code). The 8 bytes columns come first so every column is aligned in the shared block.
+COLUMNS = (
+    ("quote_id", 'q'),
+    ("quote_time", 'q'),
+    ("exchange_time", 'q'),
+    ("amount", 'd'),
+    ("price", 'd'),
+    ("order_type", 'b'),
+    ("curr_pair", 'b'),
+    ("order_way", 'b'),
+)
+
+# Enum values indexed by the stored codes
+ORDER_TYPES = (NewCancel.NEW, NewCancel.CANCEL)
+ORDER_WAYS = (BuySell.SELL, BuySell.BUY)
+
+
+def split_file_in_chunks(file_name: str, chunk_count: int) -> list:
+    """
+    Splits a file into chunk_count byte ranges of about the same size, each one ending after a line feed
+    :param file_name: the log file (plain text)
+    :param chunk_count: number of chunks
+    :return: list of (start, end) byte offsets
+    """
+    file_size = os.path.getsize(file_name)
+    boundaries = [0]
+    with open(file_name, 'rb') as file_reader:
+        for chunk_index in range(1, chunk_count):
+            approximate_offset = max(file_size * chunk_index // chunk_count, boundaries[-1])
+            file_reader.seek(approximate_offset)
+            # Move to the start of the next line
+            file_reader.readline()
+            boundaries.append(min(file_reader.tell(), file_size))
+    boundaries.append(file_size)
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+def parse_chunk(file_name: str, start: int, end: int) -> tuple:
+    """
+    Parses the lines of the byte range [start, end) into columns stored in a new shared memory block.
+    Runs in a worker process.
+    :return: (shared memory name, number of rows)
+    """
+    with open(file_name, 'rb') as file_reader:
+        file_reader.seek(start)
+        content = file_reader.read(end - start).decode()
+
+    columns = [array(type_code) for name, type_code in COLUMNS]
+    quote_ids, quote_times, exchange_times, amounts, prices, order_types, curr_pairs, order_ways = columns
+    # Same fields as Quote.__init__
+    for row in content.splitlines():
+        if row == '':
+            continue
+        split_row = row.split(';', 10)
+        is_new = split_row[0] == 'N'
+        quote_ids.append(int(split_row[1]))
+        curr_pair = dict_all_values.get(split_row[2])
+        curr_pairs.append(curr_pair if curr_pair is not None else read_string_rep(split_row[2]))
+        quote_times.append(int(split_row[3]))
+        exchange_times.append(int(split_row[4]))
+        if is_new:
+            order_types.append(0)
+            amounts.append(float(split_row[5]))
+            prices.append(float(split_row[8]))
+            order_ways.append(1 if split_row[9] == 'B' else 0)
+        else:
+            order_types.append(1)
+            amounts.append(0.00)
+            prices.append(0.00)
+            order_ways.append(0)
+
+    row_count = len(quote_ids)
+    block = _create_untracked_block(max(1, sum(column.itemsize * row_count for column in columns)))
+    offset = 0
+    for column in columns:
+        column_bytes = column.tobytes()
+        block.buf[offset:offset + len(column_bytes)] = column_bytes
+        offset += len(column_bytes)
+    block.close()
+    return block.name, row_count
+
+
+def _create_untracked_block(size: int) -> shared_memory.SharedMemory:
+    """
+    Creates a shared memory block owned by the parent process: without this, the resource tracker of the worker
+    would destroy the block when the worker exits, possibly before the parent mapped it.
+    """
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        # Python < 3.13: no track argument
+        block = shared_memory.SharedMemory(create=True, size=size)
+        if os.name == "posix":
+            resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+class ParsedColumns:
+    # Shared memory blocks (one per chunk, in the order of the file) and their row counts
+    __blocks: list
+    __row_counts: list
+    # For each chunk: dictionary column name -> memoryview on the shared block
+    __chunk_columns: list
+
+    def __init__(self, chunk_results: list):
+        """
+        Maps the shared memory blocks created by the workers
+        :param chunk_results: list of (shared memory name, number of rows) in the order of the file
+        """
+        self.__blocks = []
+        self.__row_counts = []
+        self.__chunk_columns = []
+        for block_name, row_count in chunk_results:
+            block = shared_memory.SharedMemory(name=block_name)
+            self.__blocks.append(block)
+            self.__row_counts.append(row_count)
+            columns = {}
+            offset = 0
+            for name, type_code in COLUMNS:
+                column_size = array(type_code).itemsize * row_count
+                columns[name] = block.buf[offset:offset + column_size].cast(type_code)
+                offset += column_size
+            self.__chunk_columns.append(columns)
+
+    def __len__(self):
+        return sum(self.__row_counts)
+
+    def column(self, name: str) -> list:
+        """
+        Returns one column
+        :param name: a name of COLUMNS
+        :return: list of memoryviews (one per chunk, in the order of the file)
+        """
+        return [columns[name] for columns in self.__chunk_columns]
+
+    def iter_quotes(self, start_row: int = 0):
+        """
+        Yields the rows as Quote instances, in the order of the file
+        :param start_row: number of rows to skip
+        :return: generator of Quote
+        """
+        for columns, row_count in zip(self.__chunk_columns, self.__row_counts):
+            if start_row >= row_count:
+                start_row -= row_count
+                continue
+            for order_type, quote_id, curr_pair, quote_time, exchange_time, amount, price, order_way in \
+                    zip(columns["order_type"][start_row:], columns["quote_id"][start_row:],
+                        columns["curr_pair"][start_row:], columns["quote_time"][start_row:],
+                        columns["exchange_time"][start_row:], columns["amount"][start_row:],
+                        columns["price"][start_row:], columns["order_way"][start_row:]):
+                yield Quote.from_fields(ORDER_TYPES[order_type], quote_id, curr_pair, quote_time, exchange_time,
+                                        amount, price, ORDER_WAYS[order_way])
+            start_row = 0
+
+    def close(self):
+        """
+        Releases and destroys the shared memory blocks
+        :return:
+        """
+        for columns in self.__chunk_columns:
+            for column in columns.values():
+                column.release()
+        self.__chunk_columns = []
+        for block in self.__blocks:
+            block.close()
+            block.unlink()
+        self.__blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def parse_file_in_parallel(file_name: str, max_workers: int = None) -> ParsedColumns:
+    """
+    Parses a plain text log file in a process pool
+    :param file_name: the log file (compressed files cannot be split)
+    :param max_workers: number of processes (default: all the cores)
+    :return: ParsedColumns, to be closed once the replay is done
+    """
+    if detect_compression(file_name) is not None:
+        raise RuntimeError("The compressed file {0} cannot be split for a parallel parsing".format(file_name))
+    if os.name != "posix":
+        # Windows destroys a block when its last handle is closed, i.e. when the worker returns
+        raise RuntimeError("The parallel parsing needs POSIX shared memory")
+    worker_count = max_workers if max_workers is not None else os.cpu_count()
+    chunks = split_file_in_chunks(file_name, worker_count)
+    with ProcessPoolExecutor(max_workers=worker_count) as executor:
+        futures = [executor.submit(parse_chunk, file_name, start, end) for start, end in chunks]
+        try:
+            chunk_results = [future.result() for future in futures]
+        except Exception:
+            # Do not leak the blocks of the chunks that were parsed
+            for future in futures:
+                if future.done() and future.exception() is None:
+                    block = shared_memory.SharedMemory(name=future.result()[0])
+                    block.close()
+                    block.unlink()
+            raise
+    return ParsedColumns(chunk_results)
@@ -0,0 +1,69 @@
+from typing import NamedTuple
+
+from curr_pair import CurrPair
+from trade_situation import TradeSituation
+
+
+class LedgerEntry(NamedTuple):
+    # One closed (or still open) position, reduced to the figures needed by the statistics.
+    trade_situation_id: int
+    is_long_trade: bool
+    pnl_bps: float
+    draw_down_bps: float
+    # Traded amount and spreads of the book at the opening and the closing, to calculate the costs (CostModel)
+    amount: float = 0.0
+    open_spread: float = 0.0
+    close_spread: float = 0.0
+
+
+class PerformanceSummary(NamedTuple):
+    # Aggregated statistics of a list of positions (same figures as printed by main.py).
+    positions_opened: int
+    total_pnl: float
+    maximal_draw_down: float
+    calmar_ratio: float
+    transaction_price: float
+    total_profit: float
+    net_profit: float
+
+
+def build_ledger(positions: list) -> list:
+    """
+    Reduces the TradeSituation instances to LedgerEntry records (no reference to the quotes is kept).
+    :param positions: list of TradeSituation (MomentumStrategy.all_positions())
+    :return: list of LedgerEntry, in the order of the positions
+    """
+    position: TradeSituation
+    return [LedgerEntry(position.trade_situation_id(), position.is_long_trade(), position.return_current_pnl(),
+                        position.return_current_draw_down(), position.amount(), position.open_spread(),
+                        position.close_spread()) for position in positions]
+
+
+def summarize_ledger(ledger: list, traded_amount: float, price_per_mil: float, cost_model=None,
+                     curr_pair: CurrPair = None) -> PerformanceSummary:
+    """
+    Calculates the total PnL, the maximal draw down, the Calmar ratio and the transaction costs of a ledger.
+    :param ledger: list of LedgerEntry
+    :param traded_amount: amount traded per position
+    :param price_per_mil: transaction price per million traded
+    :param cost_model: CostModel of the transaction costs (None: price_per_mil for every position)
+    :param curr_pair: traded pair (for the commission of the cost model)
+    :return: PerformanceSummary
+    """
+    total_pnl: float = 0.0
+    maximal_draw_down: float = 0.0
+    entry: LedgerEntry
+    for entry in ledger:
+        total_pnl += entry.pnl_bps
+        if entry.draw_down_bps > maximal_draw_down:
+            maximal_draw_down = entry.draw_down_bps
+    # Without any draw down the ratio is not defined: report 0.0 rather than dividing by zero
+    calmar_ratio = total_pnl / maximal_draw_down if maximal_draw_down > 0.0 else 0.0
+    if cost_model is not None:
+        transaction_price = float(cost_model.ledger_costs(ledger, curr_pair, traded_amount).sum())
+    else:
+        # We buy then we sell => thus it's traded amount X 2
+        transaction_price = traded_amount * 2.0 * price_per_mil / 1000000.00 * len(ledger)
+    total_profit = traded_amount * total_pnl
+    return PerformanceSummary(len(ledger), total_pnl, maximal_draw_down, calmar_ratio, transaction_price,
+                              total_profit, total_profit - transaction_price)
@@ -0,0 +1,227 @@
+# Portfolio of the positions of several pairs.
+#
+# The portfolio keeps the net cash flow of every currency: opening a LONG XXX/YYY position of amount A at price P
+# adds A XXX and -A * P YYY, closing it at price Q adds -A XXX and A * Q YYY. The flows are updated when a position
+# opens or closes (O(1)), so the net exposure per currency is always known without summing the positions. The PnL of
+# all the positions, realized and unrealized, is the value of these flows in the base currency at the live mids.
+from curr_pair import CurrPair, dict_all_values
+from top_of_book import TopOfBook
+from trade_situation import TradeSituation
+
+# Currency of the cross rates when a pair with the base currency is missing
+CROSS_CURRENCY = "USD"
+
+
+def pair_currencies(curr_pair: CurrPair) -> tuple:
+    """
+    Returns the two currencies of a pair
+    :param curr_pair: the pair
+    :return: (base currency, quote currency), e.g. ("EUR", "USD") for EUR/USD
+    """
+    for name, known_curr_pair in dict_all_values.items():
+        if known_curr_pair == curr_pair:
+            base_currency, quote_currency = name.split("/")
+            return base_currency, quote_currency
+    raise RuntimeError("Please add {} to the dict_all_values collection.".format(curr_pair))
+
+
+class Portfolio:
+    # Currency of the PnL
+    __base_currency: str
+    # Maximal absolute net exposure per currency (currencies without limit are not checked)
+    __exposure_limits: dict
+    # Net cash flow per currency
+    __exposures: dict
+    # Last mid price per pair, and the currencies of the known pairs: CurrPair -> (base currency, quote currency)
+    __mids: dict
+    __pair_currencies: dict
+    # Direct rates: (from currency, to currency) -> CurrPair and True if the rate is the mid, False if it is 1 / mid
+    __rate_pairs: dict
+    # Position -> CurrPair of the open positions
+    __open_positions: dict
+    __rejected_count: int
+    __opened_count: int
+
+    def __init__(self, base_currency: str = "USD", exposure_limits: dict = None):
+        """
+        Creates an empty portfolio
+        :param base_currency: currency of the PnL
+        :param exposure_limits: currency -> maximal absolute net exposure in that currency
+        """
+        self.__base_currency = base_currency
+        self.__exposure_limits = dict(exposure_limits) if exposure_limits is not None else {}
+        self.__exposures = {}
+        self.__mids = {}
+        self.__pair_currencies = {}
+        self.__rate_pairs = {}
+        self.__open_positions = {}
+        self.__rejected_count = 0
+        self.__opened_count = 0
+
+    def on_book_update(self, curr_pair: CurrPair, top_of_book: TopOfBook):
+        """
+        Records the mid price of a pair (ignored while one side of the book is empty)
+        :param curr_pair: the pair of the book
+        :param top_of_book: the best prices of the book
+        :return:
+        """
+        if top_of_book.is_bid_set and top_of_book.is_offer_set:
+            self._currencies(curr_pair)
+            self.__mids[curr_pair] = top_of_book.mid_price
+
+    def _currencies(self, curr_pair: CurrPair) -> tuple:
+        currencies = self.__pair_currencies.get(curr_pair)
+        if currencies is None:
+            currencies = self._add_pair(curr_pair)
+        return currencies
+
+    def _add_pair(self, curr_pair: CurrPair) -> tuple:
+        base_currency, quote_currency = pair_currencies(curr_pair)
+        self.__pair_currencies[curr_pair] = (base_currency, quote_currency)
+        self.__rate_pairs[(base_currency, quote_currency)] = (curr_pair, True)
+        self.__rate_pairs[(quote_currency, base_currency)] = (curr_pair, False)
+        return base_currency, quote_currency
+
+    def check_rates(self, curr_pairs: list):
+        """
+        Checks, before the replay, that every currency of the traded pairs can be valued in the base currency with the
+        books of these pairs (directly or through CROSS_CURRENCY)
+        :param curr_pairs: the traded pairs
+        :return:
+        """
+        for curr_pair in curr_pairs:
+            self._currencies(curr_pair)
+        for curr_pair in curr_pairs:
+            base_currency, quote_currency = self._currencies(curr_pair)
+            for currency in (base_currency, quote_currency):
+                if not self._has_rate_pairs(currency):
+                    cross_currency_text = "" if CROSS_CURRENCY in (currency, self.__base_currency) else \
+                        " (or pairs of {0} and of {1} with {2})".format(currency, self.__base_currency, CROSS_CURRENCY)
+                    raise Exception("Please add a pair of {0} with {1}{2} to value the {3}/{4} positions"
+                                    .format(currency, self.__base_currency, cross_currency_text, base_currency,
+                                            quote_currency))
+
+    def _has_rate_pairs(self, currency: str) -> bool:
+        if currency == self.__base_currency or (currency, self.__base_currency) in self.__rate_pairs:
+            return True
+        return CROSS_CURRENCY not in (currency, self.__base_currency) and \
+            (currency, CROSS_CURRENCY) in self.__rate_pairs and \
+            (CROSS_CURRENCY, self.__base_currency) in self.__rate_pairs
+
+    def can_open(self, curr_pair: CurrPair, is_long: bool, amount: float, price: float) -> bool:
+        """
+        Checks the exposure limits before a position is opened. A position that reduces an exposure is always allowed.
+        :param curr_pair: the traded pair
+        :param is_long: True for a LONG position (buys the base currency of the pair)
+        :param amount: amount in the base currency of the pair
+        :param price: expected price
+        :return: False if an exposure would exceed its limit (the position is counted as rejected)
+        """
+        base_currency, quote_currency = self._currencies(curr_pair)
+        base_flow = amount if is_long else -amount
+        for currency, flow in ((base_currency, base_flow), (quote_currency, -base_flow * price)):
+            limit = self.__exposure_limits.get(currency)
+            if limit is None:
+                continue
+            exposure = self.__exposures.get(currency, 0.0)
+            new_exposure = exposure + flow
+            if abs(new_exposure) > limit and abs(new_exposure) > abs(exposure):
+                self.__rejected_count += 1
+                return False
+        return True
+
+    def on_open(self, position: TradeSituation, curr_pair: CurrPair):
+        """
+        Adds the flows of an opened position
+        :param position: the position
+        :param curr_pair: the traded pair
+        :return:
+        """
+        self.__open_positions[position] = curr_pair
+        self.__opened_count += 1
+        self._add_flows(curr_pair, position.is_long_trade(), position.amount(), position.open_price())
+
+    def on_close(self, position: TradeSituation):
+        """
+        Adds the flows of a closed position
+        :param position: the position (already closed)
+        :return:
+        """
+        curr_pair = self.__open_positions.pop(position)
+        self._add_flows(curr_pair, not position.is_long_trade(), position.amount(), position.close_price())
+
+    def _add_flows(self, curr_pair: CurrPair, is_buy: bool, amount: float, price: float):
+        base_currency, quote_currency = self._currencies(curr_pair)
+        base_flow = amount if is_buy else -amount
+        self.__exposures[base_currency] = self.__exposures.get(base_currency, 0.0) + base_flow
+        self.__exposures[quote_currency] = self.__exposures.get(quote_currency, 0.0) - base_flow * price
+
+    def rate(self, currency: str) -> float:
+        """
+        Returns the value of one unit of a currency in the base currency, from the last mids (directly or through
+        CROSS_CURRENCY)
+        :param currency: the currency
+        :return: the rate, None if no book gives it yet
+        """
+        if currency == self.__base_currency:
+            return 1.0
+        rate = self._direct_rate(currency, self.__base_currency)
+        if rate is None and CROSS_CURRENCY not in (currency, self.__base_currency):
+            first_rate = self._direct_rate(currency, CROSS_CURRENCY)
+            second_rate = self._direct_rate(CROSS_CURRENCY, self.__base_currency)
+            if first_rate is not None and second_rate is not None:
+                rate = first_rate * second_rate
+        return rate
+
+    def _direct_rate(self, from_currency: str, to_currency: str) -> float:
+        rate_pair = self.__rate_pairs.get((from_currency, to_currency))
+        if rate_pair is None:
+            return None
+        curr_pair, is_mid = rate_pair
+        mid = self.__mids.get(curr_pair)
+        if mid is None or mid == 0.0:
+            return None
+        return mid if is_mid else 1.0 / mid
+
+    def exposure(self, currency: str) -> float:
+        """
+        Returns the net exposure (sum of the flows) in a currency
+        :param currency: the currency
+        :return:
+        """
+        return self.__exposures.get(currency, 0.0)
+
+    def exposures(self) -> dict:
+        return dict(self.__exposures)
+
+    def total_pnl(self) -> float:
+        """
+        Returns the PnL (realized and unrealized) of all the positions in the base currency
+        :return:
+        """
+        total_pnl = 0.0
+        for currency, exposure in self.__exposures.items():
+            if exposure == 0.0:
+                continue
+            rate = self.rate(currency)
+            if rate is None:
+                raise RuntimeError("No rate from {0} to {1}: add a book of a pair with both currencies"
+                                   .format(currency, self.__base_currency))
+            total_pnl += exposure * rate
+        return total_pnl
+
+    def base_currency(self) -> str:
+        return self.__base_currency
+
+    def open_positions_count(self) -> int:
+        return len(self.__open_positions)
+
+    def opened_count(self) -> int:
+        return self.__opened_count
+
+    def rejected_count(self) -> int:
+        """
+        Returns the number of positions not opened because of the exposure limits
+        :return:
+        """
+        return self.__rejected_count
@@ -4,12 +4,19 @@ from buy_sell import BuySell
 from new_cancel import NewCancel
 from math import fabs, floor, ceil
 
+# LOCAL TIMESTAMP (Quote.time()) is expressed in nanoseconds
+QUOTE_TIME_UNITS_PER_MILLISECOND = 1000000
+# EXCHANGE TIMESTAMP (Quote.exchange_time()) is expressed in milliseconds since the epoch
+EXCHANGE_TIME_UNITS_PER_MILLISECOND = 1
+
 
 class Quote:
     # This class encapsulates all the necessary information for a specific quote.
     __quote_id: int
     # Time of the quote (to set in init).
     __quote_time: int
+    # Time of the quote given by the exchange.
+    __exchange_time: int
     # Close price.
     __quote_px: float
     # Amount
@@ -46,12 +53,33 @@ class Quote:
         self.__quote_id = int(split_row[1])
         self.__curr_pair = read_string_rep(split_row[2])
         self.__quote_time = int(split_row[3])
+        self.__exchange_time = int(split_row[4])
         # Fields for NEW only
         if self.__order_type == NewCancel.NEW:
             self.__quote_amount = float(split_row[5])
             self.__quote_px = float(split_row[8])
             self.__order_way = BuySell.BUY if split_row[9] == 'B' else BuySell.SELL
 
+    @staticmethod
+    def from_fields(order_type: NewCancel, quote_id: int, curr_pair: CurrPair, quote_time: int, exchange_time: int,
+                    amount: float, price: float, order_way: BuySell):
+        """
+        Creates a quote from already parsed fields (no string parsing). The amount, price and way are ignored for a
+        CANCEL, as in the string constructor.
+        :return: Quote instance
+        """
+        quote = Quote.__new__(Quote)
+        quote.__order_type = order_type
+        quote.__quote_id = quote_id
+        quote.__curr_pair = curr_pair
+        quote.__quote_time = quote_time
+        quote.__exchange_time = exchange_time
+        if order_type == NewCancel.NEW:
+            quote.__quote_amount = amount
+            quote.__quote_px = price
+            quote.__order_way = order_way
+        return quote
+
     def id(self) -> int:
         """
         Returns the ID of this specific quote
@@ -80,6 +108,13 @@ class Quote:
         """
         return self.__quote_time
 
+    def exchange_time(self) -> int:
+        """
+        Returns the exchange timestamp of this quote (milliseconds since the epoch)
+        :return:
+        """
+        return self.__exchange_time
+
     def currency_pair(self) -> int:
         """
         Returns the currency pair of this quote
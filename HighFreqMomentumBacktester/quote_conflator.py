@@ -0,0 +1,103 @@
+from buy_sell import BuySell
+from quote import Quote, QUOTE_TIME_UNITS_PER_MILLISECOND
+from limit_order_book import LimitOrderBook
+
+
+class QuoteConflator:
+    # Sits between the order book and the strategies: most of the ECN updates are deep in the book and leave the top
+    # of the book unchanged. The strategies are only updated when the observed levels changed (and, optionally, at most
+    # once per time interval).
+    __limit_order_book: LimitOrderBook
+    # Number of observed levels per side (1: top of the book)
+    __depth: int
+    # Ignore the amounts: only a price change is an update
+    __is_price_only: bool
+    # Minimal time between two updates (Quote.time() units). 0: no time conflation.
+    __min_interval: int
+    # State of the book at the last emitted update
+    __last_emitted_state: tuple
+    __last_emitted_time: int
+    # Counters
+    __events_received: int
+    __events_emitted: int
+
+    def __init__(self, limit_order_book: LimitOrderBook, depth: int = 1, min_interval_us: int = 0,
+                 is_price_only: bool = False):
+        """
+        Creates the conflation stage of an order book.
+        :param limit_order_book: the observed book
+        :param depth: number of price levels per side compared between two events (1: top of the book)
+        :param min_interval_us: at most one update per min_interval_us microseconds (0 disables the time conflation)
+        :param is_price_only: compare the prices only (the level amounts are ignored)
+        """
+        if depth <= 0:
+            raise Exception("Please init the class with a depth higher than 0")
+        if min_interval_us < 0:
+            raise Exception("The conflation interval ({0}) cannot be negative".format(min_interval_us))
+        self.__limit_order_book = limit_order_book
+        self.__depth = depth
+        self.__is_price_only = is_price_only
+        self.__min_interval = min_interval_us * QUOTE_TIME_UNITS_PER_MILLISECOND // 1000
+        self.__last_emitted_state = None
+        self.__last_emitted_time = None
+        self.__events_received = 0
+        self.__events_emitted = 0
+
+    def on_book_update(self, quote: Quote) -> bool:
+        """
+        Called after the book processed the quote.
+        :param quote: the quote just applied to the book
+        :return: True if the strategies have to be updated with this quote
+        """
+        self.__events_received += 1
+        # Time conflation: a change is held back until the interval elapsed. As the state is compared with the
+        # last emitted one, the held back change is emitted by the first event after the interval.
+        if self.__min_interval > 0 and self.__last_emitted_time is not None and \
+                quote.time() - self.__last_emitted_time < self.__min_interval:
+            return False
+        current_state = self._current_state()
+        if current_state == self.__last_emitted_state:
+            return False
+        self.__last_emitted_state = current_state
+        self.__last_emitted_time = quote.time()
+        self.__events_emitted += 1
+        return True
+
+    def _current_state(self) -> tuple:
+        """
+        Returns the observed levels of the book
+        :return:
+        """
+        limit_order_book = self.__limit_order_book
+        if self.__depth == 1:
+            # Top of the book: no sort needed
+            if self.__is_price_only:
+                return limit_order_book.get_best_bid_price(), limit_order_book.get_best_offer_price()
+            return (limit_order_book.get_best_bid_price(), limit_order_book.get_best_bid_amount(),
+                    limit_order_book.get_best_offer_price(), limit_order_book.get_best_offer_amount())
+        bid_levels = limit_order_book.get_top_levels(BuySell.BUY, self.__depth)
+        offer_levels = limit_order_book.get_top_levels(BuySell.SELL, self.__depth)
+        if self.__is_price_only:
+            return tuple(price for price, amount in bid_levels), tuple(price for price, amount in offer_levels)
+        return tuple(bid_levels), tuple(offer_levels)
+
+    def events_received(self) -> int:
+        """
+        Returns the number of book updates seen by the conflation stage
+        :return:
+        """
+        return self.__events_received
+
+    def events_emitted(self) -> int:
+        """
+        Returns the number of strategy updates let through
+        :return:
+        """
+        return self.__events_emitted
+
+    def events_saved(self) -> int:
+        """
+        Returns the number of strategy invocations saved by the conflation
+        :return:
+        """
+        return self.__events_received - self.__events_emitted
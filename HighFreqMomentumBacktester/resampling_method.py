@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+# Enumerates how the robustness analysis resamples the PnL sequence of the positions:
+# BLOCK_BOOTSTRAP draws blocks of consecutive positions with replacement (keeps the short-term dependence of the
+# trades), REORDER shuffles the positions (same trades, another path: only the draw down changes).
+class ResamplingMethod(Enum):
+    BLOCK_BOOTSTRAP = 0
+    REORDER = 1
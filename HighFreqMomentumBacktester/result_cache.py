@@ -0,0 +1,174 @@
+# On-disk cache of backtest results.
+#
+# An entry is addressed by the hash of the content of the log file, the strategy parameters and the version of the
+# code (hash of the sources of the modules that make the results). It holds the position ledger: the summary is
+# recalculated from it on every read, as the transaction costs depend on arguments that do not change the replay.
+# The least recently used entries are deleted once the cache is larger than its maximal size.
+import hashlib
+import json
+import os
+import pickle
+
+from curr_pair import CurrPair
+from performance_summary import summarize_ledger
+
+# Increment when the layout of the entries changes
+RESULT_CACHE_FORMAT_VERSION = 2
+# Modules whose code changes the results of a backtest. main.py holds the replay loop (the events given to the book
+# and to the strategy, the conflation, the recovery policies of the command line), parallel_parser.py builds the
+# quotes of --parse-workers.
+RESULT_MODULES = ("main.py", "quote.py", "curr_pair.py", "buy_sell.py", "new_cancel.py", "parallel_parser.py",
+                  "limit_order_book.py", "book_recovery_policy.py", "top_of_book.py", "momentum_strategy.py",
+                  "trade_situation.py", "indicators.py", "indicator_registry.py", "ma_window_type.py",
+                  "quote_conflator.py", "performance_summary.py", "log_reader.py", "take_profit_index.py",
+                  "portfolio.py", "book_journal.py")
+ENTRY_SUFFIX = ".result"
+DIGESTS_FILE_NAME = "digests.json"
+
+
+def code_version() -> str:
+    """
+    Returns the hash of the sources of RESULT_MODULES
+    :return: hexadecimal digest
+    """
+    digest = hashlib.sha256(str(RESULT_CACHE_FORMAT_VERSION).encode())
+    source_directory = os.path.dirname(os.path.abspath(__file__))
+    for module_file_name in RESULT_MODULES:
+        with open(os.path.join(source_directory, module_file_name), 'rb') as file_reader:
+            digest.update(file_reader.read())
+    return digest.hexdigest()
+
+
+def file_digest(file_name: str, block_size: int = 1 << 20) -> str:
+    """
+    Returns the hash of the content of a file
+    :param file_name: the file
+    :param block_size: bytes read at once
+    :return: hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file_reader:
+        block = file_reader.read(block_size)
+        while block:
+            digest.update(block)
+            block = file_reader.read(block_size)
+    return digest.hexdigest()
+
+
+def _write_atomically(file_name: str, content: bytes):
+    temporary_file_name = "{0}.{1}.tmp".format(file_name, os.getpid())
+    with open(temporary_file_name, 'wb') as file_writer:
+        file_writer.write(content)
+    os.replace(temporary_file_name, file_name)
+
+
+class ResultCache:
+    __directory: str
+    # Total size of the entries above which the least recently used ones are deleted (bytes)
+    __max_size: int
+    __code_version: str
+    # Digests of the log files already hashed: absolute path -> [size, modification time (ns), digest]
+    __file_digests: dict
+
+    def __init__(self, directory: str, max_size: int = 256 * 1024 * 1024):
+        """
+        Opens (or creates) a cache directory
+        :param directory: the cache directory
+        :param max_size: maximal total size of the entries (bytes)
+        """
+        if max_size <= 0:
+            raise Exception("Please init the class with a maximal size higher than 0")
+        os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__code_version = code_version()
+        self.__file_digests = {}
+        digests_file_name = os.path.join(directory, DIGESTS_FILE_NAME)
+        if os.path.exists(digests_file_name):
+            with open(digests_file_name, 'r') as file_reader:
+                self.__file_digests = json.load(file_reader)
+
+    def get(self, file_name: str, parameters: dict, traded_amount: float, price_per_mil: float, cost_model=None,
+            curr_pair: CurrPair = None) -> tuple:
+        """
+        Looks up the result of a backtest
+        :param file_name: the log file
+        :param parameters: everything that changes the replay (pair, strategy parameters...), JSON serializable
+        :param traded_amount: traded amount (for the summary)
+        :param price_per_mil: transaction price per million (for the summary)
+        :param cost_model: CostModel of the transaction costs (for the summary, None: price_per_mil)
+        :param curr_pair: traded pair (for the summary)
+        :return: (list of LedgerEntry, PerformanceSummary), or None if the result is not in the cache
+        """
+        entry_file_name = self._entry_file_name(file_name, parameters)
+        try:
+            with open(entry_file_name, 'rb') as file_reader:
+                ledger = pickle.loads(file_reader.read())
+        except FileNotFoundError:
+            return None
+        # Least recently used: the modification time is the time of the last use
+        os.utime(entry_file_name)
+        return ledger, summarize_ledger(ledger, traded_amount, price_per_mil, cost_model, curr_pair)
+
+    def put(self, file_name: str, parameters: dict, ledger: list):
+        """
+        Stores the result of a backtest, then deletes the least recently used entries if the cache is too large
+        :param file_name: the log file
+        :param parameters: same dictionary as for get()
+        :param ledger: list of LedgerEntry
+        :return:
+        """
+        _write_atomically(self._entry_file_name(file_name, parameters),
+                          pickle.dumps(list(ledger), protocol=pickle.HIGHEST_PROTOCOL))
+        self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used entries until the cache is not larger than its maximal size
+        :return:
+        """
+        entries = []
+        total_size = 0
+        for directory_entry in os.scandir(self.__directory):
+            if directory_entry.name.endswith(ENTRY_SUFFIX):
+                entry_stat = directory_entry.stat()
+                entries.append((entry_stat.st_mtime_ns, entry_stat.st_size, directory_entry.path))
+                total_size += entry_stat.st_size
+        entries.sort()
+        for last_use_time, entry_size, entry_path in entries:
+            if total_size <= self.__max_size:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                # Evicted by another process
+                pass
+            total_size -= entry_size
+
+    def size(self) -> int:
+        """
+        Returns the total size of the entries (bytes)
+        :return:
+        """
+        return sum(directory_entry.stat().st_size for directory_entry in os.scandir(self.__directory)
+                   if directory_entry.name.endswith(ENTRY_SUFFIX))
+
+    def _entry_file_name(self, file_name: str, parameters: dict) -> str:
+        key = json.dumps([self._file_digest(file_name), self.__code_version, parameters], sort_keys=True)
+        return os.path.join(self.__directory, hashlib.sha256(key.encode()).hexdigest() + ENTRY_SUFFIX)
+
+    def _file_digest(self, file_name: str) -> str:
+        """
+        Returns the hash of a log file, hashing it only if it is new or changed since it was last hashed
+        """
+        absolute_file_name = os.path.abspath(file_name)
+        file_stat = os.stat(absolute_file_name)
+        known_digest = self.__file_digests.get(absolute_file_name)
+        if known_digest is not None and known_digest[0] == file_stat.st_size and \
+                known_digest[1] == file_stat.st_mtime_ns:
+            return known_digest[2]
+        digest = file_digest(absolute_file_name)
+        self.__file_digests[absolute_file_name] = [file_stat.st_size, file_stat.st_mtime_ns, digest]
+        _write_atomically(os.path.join(self.__directory, DIGESTS_FILE_NAME),
+                          json.dumps(self.__file_digests).encode())
+        return digest
@@ -0,0 +1,213 @@
+# Bootstrap / Monte Carlo robustness analysis of a position ledger.
+#
+# The PnL sequence of the positions is resampled thousands of times (block bootstrap or random reordering) and the
+# total PnL, the maximal draw down and the Calmar ratio of every resampled path give confidence intervals for the
+# figures of the backtest. The paths are simulated in NumPy batches (one row per path, the batch size bounded by the
+# memory) and the batches are spread over a process pool: the ledger is sent once per process, each task gets its
+# own seed so the result does not depend on the number of processes.
+#
+# The draw down of a path is measured on the equity curve: from the highest cumulated PnL down to the lowest point,
+# the lowest point of a position being its cumulated PnL before the position minus its own draw down. It is never
+# lower than the maximal draw down of one position reported by summarize_ledger().
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from performance_summary import LedgerEntry
+from resampling_method import ResamplingMethod
+
+# Maximal number of simulated positions (paths x positions) of a batch: the arrays of a batch (1 MB each) stay in
+# the cache of the core, which is about twice faster than larger batches
+MAX_BATCH_ELEMENTS = 128 * 1024
+# Number of paths of a task: smaller tasks balance the load, larger ones pay less overhead
+PATHS_PER_TASK = 250
+
+# Ledger of the worker processes (set once per process by _init_worker)
+_worker_ledger: tuple = None
+
+
+class ConfidenceInterval(NamedTuple):
+    # Value of the backtest, and distribution of the resampled values
+    observed: float
+    mean: float
+    lower: float
+    median: float
+    upper: float
+
+
+class RobustnessReport(NamedTuple):
+    method: ResamplingMethod
+    sample_count: int
+    block_length: int
+    # Two-sided level of the intervals (e.g. 0.95 for the 2.5% and 97.5% percentiles)
+    confidence_level: float
+    total_pnl: ConfidenceInterval
+    maximal_draw_down: ConfidenceInterval
+    calmar_ratio: ConfidenceInterval
+    # Share of the resampled paths that lose money
+    probability_of_loss: float
+
+
+def path_statistics(pnl: np.ndarray, draw_down: np.ndarray) -> tuple:
+    """
+    Calculates the statistics of paths of positions
+    :param pnl: PnL of the positions (bps), one path per row
+    :param draw_down: draw down of the positions (bps, positive), same shape
+    :return: (total PnL, maximal draw down, Calmar ratio) arrays, one value per path
+    """
+    cumulated_pnl = np.cumsum(pnl, axis=1)
+    # Cumulated PnL before each position, then the highest one so far (the path starts at 0.0), computed in place
+    peaks = np.subtract(cumulated_pnl, pnl)
+    troughs = np.subtract(peaks, draw_down)
+    np.minimum(troughs, cumulated_pnl, out=troughs)
+    np.maximum(peaks, 0.0, out=peaks)
+    np.maximum.accumulate(peaks, axis=1, out=peaks)
+    np.subtract(peaks, troughs, out=peaks)
+    maximal_draw_downs = np.maximum(peaks.max(axis=1), 0.0)
+    total_pnl = cumulated_pnl[:, -1]
+    # Same convention as summarize_ledger(): 0.0 without draw down
+    calmar_ratios = np.divide(total_pnl, maximal_draw_downs, out=np.zeros_like(total_pnl),
+                              where=maximal_draw_downs > 0.0)
+    return total_pnl, maximal_draw_downs, calmar_ratios
+
+
+def resample_indices(random_generator: np.random.Generator, method: ResamplingMethod, path_count: int,
+                     position_count: int, block_length: int) -> np.ndarray:
+    """
+    Draws the positions of resampled paths
+    :param random_generator: NumPy generator
+    :param method: the resampling method
+    :param path_count: number of paths
+    :param position_count: number of positions of the ledger (and of every path)
+    :param block_length: length of the blocks of the block bootstrap
+    :return: (path_count, position_count) array of indexes into the ledger
+    """
+    if method == ResamplingMethod.REORDER:
+        return random_generator.permuted(np.tile(np.arange(position_count), (path_count, 1)), axis=1)
+    if block_length < 1:
+        raise Exception("Please provide a block length higher than 0")
+    # Moving block bootstrap: blocks start anywhere a whole block fits, the last block of a path is truncated
+    block_length = min(block_length, position_count)
+    block_count = -(-position_count // block_length)
+    starts = random_generator.integers(0, position_count - block_length + 1, size=(path_count, block_count))
+    indices = starts[:, :, np.newaxis] + np.arange(block_length)
+    return indices.reshape(path_count, block_count * block_length)[:, :position_count]
+
+
+def simulate_paths(pnl: np.ndarray, draw_down: np.ndarray, method: ResamplingMethod, path_count: int,
+                   block_length: int, seed) -> np.ndarray:
+    """
+    Simulates resampled paths in batches of at most MAX_BATCH_ELEMENTS positions
+    :param pnl: PnL of the positions of the ledger
+    :param draw_down: draw down of the positions of the ledger
+    :param method: the resampling method
+    :param path_count: number of paths
+    :param block_length: length of the blocks of the block bootstrap
+    :param seed: seed (or SeedSequence) of the paths
+    :return: (3, path_count) array: total PnL, maximal draw down and Calmar ratio of every path
+    """
+    random_generator = np.random.default_rng(seed)
+    batch_size = max(1, MAX_BATCH_ELEMENTS // len(pnl))
+    statistics = np.empty((3, path_count))
+    for batch_start in range(0, path_count, batch_size):
+        batch_end = min(batch_start + batch_size, path_count)
+        indices = resample_indices(random_generator, method, batch_end - batch_start, len(pnl), block_length)
+        statistics[:, batch_start:batch_end] = path_statistics(pnl[indices], draw_down[indices])
+    return statistics
+
+
+def default_block_length(position_count: int) -> int:
+    """
+    Returns the usual block length of a block bootstrap: the cube root of the number of positions
+    :param position_count: number of positions
+    :return:
+    """
+    return max(1, int(round(position_count ** (1.0 / 3.0))))
+
+
+def run_robustness_analysis(ledger: list, method: ResamplingMethod = ResamplingMethod.BLOCK_BOOTSTRAP,
+                            sample_count: int = 2000, block_length: int = None, confidence_level: float = 0.95,
+                            seed: int = None, max_workers: int = None) -> RobustnessReport:
+    """
+    Resamples the positions of a ledger and calculates confidence intervals of its statistics
+    :param ledger: list of LedgerEntry, in the order the positions were opened
+    :param method: the resampling method
+    :param sample_count: number of resampled paths
+    :param block_length: length of the blocks of the block bootstrap (default: default_block_length())
+    :param confidence_level: two-sided level of the intervals
+    :param seed: seed of the paths (same seed, same result whatever the number of processes)
+    :param max_workers: number of processes. 1 simulates the paths in the current process.
+    :return: RobustnessReport
+    """
+    if len(ledger) == 0:
+        raise Exception("Please provide a ledger with at least one position")
+    if sample_count <= 0:
+        raise Exception("Please provide a number of samples higher than 0")
+    if not 0.0 < confidence_level < 1.0:
+        raise Exception("Please provide a confidence level between 0 and 1")
+    if block_length is None:
+        block_length = default_block_length(len(ledger))
+    elif block_length < 1:
+        raise Exception("Please provide a block length higher than 0")
+
+    entry: LedgerEntry
+    pnl = np.fromiter((entry.pnl_bps for entry in ledger), dtype=np.float64, count=len(ledger))
+    draw_down = np.fromiter((entry.draw_down_bps for entry in ledger), dtype=np.float64, count=len(ledger))
+    observed_statistics = path_statistics(pnl[np.newaxis, :], draw_down[np.newaxis, :])
+
+    # The tasks and their seeds do not depend on the number of processes
+    task_sizes = [min(PATHS_PER_TASK, sample_count - task_start) for task_start in range(0, sample_count,
+                                                                                           PATHS_PER_TASK)]
+    task_seeds = np.random.SeedSequence(seed).spawn(len(task_sizes))
+    if max_workers == 1:
+        results = [simulate_paths(pnl, draw_down, method, task_size, block_length, task_seed)
+                   for task_size, task_seed in zip(task_sizes, task_seeds)]
+    else:
+        # The ledger is sent once per process (initializer), not once per task
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(pnl, draw_down)) as executor:
+            futures = [executor.submit(_simulate_worker_paths, method, task_size, block_length, task_seed)
+                       for task_size, task_seed in zip(task_sizes, task_seeds)]
+            results = [future.result() for future in futures]
+    statistics = np.concatenate(results, axis=1)
+
+    percentiles = (50.0 * (1.0 - confidence_level), 50.0, 50.0 * (1.0 + confidence_level))
+    intervals = []
+    for observed_values, sampled_values in zip(observed_statistics, statistics):
+        lower, median, upper = np.percentile(sampled_values, percentiles)
+        intervals.append(ConfidenceInterval(float(observed_values[0]), float(sampled_values.mean()), float(lower),
+                                            float(median), float(upper)))
+    return RobustnessReport(method, sample_count, block_length, confidence_level, *intervals,
+                            float(np.mean(statistics[0] < 0.0)))
+
+
+def _init_worker(pnl: np.ndarray, draw_down: np.ndarray):
+    global _worker_ledger
+    _worker_ledger = (pnl, draw_down)
+
+
+def _simulate_worker_paths(method: ResamplingMethod, path_count: int, block_length: int, seed) -> np.ndarray:
+    pnl, draw_down = _worker_ledger
+    return simulate_paths(pnl, draw_down, method, path_count, block_length, seed)
+
+
+def format_report(report: RobustnessReport) -> list:
+    """
+    Formats a report for the console
+    :param report: RobustnessReport
+    :return: list of lines
+    """
+    lines = ["Robustness ({0}, {1} paths{2}): {3:2.0f}% confidence intervals"
+             .format(report.method.name, report.sample_count,
+                     ", blocks of {0}".format(report.block_length)
+                     if report.method == ResamplingMethod.BLOCK_BOOTSTRAP else "",
+                     100.0 * report.confidence_level)]
+    for name, interval in (("Total profit (loss) bps", report.total_pnl),
+                           ("Equity draw down bps", report.maximal_draw_down),
+                           ("Calmar ratio", report.calmar_ratio)):
+        lines.append("    {0}: observed {1:2.6f}, mean {2:2.6f}, [{3:2.6f}, {4:2.6f}], median {5:2.6f}"
+                     .format(name, interval.observed, interval.mean, interval.lower, interval.upper,
+                             interval.median))
+    lines.append("    Probability of loss: {0:2.2f}%".format(100.0 * report.probability_of_loss))
+    return lines
@@ -0,0 +1,102 @@
+class StreamingHistogram:
+    # HDR-style histogram of non negative integers: the values are grouped in buckets whose width doubles with every
+    # power of 2, so the relative error is bounded (2 ** -(precision_bits - 1)) and the number of buckets is at most
+    # 64 * 2 ** precision_bits whatever the number of recorded values.
+    __precision_bits: int
+    # Lower bound of the bucket -> number of values
+    __counts: dict
+    __total_count: int
+    __sum: int
+    __min: int
+    __max: int
+
+    def __init__(self, precision_bits: int = 7):
+        """
+        Creates an empty histogram
+        :param precision_bits: bits kept for each value (7: less than 1.6% relative error)
+        """
+        if precision_bits <= 0:
+            raise Exception("Please init the class with a precision higher than 0")
+        self.__precision_bits = precision_bits
+        self.__counts = {}
+        self.__total_count = 0
+        self.__sum = 0
+        self.__min = None
+        self.__max = None
+
+    def record(self, value: int, count: int = 1):
+        """
+        Adds a value
+        :param value: the value (non negative, rounded down to an integer)
+        :param count: number of occurrences
+        :return:
+        """
+        value = int(value)
+        if value < 0:
+            raise RuntimeError("The histogram only records non negative values ({0})".format(value))
+        # Drop the low bits that are beyond the precision: what is left is the lower bound of the bucket
+        dropped_bits = value.bit_length() - self.__precision_bits
+        bucket = (value >> dropped_bits) << dropped_bits if dropped_bits > 0 else value
+        self.__counts[bucket] = self.__counts.get(bucket, 0) + count
+        self.__total_count += count
+        self.__sum += value * count
+        if self.__min is None or value < self.__min:
+            self.__min = value
+        if self.__max is None or value > self.__max:
+            self.__max = value
+
+    def merge(self, other):
+        """
+        Adds the values of another histogram with the same precision
+        :param other: StreamingHistogram
+        :return:
+        """
+        for bucket, count in other.buckets():
+            self.__counts[bucket] = self.__counts.get(bucket, 0) + count
+        self.__total_count += other.count()
+        self.__sum += other.total()
+        if other.count() > 0:
+            self.__min = other.min() if self.__min is None else min(self.__min, other.min())
+            self.__max = other.max() if self.__max is None else max(self.__max, other.max())
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Returns an approximation of the percentile (middle of the bucket that contains it)
+        :param percentile: between 0.0 and 100.0
+        :return: 0.0 for an empty histogram
+        """
+        if self.__total_count == 0:
+            return 0.0
+        rank = percentile / 100.0 * self.__total_count
+        cumulated_count = 0
+        for bucket in sorted(self.__counts.keys()):
+            cumulated_count += self.__counts[bucket]
+            if cumulated_count >= rank:
+                bucket_width = 1 << max(bucket.bit_length() - self.__precision_bits, 0)
+                # The exact extremes are known
+                return min(max(bucket + (bucket_width - 1) / 2.0, self.__min), self.__max)
+        return float(self.__max)
+
+    def buckets(self) -> list:
+        """
+        Returns the non empty buckets
+        :return: list of (lower bound, count) sorted by lower bound
+        """
+        return sorted(self.__counts.items())
+
+    def count(self) -> int:
+        return self.__total_count
+
+    def total(self) -> int:
+        return self.__sum
+
+    def mean(self) -> float:
+        if self.__total_count == 0:
+            return 0.0
+        return self.__sum / self.__total_count
+
+    def min(self) -> int:
+        return self.__min
+
+    def max(self) -> int:
+        return self.__max
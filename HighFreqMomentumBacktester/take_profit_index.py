@@ -0,0 +1,120 @@
+import heapq
+from bisect import bisect_right
+
+from trade_situation import TradeSituation
+
+
+class TakeProfitIndex:
+    # Open positions of one way, sorted by their opening price: the positions whose take profit is reached by a
+    # reference price are at the top of the heap, so a tick only visits the positions it closes (O(log n) each).
+    # All the positions of a strategy have the same take profit, so the opening price orders them exactly
+    # (reference - open >= take profit is monotonic in the opening price).
+    #
+    # The PnL and draw down of the positions that are not visited are calculated when they are closed: a position's
+    # draw down comes from the worst reference price since its opening, kept in a monotonic stack (suffix minimum
+    # over the ticks, amortized O(1) per tick and O(log n) per query).
+    __is_long: bool
+    # Heap of (sort key, opening tick, position): opening price for LONG positions, its opposite for SHORT ones
+    __heap: list
+    # Monotonic stack: the positions opened from __start_ticks[i] (included) to __start_ticks[i + 1] (excluded)
+    # have seen the worst reference price __worst_prices[i] (negated for SHORT positions, None if no price yet)
+    __start_ticks: list
+    __worst_prices: list
+    # Last reference price, and the tick when it was received
+    __last_price: float
+    __last_price_tick: int
+
+    def __init__(self, is_long: bool):
+        """
+        Creates an empty index
+        :param is_long: True for LONG positions (closed on the BID side), False for SHORT positions
+        """
+        self.__is_long = is_long
+        self.__heap = []
+        self.__start_ticks = []
+        self.__worst_prices = []
+        self.__last_price = None
+        self.__last_price_tick = -1
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def is_long(self) -> bool:
+        return self.__is_long
+
+    def add(self, position: TradeSituation, tick: int):
+        """
+        Adds a position opened at this tick (after the reference price of the tick was given)
+        :param position: the open position
+        :param tick: number of the strategy step
+        :return:
+        """
+        open_price = position.open_price()
+        heapq.heappush(self.__heap, (open_price if self.__is_long else -open_price, tick, position))
+        # The positions opened since the last price share the entry without price
+        if not self.__worst_prices or self.__worst_prices[-1] is not None:
+            self.__start_ticks.append(tick)
+            self.__worst_prices.append(None)
+
+    def on_reference_price(self, tick: int, price: float, take_profit: float) -> list:
+        """
+        Records the reference price of a tick and returns the positions that reached their take profit
+        :param tick: number of the strategy step (increasing)
+        :param price: best BID (LONG positions) or best OFFER (SHORT positions) price, or the price by amount
+        :param take_profit: take profit of the positions
+        :return: list of positions to close, their PnL and draw down updated
+        """
+        self.__last_price = price
+        self.__last_price_tick = tick
+        # Merge the entries whose worst price is not worse than this price
+        stored_price = price if self.__is_long else -price
+        start_tick = None
+        while self.__worst_prices and (self.__worst_prices[-1] is None or self.__worst_prices[-1] >= stored_price):
+            self.__worst_prices.pop()
+            start_tick = self.__start_ticks.pop()
+        if start_tick is not None:
+            self.__start_ticks.append(start_tick)
+            self.__worst_prices.append(stored_price)
+
+        triggered_positions = []
+        while self.__heap:
+            sort_key, open_tick, position = self.__heap[0]
+            pnl = price - position.open_price() if self.__is_long else position.open_price() - price
+            if pnl < take_profit:
+                break
+            heapq.heappop(self.__heap)
+            self._update_position(position, open_tick)
+            triggered_positions.append(position)
+        self._trim()
+        return triggered_positions
+
+    def pop_all(self) -> list:
+        """
+        Removes all the positions
+        :return: list of positions, their PnL and draw down updated
+        """
+        positions = []
+        for sort_key, open_tick, position in self.__heap:
+            self._update_position(position, open_tick)
+            positions.append(position)
+        self.__heap = []
+        self._trim()
+        return positions
+
+    def _update_position(self, position: TradeSituation, open_tick: int):
+        """
+        Sets the PnL and draw down of a position from the prices received since its opening
+        """
+        if self.__last_price_tick <= open_tick:
+            # No price since the opening
+            return
+        worst_price = self.__worst_prices[bisect_right(self.__start_ticks, open_tick) - 1]
+        position.update_reference_prices(self.__last_price, worst_price if self.__is_long else -worst_price)
+
+    def _trim(self):
+        """
+        Forgets the worst prices once there is no open position
+        """
+        if not self.__heap:
+            self.__start_ticks = []
+            self.__worst_prices = []
@@ -0,0 +1,104 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from quote import Quote
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from momentum_strategy import MomentumStrategy
+from trade_situation import TradeSituation
+from quote_conflator import QuoteConflator
+from backtest_snapshot import BacktestSnapshot
+from log_fixtures import generate_rows
+
+
+def replay(rows: list, strategy: MomentumStrategy, limit_order_book: LimitOrderBook,
+           quote_conflator: QuoteConflator = None) -> Quote:
+    quote = None
+    for row in rows:
+        quote = Quote(row)
+        if quote.type() == NewCancel.NEW:
+            limit_order_book.on_new_order(quote)
+            if quote_conflator is None or quote_conflator.on_book_update(quote):
+                strategy.step(quote)
+        else:
+            limit_order_book.on_cancel_order(quote)
+    return quote
+
+
+def start_replay() -> tuple:
+    MomentumStrategy.set_last_generated_id(0)
+    TradeSituation.set_last_generated_id(0)
+    limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+    MomentumStrategy.set_limit_order_book(limit_order_book)
+    TradeSituation.set_limit_order_book(limit_order_book)
+    return MomentumStrategy(6, 2, 0.00002, 1000000.00, True), limit_order_book
+
+
+def describe_positions(strategy: MomentumStrategy) -> list:
+    return [(position.trade_situation_id(), position.return_current_pnl(), position.return_current_draw_down())
+            for position in strategy.all_positions()]
+
+
+class TestBacktestSnapshot(TestCase):
+
+    def test_resume_gives_identical_results(self):
+        rows = generate_rows(3000, 42)
+
+        # Uninterrupted replay
+        strategy, limit_order_book = start_replay()
+        last_quote = replay(rows, strategy, limit_order_book)
+        strategy.close_pending_position(last_quote)
+        expected_positions = describe_positions(strategy)
+        self.assertGreater(len(expected_positions), 2)
+
+        # Replay interrupted after 1777 rows, then resumed from the snapshot
+        strategy, limit_order_book = start_replay()
+        last_quote = replay(rows[:1777], strategy, limit_order_book)
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            snapshot_file_name = os.path.join(temporary_directory, "replay.snapshot")
+            # The row index plays the role of the byte offset in the input file
+            BacktestSnapshot(1777, 1777.0, last_quote, strategy, limit_order_book).save(snapshot_file_name)
+            # Simulate a fresh process: the class level state is lost
+            start_replay()
+            snapshot = BacktestSnapshot.load(snapshot_file_name)
+
+        self.assertEqual(1777, snapshot.byte_offset())
+        self.assertEqual(last_quote.id(), snapshot.last_quote().id())
+        strategy = snapshot.strategy()
+        last_quote = replay(rows[snapshot.byte_offset():], strategy, snapshot.limit_order_book())
+        strategy.close_pending_position(last_quote)
+
+        self.assertEqual(expected_positions, describe_positions(strategy))
+
+    def test_resume_with_conflation(self):
+        rows = generate_rows(3000, 43)
+
+        strategy, limit_order_book = start_replay()
+        quote_conflator = QuoteConflator(limit_order_book, 2, 500)
+        last_quote = replay(rows, strategy, limit_order_book, quote_conflator)
+        strategy.close_pending_position(last_quote)
+        expected_positions = describe_positions(strategy)
+        expected_events = (quote_conflator.events_received(), quote_conflator.events_emitted())
+        self.assertGreater(len(expected_positions), 2)
+        self.assertGreater(quote_conflator.events_saved(), 0)
+
+        strategy, limit_order_book = start_replay()
+        quote_conflator = QuoteConflator(limit_order_book, 2, 500)
+        last_quote = replay(rows[:1777], strategy, limit_order_book, quote_conflator)
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            snapshot_file_name = os.path.join(temporary_directory, "replay.snapshot")
+            BacktestSnapshot(1777, 1777.0, last_quote, strategy, limit_order_book, quote_conflator)\
+                .save(snapshot_file_name)
+            start_replay()
+            snapshot = BacktestSnapshot.load(snapshot_file_name)
+
+        # The restored conflation stage observes the restored book
+        strategy = snapshot.strategy()
+        quote_conflator = snapshot.quote_conflator()
+        last_quote = replay(rows[1777:], strategy, snapshot.limit_order_book(), quote_conflator)
+        strategy.close_pending_position(last_quote)
+
+        self.assertEqual(expected_positions, describe_positions(strategy))
+        self.assertEqual(expected_events, (quote_conflator.events_received(), quote_conflator.events_emitted()))
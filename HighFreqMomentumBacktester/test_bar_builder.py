@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+import numpy as np
+
+from quote import Quote, QUOTE_TIME_UNITS_PER_MILLISECOND
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from top_of_book import TopOfBook
+from bar_builder import Bar, BarBuilder, build_bars
+from fix_log_generator import FixLogGenerator
+
+
+def top_of_book(bid_price: float, offer_price: float) -> TopOfBook:
+    return TopOfBook(1, bid_price, 1000000.00, offer_price, 1000000.00, (bid_price + offer_price) / 2.0,
+                     offer_price - bid_price, bid_price > 0.0, offer_price > 0.0)
+
+
+class TestBarBuilder(TestCase):
+
+    def test_bars(self):
+        bar_builder = BarBuilder(100)
+        millisecond = QUOTE_TIME_UNITS_PER_MILLISECOND
+        updates = [(1000 * millisecond, 0.89140, 0.89160), (1010 * millisecond, 0.89150, 0.89160),
+                   (1020 * millisecond, 0.89130, 0.00000), (1050 * millisecond, 0.89120, 0.89150),
+                   (1350 * millisecond, 0.89140, 0.89145)]
+        bars = []
+        for quote_time, bid_price, offer_price in updates:
+            bar = bar_builder.on_top_of_book(quote_time, top_of_book(bid_price, offer_price))
+            if bar is not None:
+                bars.append(bar)
+        self.assertEqual(1, bar_builder.bar_count())
+        bars.append(bar_builder.flush())
+        self.assertIsNone(bar_builder.flush())
+        self.assertEqual(2, len(bars))
+        # The update with an empty OFFER side is ignored, the intervals without update give no bar
+        self.assertEqual(Bar(1000 * millisecond, 0.8915, 0.89155, 0.89135, 0.89135, 0.0002, 0.0003, 0.0001, 0.0003, 3),
+                         Bar(bars[0].start_time, *(round(value, 6) for value in bars[0][1:9]), bars[0].update_count))
+        self.assertEqual(1300 * millisecond, bars[1].start_time)
+        self.assertEqual(1, bars[1].update_count)
+
+        arrays = build_bars(np.array([update[0] for update in updates]), np.array([update[1] for update in updates]),
+                            np.array([update[2] for update in updates]), 100)
+        self.assertEqual(bars, arrays.bars())
+
+    def test_streaming_and_vectorized_bars(self):
+        for interval_ms in (0.5, 10, 1000):
+            generator = FixLogGenerator(["USD/CHF"], depth=4, cancel_ratio=0.7, seed=9)
+            limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+            bar_builder = BarBuilder(interval_ms)
+            streaming_bars = []
+            quote_times = []
+            bid_prices = []
+            offer_prices = []
+            for block in generator.generate_rows(5000, block_size=2000):
+                for row in block:
+                    quote = Quote(row)
+                    if quote.type() == NewCancel.NEW:
+                        limit_order_book.on_new_order(quote)
+                    else:
+                        limit_order_book.on_cancel_order(quote)
+                    top = limit_order_book.top_of_book()
+                    bar = bar_builder.on_top_of_book(quote.time(), top)
+                    if bar is not None:
+                        streaming_bars.append(bar)
+                    quote_times.append(quote.time())
+                    bid_prices.append(top.bid_price)
+                    offer_prices.append(top.offer_price)
+            streaming_bars.append(bar_builder.flush())
+            self.assertEqual(streaming_bars, build_bars(np.array(quote_times), np.array(bid_prices),
+                                                        np.array(offer_prices), interval_ms).bars())
+            self.assertEqual(len(quote_times), sum(bar.update_count for bar in streaming_bars) +
+                             sum(1 for bid_price, offer_price in zip(bid_prices, offer_prices)
+                                 if bid_price == 0.0 or offer_price == 0.0))
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from buy_sell import BuySell
+from curr_pair import CurrPair
+from quote import Quote
+from book_differential_harness import run_differential_test
+
+
+class ScanningOrderBook:
+    # Minimal engine: the best orders are found by scanning all the live orders (earliest order of the best price)
+
+    def __init__(self, curr_pair: CurrPair, is_latest_order_first: bool = False):
+        self.curr_pair = curr_pair
+        self.orders = {}
+        self.is_latest_order_first = is_latest_order_first
+
+    def on_new_order(self, quote: Quote):
+        if quote.id() in self.orders:
+            raise RuntimeError("Duplicate ID")
+        self.orders[quote.id()] = quote
+
+    def on_cancel_order(self, quote: Quote) -> Quote:
+        if quote.id() not in self.orders:
+            raise RuntimeError("Unknown ID")
+        return self.orders.pop(quote.id())
+
+    def _best(self, way: BuySell, amount: float = 0.0) -> Quote:
+        best_order = None
+        for order in self.orders.values():
+            if order.way() != way or order.amount() < amount:
+                continue
+            is_better = best_order is None or \
+                (order.price() > best_order.price() if way == BuySell.BUY else order.price() < best_order.price())
+            if is_better or (self.is_latest_order_first and order.price() == best_order.price()):
+                best_order = order
+        return best_order
+
+    def get_best_bid(self) -> Quote:
+        return self._best(BuySell.BUY)
+
+    def get_best_bid_price(self) -> float:
+        best_bid = self._best(BuySell.BUY)
+        return 0.00 if best_bid is None else best_bid.price()
+
+    def get_best_offer(self) -> Quote:
+        return self._best(BuySell.SELL)
+
+    def get_best_offer_price(self) -> float:
+        best_offer = self._best(BuySell.SELL)
+        return 0.00 if best_offer is None else best_offer.price()
+
+    def get_best_orders_by_amount(self, way: BuySell, amount: float) -> Quote:
+        return self._best(way, amount)
+
+    def count_bids(self) -> int:
+        return sum(1 for order in self.orders.values() if order.way() == BuySell.BUY)
+
+    def count_offers(self) -> int:
+        return sum(1 for order in self.orders.values() if order.way() == BuySell.SELL)
+
+
+class TestBookDifferentialHarness(TestCase):
+
+    def test_limit_order_book_matches_scanning_engine(self):
+        results = run_differential_test(ScanningOrderBook, stream_count=2, event_count=1500)
+        for result in results:
+            self.assertEqual([], result.mismatches)
+            self.assertGreater(result.reference_events_per_second, 0.0)
+
+    def test_mismatch_detected(self):
+        # Same prices, but the latest order of the best level is reported
+        results = run_differential_test(lambda curr_pair: ScanningOrderBook(curr_pair, True), stream_count=2,
+                                        event_count=1000)
+        for result in results:
+            self.assertGreater(len(result.mismatches), 0)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from buy_sell import BuySell
+from curr_pair import CurrPair
+from limit_order_book import LimitOrderBook
+from book_recovery_policy import BookRecoveryPolicy
+from book_journal import BookJournal, BookJournalRecorder, read_recorded_changes
+from book_differential_harness import generate_random_events, apply_event
+
+
+class TestBookJournal(TestCase):
+
+    def test_levels_rebuilt_from_the_changes(self):
+        journal = BookJournal(64)
+        limit_order_book = LimitOrderBook(CurrPair.USDCHF, BookRecoveryPolicy.RESYNC, journal)
+        # Consumer: price levels of both sides rebuilt from the changes only
+        levels = {True: {}, False: {}}
+        best_prices = {True: None, False: None}
+        cursor = 0
+        for quote in generate_random_events(11, 4000, invalid_event_probability=0.05):
+            apply_event(limit_order_book, quote)
+            changes, cursor = journal.read(cursor)
+            for change in changes:
+                if change.level_count == 0:
+                    levels[change.is_bid].pop(change.price)
+                else:
+                    levels[change.is_bid][change.price] = change.level_amount
+                side_levels = levels[change.is_bid]
+                best_price = (max(side_levels) if change.is_bid else min(side_levels)) if side_levels else None
+                self.assertEqual(best_price != best_prices[change.is_bid], change.is_best_changed)
+                best_prices[change.is_bid] = best_price
+            self.assertEqual(limit_order_book.sequence(), journal.count())
+            for is_bid, way in ((True, BuySell.BUY), (False, BuySell.SELL)):
+                book_levels = limit_order_book.get_top_levels(way, len(levels[is_bid]) + 1)
+                self.assertEqual(len(book_levels), len(levels[is_bid]))
+                for price, amount in book_levels:
+                    self.assertAlmostEqual(amount, levels[is_bid][price], 2)
+
+    def test_overwritten_changes(self):
+        journal = BookJournal(10)
+        for sequence in range(1, 16):
+            journal.append(sequence, 0.89150, 1000000.00, 1, True, False)
+        self.assertEqual(10, len(journal))
+        with self.assertRaises(RuntimeError):
+            journal.read(4)
+        changes, cursor = journal.read(5, max_count=3)
+        self.assertEqual([6, 7, 8], [change.sequence for change in changes])
+        self.assertEqual(8, cursor)
+
+    def test_recorded_file(self):
+        journal = BookJournal(16)
+        limit_order_book = LimitOrderBook(CurrPair.USDCHF, journal=journal)
+        file_name = os.path.join(tempfile.mkdtemp(), "book-changes.bin")
+        in_memory_changes = []
+        cursor = 0
+        with BookJournalRecorder(journal, file_name) as recorder:
+            for quote in generate_random_events(12, 500):
+                apply_event(limit_order_book, quote)
+                recorder.drain_if_half_full()
+                changes, cursor = journal.read(cursor)
+                in_memory_changes.extend(changes)
+        self.assertEqual(in_memory_changes, list(read_recorded_changes(file_name, block_records=7)))
+        os.remove(file_name)
@@ -0,0 +1,81 @@
+from random import Random
+from unittest import TestCase
+
+import numpy as np
+
+from quote import Quote
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from momentum_strategy import MomentumStrategy
+from trade_situation import TradeSituation
+from performance_summary import LedgerEntry, build_ledger, summarize_ledger
+from cost_model import CostModel
+from log_fixtures import generate_rows
+
+
+class TestCostModel(TestCase):
+
+    def test_flat_price_per_mil(self):
+        ledger = [LedgerEntry(1, True, 0.0002, 0.0001, 300000.00, 0.00002, 0.00003),
+                  LedgerEntry(2, False, -0.0001, 0.0003, 300000.00, 0.00001, -0.00001)]
+        flat_summary = summarize_ledger(ledger, 300000.00, 10.00)
+        cost_model_summary = summarize_ledger(ledger, 300000.00, 10.00, CostModel(10.00), CurrPair.USDCHF)
+        self.assertAlmostEqual(flat_summary.transaction_price, cost_model_summary.transaction_price, 9)
+        self.assertAlmostEqual(flat_summary.net_profit, cost_model_summary.net_profit, 9)
+        # Ledgers without amounts use the traded amount
+        self.assertAlmostEqual(flat_summary.transaction_price,
+                               summarize_ledger([LedgerEntry(1, True, 0.0002, 0.0001)] * 2, 300000.00, 10.00,
+                                                CostModel(10.00)).transaction_price, 9)
+
+    def test_position_costs(self):
+        cost_model = CostModel(10.00, {"USD/CHF": 4.00}, spread_share=0.5, slippage_coefficient=0.00001,
+                               slippage_reference_amount=1000000.00, slippage_exponent=0.5)
+        self.assertEqual(4.00, cost_model.commission_per_mil(CurrPair.USDCHF))
+        self.assertEqual(10.00, cost_model.commission_per_mil(CurrPair.EURUSD))
+        # 32.00 of commission, half of the two spreads (120.00) and a slippage of 0.00001 x sqrt(4) per trade (160.00)
+        self.assertAlmostEqual(32.00 + 120.00 + 160.00,
+                               cost_model.position_cost(4000000.00, 0.00002, 0.00004, CurrPair.USDCHF), 6)
+        # A crossed book costs nothing to cross
+        self.assertAlmostEqual(cost_model.position_cost(1000000.00, 0.0, 0.00002, CurrPair.USDCHF),
+                               cost_model.position_cost(1000000.00, -0.00003, 0.00002, CurrPair.USDCHF), 9)
+
+    def test_vectorized_costs(self):
+        random_generator = Random(3)
+        cost_model = CostModel(7.50, {CurrPair.USDCHF: 3.00}, spread_share=0.4, slippage_coefficient=0.00002,
+                               slippage_exponent=0.7)
+        amounts = [random_generator.choice((100000.00, 1000000.00, 5000000.00)) for _ in range(1000)]
+        open_spreads = [random_generator.uniform(-0.00001, 0.00005) for _ in range(1000)]
+        close_spreads = [random_generator.uniform(-0.00001, 0.00005) for _ in range(1000)]
+        for curr_pair in (CurrPair.USDCHF, CurrPair.EURUSD):
+            costs = cost_model.costs(np.array(amounts), np.array(open_spreads), np.array(close_spreads), curr_pair)
+            for index in range(1000):
+                self.assertAlmostEqual(cost_model.position_cost(amounts[index], open_spreads[index],
+                                                                close_spreads[index], curr_pair), costs[index], 9)
+
+    def test_ledger_of_a_replay(self):
+        MomentumStrategy.set_last_generated_id(0)
+        TradeSituation.set_last_generated_id(0)
+        limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+        MomentumStrategy.set_limit_order_book(limit_order_book)
+        TradeSituation.set_limit_order_book(limit_order_book)
+        strategy = MomentumStrategy(6, 2, 0.00002, 1000000.00, True)
+        quote = None
+        for row in generate_rows(3000, 42):
+            quote = Quote(row)
+            if quote.type() == NewCancel.NEW:
+                limit_order_book.on_new_order(quote)
+                strategy.step(quote)
+            else:
+                limit_order_book.on_cancel_order(quote)
+        strategy.close_pending_position(quote)
+        ledger = build_ledger(strategy.all_positions())
+        self.assertGreater(len(ledger), 0)
+        self.assertTrue(all(entry.amount == 1000000.00 for entry in ledger))
+        self.assertTrue(any(entry.open_spread != 0.0 for entry in ledger))
+        self.assertTrue(any(entry.close_spread != 0.0 for entry in ledger))
+        # The spread crossing cost only adds to the flat costs
+        flat_summary = summarize_ledger(ledger, 1000000.00, 10.00)
+        spread_summary = summarize_ledger(ledger, 1000000.00, 10.00, CostModel(10.00, spread_share=0.5))
+        self.assertGreater(spread_summary.transaction_price, flat_summary.transaction_price)
+        self.assertEqual(flat_summary.total_profit, spread_summary.total_profit)
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from quote import Quote
+from feed_latency_analyser import FeedLatencyAnalyser
+
+
+class TestFeedLatencyAnalyser(TestCase):
+
+    def test_latency_relative_to_first_event(self):
+        analyser = FeedLatencyAnalyser(gap_threshold_ms=500.0, burst_size=3, burst_window_ms=1.0)
+        # Local time in ns, exchange time in ms
+        rows = ["N;1;USD/CHF;1000000000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0",
+                "N;2;USD/CHF;1002000000;1610963536460;1000000.00;0.00;0.00;0.89150;B;0",
+                "C;1;USD/CHF;1002100000;1610963536460",
+                "N;3;USD/CHF;1002200000;1610963536458;1000000.00;0.00;0.00;0.89140;B;0",
+                "N;4;USD/CHF;2002200000;1610963537458;1000000.00;0.00;0.00;0.89130;B;0"]
+        flags = [analyser.on_quote(Quote(row)) for row in rows]
+
+        # The exchange time of the 4th event is before the 3rd one's
+        self.assertEqual([False, False, False, True, False], flags)
+        self.assertEqual(1, analyser.out_of_order_count())
+        self.assertEqual([3], analyser.out_of_order_ids())
+        latencies = analyser.latency_histogram()
+        self.assertEqual(5, latencies.count())
+        # Event 2: 2 ms later locally, 1 ms later at the exchange
+        self.assertEqual(0, latencies.min())
+        self.assertEqual(3200, latencies.max())
+        self.assertEqual(0, analyser.below_reference_count())
+        # 1 s of silence before the last event
+        self.assertEqual(1, analyser.gap_count())
+        self.assertEqual(1000000000, analyser.max_gap())
+        # Events 2, C1 and 3 arrived within 0.2 ms
+        self.assertEqual(1, analyser.burst_count())
+        self.assertEqual(3, analyser.events_in_bursts())
+        self.assertEqual(3, len(analyser.report()))
+
+    def test_clock_offset(self):
+        analyser = FeedLatencyAnalyser(clock_offset_us=0)
+        analyser.on_quote(Quote("N;1;USD/CHF;1610963536459250000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0"))
+        analyser.on_quote(Quote("N;2;USD/CHF;1610963536459900000;1610963536460;1000000.00;0.00;0.00;0.89150;B;0"))
+        self.assertEqual(250, analyser.latency_histogram().max())
+        # The second event was stamped locally before the exchange time
+        self.assertEqual(1, analyser.below_reference_count())
+        self.assertEqual(4, len(analyser.report()))
@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from quote import Quote
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from fix_log_generator import FixLogGenerator
+
+
+class TestFixLogGenerator(TestCase):
+
+    def test_rows_replay_through_strict_books(self):
+        generator = FixLogGenerator(["USD/CHF", "USD/JPY"], depth=5, cancel_ratio=0.8, seed=5)
+        rows = [row for block in generator.generate_rows(20000, block_size=3000) for row in block]
+        self.assertEqual(20000, len(rows))
+
+        order_books = {CurrPair.USDCHF: LimitOrderBook(CurrPair.USDCHF),
+                       CurrPair.USDJPY: LimitOrderBook(CurrPair.USDJPY)}
+        previous_time = 0
+        cancel_count = 0
+        for row in rows:
+            quote = Quote(row)
+            self.assertGreaterEqual(quote.time(), previous_time)
+            previous_time = quote.time()
+            # A CANCEL always refers to a live order of the same pair
+            if quote.type() == NewCancel.NEW:
+                order_books[quote.currency_pair()].on_new_order(quote)
+            else:
+                order_books[quote.currency_pair()].on_cancel_order(quote)
+                cancel_count += 1
+        self.assertGreater(order_books[CurrPair.USDCHF].count_bids(), 0)
+        self.assertGreater(order_books[CurrPair.USDJPY].count_offers(), 0)
+        # About 0.8 CANCEL per NEW (the last cancels are not due yet)
+        self.assertAlmostEqual(0.8 / 1.8, cancel_count / len(rows), delta=0.05)
+        # Prices of the JPY pair have 3 decimals
+        self.assertEqual(3, len([row for row in rows if "USD/JPY" in row and row.startswith("N")][0]
+                                .split(";")[8].split(".")[1]))
+
+    def test_reproducible(self):
+        rows = list(FixLogGenerator(seed=11).generate_rows(5000, block_size=700))
+        self.assertEqual(rows, list(FixLogGenerator(seed=11).generate_rows(5000, block_size=700)))
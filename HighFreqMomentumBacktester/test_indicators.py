@@ -0,0 +1,208 @@
+from unittest import TestCase
+from unittest.mock import patch
+from random import Random
+from statistics import pvariance, pstdev
+
+from curr_pair import CurrPair
+from quote import Quote
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from momentum_strategy import MomentumStrategy
+from trade_situation import TradeSituation
+from performance_summary import build_ledger
+from fifo_doubles_list import FifoDoublesList
+from log_fixtures import generate_rows
+from indicator_registry import IndicatorRegistry
+from indicators import (Indicator, SimpleMovingAverage, TimeWindowMovingAverage, ExponentialMovingAverage,
+                        RollingVariance, ZScore, RollingMinimum, RollingMaximum, Microprice, OrderFlowImbalance)
+
+
+random_generator = Random(3)
+
+
+class FifoMean(Indicator):
+    # The averages of MomentumStrategy before the indicators: FifoDoublesList.get_mean()
+    __fifo_list: FifoDoublesList
+
+    def __init__(self, window: int):
+        super().__init__()
+        self.__fifo_list = FifoDoublesList(window)
+
+    def put(self, value: float):
+        self.__fifo_list.put(value)
+
+    def value(self) -> float:
+        return self.__fifo_list.get_mean()
+
+
+def replay_ledger(rows: list, ma_slow_indicator: Indicator = None, ma_fast_indicator: Indicator = None) -> list:
+    MomentumStrategy.set_last_generated_id(0)
+    TradeSituation.set_last_generated_id(0)
+    limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+    MomentumStrategy.set_limit_order_book(limit_order_book)
+    TradeSituation.set_limit_order_book(limit_order_book)
+    strategy = MomentumStrategy(6, 2, 0.00002, 1000000.00, True, ma_slow_indicator, ma_fast_indicator)
+    quote = None
+    for row in rows:
+        quote = Quote(row)
+        if quote.type() == NewCancel.NEW:
+            limit_order_book.on_new_order(quote)
+            strategy.step(quote)
+        else:
+            limit_order_book.on_cancel_order(quote)
+    strategy.close_pending_position(quote)
+    return build_ledger(strategy.all_positions())
+
+
+class TestIndicators(TestCase):
+    random_prices = [1.20 + random_generator.random() * 0.001 for i in range(1000)]
+
+    def test_simple_moving_average(self):
+        indicator = SimpleMovingAverage(7)
+        for index, price in enumerate(self.random_prices):
+            indicator.put(price)
+            last_values = self.random_prices[max(0, index - 6):index + 1]
+            self.assertAlmostEqual(sum(last_values) / 7, indicator.value(), delta=0.0000000001)
+        self.assertTrue(indicator.is_ready())
+
+    def test_simple_moving_average_equals_fifo_mean(self):
+        indicator = SimpleMovingAverage(7)
+        fifo_list = FifoDoublesList(7)
+        for price in self.random_prices:
+            indicator.put(price)
+            fifo_list.put(price)
+            self.assertEqual(fifo_list.get_mean(), indicator.value())
+
+    def test_default_strategy_trades_as_fifo_averages(self):
+        rows = generate_rows(20000, 5)
+        expected_ledger = replay_ledger(rows, FifoMean(6), FifoMean(2))
+        self.assertGreater(len(expected_ledger), 10)
+        self.assertEqual(expected_ledger, replay_ledger(rows))
+
+    def test_time_window_moving_average(self):
+        indicator = TimeWindowMovingAverage(500)
+        indicator.update_at(1, 1000, 1.0)
+        indicator.update_at(2, 1200, 2.0)
+        indicator.update_at(3, 1400, 3.0)
+        self.assertEqual(2.0, indicator.value())
+        self.assertFalse(indicator.is_ready())
+        # 1000 and 1200 leave the window (1700 - 500 = 1200)
+        indicator.update_at(4, 1700, 5.0)
+        self.assertEqual(4.0, indicator.value())
+        self.assertTrue(indicator.is_ready())
+        # A quiet period empties the window down to the last value
+        indicator.update_at(5, 9000, 7.0)
+        self.assertEqual(7.0, indicator.value())
+
+    def test_exponential_moving_average(self):
+        indicator = ExponentialMovingAverage(3)
+        indicator.put(10.0)
+        indicator.put(20.0)
+        self.assertAlmostEqual(15.0, indicator.value())
+        self.assertFalse(indicator.is_ready())
+
+    def test_rolling_variance_and_z_score(self):
+        variance = RollingVariance(20)
+        z_score = ZScore(20)
+        for index, price in enumerate(self.random_prices):
+            variance.put(price)
+            z_score.put(price)
+            if index >= 19:
+                last_values = self.random_prices[index - 19:index + 1]
+                self.assertAlmostEqual(pvariance(last_values), variance.value(), delta=1e-16)
+                expected_z_score = (price - sum(last_values) / 20) / pstdev(last_values)
+                self.assertAlmostEqual(expected_z_score, z_score.value(), delta=0.000001)
+
+    def test_rolling_minimum_maximum(self):
+        values = [random_generator.randint(0, 100) for i in range(500)]
+        minimum = RollingMinimum(9)
+        maximum = RollingMaximum(9)
+        for index, value in enumerate(values):
+            minimum.put(value)
+            maximum.put(value)
+            self.assertEqual(min(values[max(0, index - 8):index + 1]), minimum.value())
+            self.assertEqual(max(values[max(0, index - 8):index + 1]), maximum.value())
+
+    def test_book_indicators(self):
+        microprice = Microprice()
+        microprice.update_book(1, 1.0, 3000000.00, 2.0, 1000000.00)
+        self.assertAlmostEqual(1.75, microprice.value())
+
+        order_flow_imbalance = OrderFlowImbalance(2)
+        order_flow_imbalance.update_book(1, 1.0, 1000000.00, 2.0, 1000000.00)
+        # Bid improves: + new bid amount
+        order_flow_imbalance.update_book(2, 1.1, 2000000.00, 2.0, 1000000.00)
+        self.assertEqual(2000000.00, order_flow_imbalance.value())
+        # Offer improves: - new offer amount
+        order_flow_imbalance.update_book(3, 1.1, 2000000.00, 1.9, 500000.00)
+        self.assertEqual(1500000.00, order_flow_imbalance.value())
+
+    def test_shared_indicator_updated_once_per_sequence(self):
+        indicator = SimpleMovingAverage(2)
+        indicator.update(1, 10.0)
+        # A second strategy reading the same tick does not update the indicator again
+        indicator.update(1, 10.0)
+        indicator.update(2, 20.0)
+        self.assertEqual(15.0, indicator.value())
+
+    def test_shared_indicators_follow_the_book_sequence(self):
+        MomentumStrategy.set_last_generated_id(0)
+        limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+        MomentumStrategy.set_limit_order_book(limit_order_book)
+        TradeSituation.set_limit_order_book(limit_order_book)
+        ma_slow_indicator = SimpleMovingAverage(3)
+        strategies = [MomentumStrategy(3, 2, 0.00002, 1000000.00, True, ma_slow_indicator, SimpleMovingAverage(2))
+                      for _ in range(2)]
+        # The OFFER 2 is cancelled and sent again with the same ID (e.g. after a resync of the feed)
+        rows = ["N;1;USD/CHF;39136466000000;1610963536459;1000000.00;0.00;0.00;0.89140;B;0",
+                "N;2;USD/CHF;39136466001000;1610963536459;1000000.00;0.00;0.00;0.89160;S;0",
+                "C;2;USD/CHF;39136466002000;1610963536459",
+                "N;2;USD/CHF;39136466003000;1610963536459;1000000.00;0.00;0.00;0.89180;S;0"]
+        for row in rows:
+            quote = Quote(row)
+            if quote.type() == NewCancel.NEW:
+                limit_order_book.on_new_order(quote)
+                top_of_book = limit_order_book.top_of_book()
+                for strategy in strategies:
+                    strategy.step(quote, top_of_book)
+            else:
+                limit_order_book.on_cancel_order(quote)
+        # One update per change of the book, whatever the number of strategies and the order IDs
+        self.assertAlmostEqual((0.44570 + 0.89150 + 0.89160) / 3, ma_slow_indicator.value(), 12)
+
+    def test_shared_averages_summed_once_per_tick(self):
+        MomentumStrategy.set_last_generated_id(0)
+        limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+        MomentumStrategy.set_limit_order_book(limit_order_book)
+        TradeSituation.set_limit_order_book(limit_order_book)
+        registry = IndicatorRegistry(CurrPair.USDCHF)
+        strategies = [MomentumStrategy(6, 2, target_profit, 1000000.00, True, indicator_registry=registry)
+                      for target_profit in (0.00002, 0.00003, 0.00004, 0.00005)]
+        new_count = 0
+        with patch("indicators.sum", wraps=sum, create=True) as indicator_sum:
+            for row in generate_rows(2000, 6):
+                quote = Quote(row)
+                if quote.type() == NewCancel.NEW:
+                    limit_order_book.on_new_order(quote)
+                    new_count += 1
+                    top_of_book = limit_order_book.top_of_book()
+                    for strategy in strategies:
+                        strategy.step(quote, top_of_book)
+                else:
+                    limit_order_book.on_cancel_order(quote)
+        # The slow and the fast averages are summed once per tick, whatever the number of strategies reading them
+        self.assertEqual(2, registry.count())
+        self.assertLessEqual(indicator_sum.call_count, 2 * new_count)
+
+    def test_registry_deduplicates_by_type_and_window(self):
+        registry = IndicatorRegistry(CurrPair.EURUSD)
+        self.assertIs(registry.get(SimpleMovingAverage, 10), registry.get(SimpleMovingAverage, 10))
+        self.assertIsNot(registry.get(SimpleMovingAverage, 10), registry.get(SimpleMovingAverage, 20))
+        self.assertIsNot(registry.get(SimpleMovingAverage, 10), registry.get(ExponentialMovingAverage, 10))
+        registry.get(Microprice)
+        self.assertEqual(4, registry.count())
+
+        registry.update(1, 1.0)
+        registry.update(1, 1.0)
+        registry.update(2, 2.0)
+        self.assertEqual(0.3, registry.get(SimpleMovingAverage, 10).value())
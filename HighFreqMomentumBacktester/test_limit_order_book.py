@@ -3,6 +3,7 @@ from quote import Quote
 from curr_pair import CurrPair
 from limit_order_book import LimitOrderBook
 from buy_sell import BuySell
+from book_recovery_policy import BookRecoveryPolicy
 
 
 class TestLimitOrderBook(TestCase):
@@ -58,5 +59,67 @@ class TestLimitOrderBook(TestCase):
         self.assertEqual(0.89176, order_book.get_best_offer_price())
         self.assertEqual(219, order_book.get_best_offer().id())
 
+    def test_recovery_policies(self):
+        quote1_b = Quote("N;112;USD/CHF;39136476157873;1610963536459;100000.00;0.00;0.00;0.89153;B;0")
+        quote1_b_again = Quote("N;112;USD/CHF;39136476157880;1610963536459;300000.00;0.00;0.00;0.89150;B;0")
+        unknown_cancel = Quote("C;500;USD/CHF;39136476157890;1610963536459")
+
+        order_book = LimitOrderBook(CurrPair.USDCHF, BookRecoveryPolicy.STRICT)
+        order_book.on_new_order(quote1_b)
+        self.assertRaises(RuntimeError, order_book.on_new_order, quote1_b_again)
+        self.assertRaises(RuntimeError, order_book.on_cancel_order, unknown_cancel)
 
+        # Default policy
+        order_book = LimitOrderBook(CurrPair.USDCHF)
+        self.assertEqual(BookRecoveryPolicy.COUNT_AND_SKIP, order_book.recovery_policy())
+        order_book.on_new_order(quote1_b)
+        order_book.on_new_order(quote1_b_again)
+        self.assertIsNone(order_book.on_cancel_order(unknown_cancel))
+        self.assertEqual(1, order_book.unknown_cancel_count())
+        self.assertEqual(1, order_book.duplicate_order_count())
+        self.assertEqual(0.89153, order_book.get_best_bid_price())
 
+        order_book = LimitOrderBook(CurrPair.USDCHF, BookRecoveryPolicy.RESYNC)
+        order_book.on_new_order(quote1_b)
+        order_book.on_new_order(quote1_b_again)
+        self.assertIsNone(order_book.on_cancel_order(unknown_cancel))
+        self.assertEqual(1, order_book.count_bids())
+        self.assertEqual(0.89150, order_book.get_best_bid_price())
+        self.assertEqual(300000.00, order_book.get_best_bid_amount())
+
+    def test_bids_emptied_and_refilled(self):
+        quote1_b = Quote("N;112;USD/CHF;39136476157873;1610963536459;100000.00;0.00;0.00;0.89153;B;0")
+        quote1_s = Quote("N;212;USD/CHF;39136476157874;1610963536459;100000.00;0.00;0.00;0.89173;S;0")
+        quote2_b = Quote("N;113;USD/CHF;39136476157875;1610963536459;100000.00;0.00;0.00;0.89140;B;0")
+
+        order_book = LimitOrderBook(CurrPair.USDCHF)
+        order_book.on_new_order(quote1_b)
+        order_book.on_new_order(quote1_s)
+        order_book.on_cancel_order(Quote("C;112;USD/CHF;39136476157876;1610963536459"))
+        # The empty bid side does not hide the offers
+        self.assertIsNone(order_book.get_best_bid())
+        self.assertEqual(0.89173, order_book.get_best_offer_price())
+        order_book.on_new_order(quote2_b)
+        self.assertEqual(0.89140, order_book.get_best_bid_price())
+
+    def test_top_of_book_built_once_per_change(self):
+        order_book = LimitOrderBook(CurrPair.USDCHF)
+        empty_top_of_book = order_book.top_of_book()
+        self.assertFalse(empty_top_of_book.is_bid_set)
+        self.assertEqual(0, empty_top_of_book.sequence)
+
+        order_book.on_new_order(Quote("N;112;USD/CHF;39136476157873;1610963536459;100000.00;0.00;0.00;0.89153;B;0"))
+        order_book.on_new_order(Quote("N;113;USD/CHF;39136476157874;1610963536459;200000.00;0.00;0.00;0.89153;B;0"))
+        order_book.on_new_order(Quote("N;212;USD/CHF;39136476157875;1610963536459;100000.00;0.00;0.00;0.89173;S;0"))
+        top_of_book = order_book.top_of_book()
+        self.assertIs(top_of_book, order_book.top_of_book())
+        self.assertEqual(3, top_of_book.sequence)
+        self.assertEqual(300000.00, top_of_book.bid_amount)
+        self.assertAlmostEqual(0.89163, top_of_book.mid_price, delta=0.0000001)
+        self.assertAlmostEqual(0.0002, top_of_book.spread, delta=0.0000001)
+
+        order_book.on_cancel_order(Quote("C;212;USD/CHF;39136476157876;1610963536459"))
+        # The previous view is unchanged
+        self.assertTrue(top_of_book.is_offer_set)
+        self.assertFalse(order_book.top_of_book().is_offer_set)
+        self.assertEqual(4, order_book.top_of_book().sequence)
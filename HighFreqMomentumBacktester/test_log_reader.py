@@ -0,0 +1,72 @@
+import gzip
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from log_reader import LogReader, count_lines, detect_compression
+
+
+def write_log(directory: str, lines: list) -> tuple:
+    """
+    Writes the same lines to a plain and to a gzip compressed file
+    :return: (plain file name, gzip file name)
+    """
+    content = "".join(line + "\n" for line in lines).encode()
+    plain_file_name = os.path.join(directory, "log.csv")
+    with open(plain_file_name, 'wb') as file_writer:
+        file_writer.write(content)
+    gzip_file_name = os.path.join(directory, "log.csv.gz")
+    with gzip.open(gzip_file_name, 'wb') as file_writer:
+        file_writer.write(content)
+    return plain_file_name, gzip_file_name
+
+
+class TestLogReader(TestCase):
+    lines = ["C;{0};USD/CHF;{1};1610963536459".format(quote_id, 39136466000000 + quote_id * 1000)
+             for quote_id in range(5000)]
+
+    def test_gzip_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            plain_file_name, gzip_file_name = write_log(directory, self.lines)
+            self.assertIsNone(detect_compression(plain_file_name))
+            self.assertEqual("gzip", detect_compression(gzip_file_name))
+            for file_name in (plain_file_name, gzip_file_name):
+                # Small blocks: most lines are split between two blocks
+                with LogReader(file_name, block_size=1000, max_pending_blocks=2) as reader_obj:
+                    self.assertEqual(self.lines, [row.decode().rstrip("\n") for row in reader_obj])
+                self.assertEqual(len(self.lines), count_lines(file_name))
+
+    def test_seek_and_tell(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name in write_log(directory, self.lines):
+                with LogReader(file_name, block_size=1000) as reader_obj:
+                    for _ in range(1234):
+                        reader_obj.readline()
+                    offset = reader_obj.tell()
+                    expected_line = reader_obj.readline()
+                self.assertEqual(self.lines[1234], expected_line.decode().rstrip("\n"))
+                with LogReader(file_name, block_size=1000) as reader_obj:
+                    reader_obj.seek(offset)
+                    self.assertEqual(offset, reader_obj.tell())
+                    self.assertEqual(expected_line, reader_obj.readline())
+                    self.assertEqual(len(self.lines) - 1235, sum(1 for _ in reader_obj))
+
+            # A compressed log is only read forwards
+            with LogReader(os.path.join(directory, "log.csv.gz"), block_size=1000) as reader_obj:
+                reader_obj.readline()
+                self.assertRaises(RuntimeError, reader_obj.seek, 0)
+
+    def test_close_stops_the_decompression_thread(self):
+        with tempfile.TemporaryDirectory() as directory:
+            gzip_file_name = write_log(directory, self.lines)[1]
+            threads_before = set(threading.enumerate())
+            # The queue is full after a few blocks: the thread waits for the reader
+            reader_obj = LogReader(gzip_file_name, block_size=100, max_pending_blocks=2)
+            reader_obj.readline()
+            time.sleep(0.05)
+            decompression_threads = set(threading.enumerate()) - threads_before
+            self.assertEqual(1, len(decompression_threads))
+            reader_obj.close()
+            self.assertFalse(any(thread.is_alive() for thread in decompression_threads))
@@ -0,0 +1,115 @@
+import io
+import os
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import TestCase
+from unittest.mock import patch
+
+import main
+from fix_log_generator import FixLogGenerator
+from portfolio import Portfolio
+
+
+class TestMain(TestCase):
+
+    def test_default_arguments(self):
+        arguments = main.parse_arguments(["log.csv"])
+        self.assertEqual("log.csv", arguments.data_file_name)
+        self.assertEqual(main.MODE_BACKTEST, arguments.mode)
+        self.assertEqual("EUR/USD", arguments.pair)
+        self.assertEqual((10, 2, 0.00003), (arguments.ma_slow, arguments.ma_fast, arguments.target_profit))
+        self.assertEqual(300000.00, arguments.traded_amount)
+        self.assertEqual(main.BOOK_RECOVERY_SKIP, arguments.book_recovery)
+        self.assertIsNone(arguments.cache_dir)
+        self.assertEqual(0.0, arguments.bars_ms)
+        self.assertFalse(arguments.memory_report)
+
+    def test_arguments(self):
+        arguments = main.parse_arguments(["log.csv.gz", "--mode", "portfolio", "--pairs", "EUR/USD", "USD/CHF",
+                                          "--exposure-limit", "USD=2000000", "--ma-slow", "6", "--ma-window-ms",
+                                          "--pair-commission", "USD/CHF=4.5", "--book-recovery", "strict"])
+        self.assertEqual(main.MODE_PORTFOLIO, arguments.mode)
+        self.assertEqual(["EUR/USD", "USD/CHF"], arguments.pairs)
+        self.assertEqual(["USD=2000000"], arguments.exposure_limit)
+        self.assertEqual(6, arguments.ma_slow)
+        self.assertTrue(arguments.ma_window_ms)
+        self.assertEqual(["USD/CHF=4.5"], arguments.pair_commission)
+        self.assertEqual(main.BOOK_RECOVERY_STRICT, arguments.book_recovery)
+        # Unknown choices and missing file names are rejected
+        with redirect_stderr(io.StringIO()):
+            self.assertRaises(SystemExit, main.parse_arguments, ["log.csv", "--mode", "live"])
+            self.assertRaises(SystemExit, main.parse_arguments, ["log.csv", "--book-recovery", "ignore"])
+            self.assertRaises(SystemExit, main.parse_arguments, [])
+
+    def test_result_parameters(self):
+        parameters = main.result_parameters(main.parse_arguments(["log.csv", "--pair", "USD/CHF"]))
+        self.assertEqual("USD/CHF", parameters["pair"])
+        # The costs do not change the replay
+        self.assertEqual(parameters, main.result_parameters(main.parse_arguments(
+            ["log.csv", "--pair", "USD/CHF", "--price-per-mil", "4.0", "--spread-cost-share", "0.5"])))
+        for changed_arguments in (["--ma-slow", "20"], ["--conflation-depth", "2"], ["--book-recovery", "resync"],
+                                  ["--max-open-positions", "3"], ["--price-by-amount"]):
+            self.assertNotEqual(parameters, main.result_parameters(main.parse_arguments(
+                ["log.csv", "--pair", "USD/CHF"] + changed_arguments)))
+
+    def test_mode_dispatch(self):
+        for mode, function_name in ((main.MODE_BACKTEST, "run_backtest"),
+                                    (main.MODE_WALK_FORWARD, "run_walk_forward_mode"),
+                                    (main.MODE_PORTFOLIO, "run_portfolio")):
+            with patch.object(main, "run_backtest") as run_backtest, \
+                    patch.object(main, "run_walk_forward_mode") as run_walk_forward_mode, \
+                    patch.object(main, "run_portfolio") as run_portfolio:
+                main.main(["log.csv", "--mode", mode])
+                called_functions = {"run_backtest": run_backtest, "run_walk_forward_mode": run_walk_forward_mode,
+                                    "run_portfolio": run_portfolio}
+                for name, function in called_functions.items():
+                    self.assertEqual(1 if name == function_name else 0, function.call_count)
+                self.assertEqual(mode, called_functions[function_name].call_args[0][0].mode)
+
+    def test_backtest_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, "log.csv")
+            FixLogGenerator(["USD/CHF"], seed=3).write(log_file_name, 5000)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main.main([log_file_name, "--pair", "USD/CHF", "--ma-slow", "6", "--snapshot-every", "0"])
+        lines = output.getvalue().splitlines()
+        # The startup time does not include the reading of the file
+        self.assertTrue(lines[0].startswith("Startup time: "))
+        self.assertEqual("Total 5000 rows in {0}.".format(log_file_name), lines[1])
+        self.assertTrue(lines[-1].startswith("Net profit (loss): "))
+
+    def test_portfolio_follows_the_cancels(self):
+        rows = ["N;1;USD/CHF;39136466000000;1610963536459;1000000.00;0.00;0.00;0.89140;B;0",
+                "N;2;USD/CHF;39136466001000;1610963536459;1000000.00;0.00;0.00;0.89160;S;0",
+                "N;3;USD/CHF;39136466002000;1610963536459;1000000.00;0.00;0.00;0.89150;B;0",
+                "C;3;USD/CHF;39136466003000;1610963536459"]
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, "log.csv")
+            with open(log_file_name, 'w') as file_writer:
+                file_writer.write("\n".join(rows) + "\n")
+            with patch.object(Portfolio, "on_book_update", autospec=True) as on_book_update, \
+                    redirect_stdout(io.StringIO()):
+                main.main([log_file_name, "--mode", "portfolio", "--pair", "USD/CHF"])
+        # The mid after the CANCEL of the best BID
+        self.assertEqual(len(rows), on_book_update.call_count)
+        self.assertEqual(0.89140, on_book_update.call_args[0][2].bid_price)
+
+    def test_bars_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, "log.csv")
+            FixLogGenerator(["USD/CHF"], seed=3).write(log_file_name, 5000)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main.main([log_file_name, "--pair", "USD/CHF", "--snapshot-every", "0", "--bars-ms", "10"])
+            with open(log_file_name + ".bars.csv", 'r') as file_reader:
+                bars_lines = file_reader.readlines()
+        self.assertEqual(main.BARS_HEADER, bars_lines[0])
+        self.assertIn("Bars: {0} bars of 10.0 ms written to {1}.bars.csv.".format(len(bars_lines) - 1, log_file_name),
+                      output.getvalue().splitlines())
+
+    def test_resume_refuses_the_replay_outputs(self):
+        # Refused before the (missing) file is read
+        for output_arguments in (["--bars-ms", "10"], ["--record-book-changes", "changes.csv"]):
+            with redirect_stdout(io.StringIO()):
+                self.assertRaises(RuntimeError, main.main, ["missing-log.csv", "--resume"] + output_arguments)
@@ -0,0 +1,55 @@
+import tracemalloc
+from unittest import TestCase
+
+from quote import Quote
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from memory_report import MemoryReport
+from log_fixtures import generate_rows
+
+
+class TestMemoryReport(TestCase):
+
+    def test_allocations_by_component(self):
+        memory_report = MemoryReport(sample_every_lines=1000)
+        try:
+            self.assertTrue(tracemalloc.is_tracing())
+            limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+            quotes = []
+            for lines_read, row in enumerate(generate_rows(3000, 7), 1):
+                quote = Quote(row)
+                # Kept alive by the test, the live orders also by the book
+                quotes.append(quote)
+                if quote.type() == NewCancel.NEW:
+                    limit_order_book.on_new_order(quote)
+                else:
+                    limit_order_book.on_cancel_order(quote)
+                memory_report.on_lines_read(lines_read)
+        finally:
+            memory_report.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+
+        samples = memory_report.samples()
+        self.assertEqual([1000, 2000, 3000], [memory_sample.lines_read for memory_sample in samples])
+        last_sample = samples[-1]
+        self.assertGreater(last_sample.component_sizes.get("book", 0), 0)
+        self.assertGreater(last_sample.component_sizes.get("parser", 0), 0)
+        self.assertGreaterEqual(last_sample.traced_peak_size, last_sample.traced_size)
+        self.assertGreaterEqual(sum(last_sample.component_sizes.values()), samples[0].component_sizes.get("book", 0))
+        if last_sample.rss is not None and last_sample.peak_rss is not None:
+            self.assertGreaterEqual(last_sample.peak_rss, last_sample.rss)
+        lines = memory_report.report()
+        self.assertTrue(lines[0].startswith("Memory timeline"))
+        self.assertEqual(len(samples) + 2 + len(memory_report.top_sites()), len(lines))
+
+    def test_tracing_started_elsewhere(self):
+        tracemalloc.start()
+        try:
+            memory_report = MemoryReport(sample_every_lines=10)
+            memory_report.sample(5)
+            memory_report.stop()
+            # Not stopped by the report
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
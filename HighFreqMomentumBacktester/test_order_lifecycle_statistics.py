@@ -0,0 +1,90 @@
+from unittest import TestCase
+from random import Random
+
+from quote import Quote
+from curr_pair import CurrPair
+from limit_order_book import LimitOrderBook
+from streaming_histogram import StreamingHistogram
+from order_lifecycle_statistics import OrderLifecycleStatistics
+
+
+class TestStreamingHistogram(TestCase):
+
+    def test_percentiles_within_precision(self):
+        random_generator = Random(1)
+        values = sorted(random_generator.randint(0, 10000000) for i in range(20000))
+        histogram = StreamingHistogram(precision_bits=7)
+        for value in values:
+            histogram.record(value)
+        self.assertEqual(20000, histogram.count())
+        self.assertEqual(values[0], histogram.min())
+        self.assertEqual(values[-1], histogram.max())
+        for percentile in (10.0, 50.0, 90.0, 99.0):
+            expected_value = values[int(percentile / 100.0 * len(values)) - 1]
+            self.assertAlmostEqual(expected_value, histogram.percentile(percentile), delta=expected_value / 64.0)
+        # Bounded number of buckets
+        self.assertLess(len(histogram.buckets()), 24 * 128)
+
+    def test_small_values_are_exact(self):
+        histogram = StreamingHistogram()
+        for value in (0, 1, 2, 3, 100):
+            histogram.record(value)
+        self.assertEqual(2.0, histogram.percentile(50.0))
+        self.assertEqual(100.0, histogram.percentile(100.0))
+
+
+class TestOrderLifecycleStatistics(TestCase):
+
+    def test_resting_time_per_level(self):
+        order_book = LimitOrderBook(CurrPair.USDCHF)
+        statistics = OrderLifecycleStatistics(max_level=2)
+        rows = ["N;1;USD/CHF;1000000000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0",
+                "N;2;USD/CHF;1001000000;1610963536459;1000000.00;0.00;0.00;0.89150;B;0",
+                "N;3;USD/CHF;1002000000;1610963536459;1000000.00;0.00;0.00;0.89140;B;0",
+                "N;4;USD/CHF;1003000000;1610963536459;1000000.00;0.00;0.00;0.89130;B;0",
+                "C;2;USD/CHF;1006000000;1610963536459",
+                "C;4;USD/CHF;2003000000;1610963536459"]
+        for row in rows:
+            quote = Quote(row)
+            if row.startswith("N"):
+                order_book.on_new_order(quote)
+                statistics.on_new_order(quote, order_book)
+            else:
+                statistics.on_cancel_order(quote, order_book.on_cancel_order(quote))
+
+        pair_statistics = statistics.pair_statistics(CurrPair.USDCHF)
+        self.assertEqual(4, pair_statistics.new_count())
+        self.assertEqual(0.5, pair_statistics.cancel_to_new_ratio())
+        # Order 2 was inserted on level 1 and rested 5 ms
+        self.assertEqual(0, pair_statistics.resting_time_histogram(0).count())
+        self.assertEqual(5000000, pair_statistics.resting_time_histogram(1).min())
+        # Order 4 was inserted on level 3, grouped with the deeper levels, and rested 1 s
+        self.assertEqual(1000000000, pair_statistics.resting_time_histogram(2).max())
+        # 6 updates over 1.003 s
+        self.assertAlmostEqual(6 / 1.003, pair_statistics.update_rate(), delta=0.000001)
+        self.assertEqual(3, len(statistics.report()))
+
+    def test_orders_skipped_by_the_book(self):
+        order_book = LimitOrderBook(CurrPair.USDCHF)
+        statistics = OrderLifecycleStatistics(max_level=2)
+        # The second NEW of the ID 1 is skipped by the book: the order stays on the best level
+        rows = ["N;1;USD/CHF;1000000000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0",
+                "N;2;USD/CHF;1001000000;1610963536459;1000000.00;0.00;0.00;0.89150;B;0",
+                "N;3;USD/CHF;1002000000;1610963536459;1000000.00;0.00;0.00;0.89140;B;0",
+                "N;1;USD/CHF;1003000000;1610963536459;1000000.00;0.00;0.00;0.89130;B;0",
+                "C;1;USD/CHF;1006000000;1610963536459",
+                "C;1;USD/CHF;1007000000;1610963536459"]
+        for row in rows:
+            quote = Quote(row)
+            if row.startswith("N"):
+                order_book.on_new_order(quote)
+                statistics.on_new_order(quote, order_book)
+            else:
+                statistics.on_cancel_order(quote, order_book.on_cancel_order(quote))
+
+        pair_statistics = statistics.pair_statistics(CurrPair.USDCHF)
+        self.assertEqual(1, order_book.duplicate_order_count())
+        self.assertEqual(4, pair_statistics.new_count())
+        self.assertEqual(1, pair_statistics.resting_time_histogram(0).count())
+        self.assertEqual(6000000, pair_statistics.resting_time_histogram(0).max())
+        self.assertEqual(0, pair_statistics.resting_time_histogram(2).count())
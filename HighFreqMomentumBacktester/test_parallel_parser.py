@@ -0,0 +1,45 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from quote import Quote
+from new_cancel import NewCancel
+from parallel_parser import parse_file_in_parallel, split_file_in_chunks
+from log_fixtures import generate_rows
+
+
+def describe(quote: Quote) -> tuple:
+    if quote.type() == NewCancel.NEW:
+        return quote.type(), quote.id(), quote.currency_pair(), quote.time(), quote.exchange_time(), quote.amount(), \
+            quote.price(), quote.way()
+    return quote.type(), quote.id(), quote.currency_pair(), quote.time(), quote.exchange_time()
+
+
+class TestParallelParser(TestCase):
+
+    def setUp(self) -> None:
+        self.rows = generate_rows(5000, 11)
+        file_descriptor, self.file_name = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(file_descriptor, 'w') as file_writer:
+            file_writer.write('\n'.join(self.rows) + '\n')
+
+    def tearDown(self) -> None:
+        os.remove(self.file_name)
+
+    def test_chunks_end_on_line_feeds(self):
+        chunks = split_file_in_chunks(self.file_name, 7)
+        self.assertEqual(7, len(chunks))
+        self.assertEqual(0, chunks[0][0])
+        self.assertEqual(os.path.getsize(self.file_name), chunks[-1][1])
+        with open(self.file_name, 'rb') as file_reader:
+            for start, end in chunks[:-1]:
+                file_reader.seek(end - 1)
+                self.assertEqual(b'\n', file_reader.read(1))
+
+    def test_same_quotes_as_sequential_parsing(self):
+        expected_quotes = [describe(Quote(row)) for row in self.rows]
+        with parse_file_in_parallel(self.file_name, 3) as parsed_columns:
+            self.assertEqual(len(self.rows), len(parsed_columns))
+            self.assertEqual(expected_quotes, [describe(quote) for quote in parsed_columns.iter_quotes()])
+            self.assertEqual(expected_quotes[3333:],
+                             [describe(quote) for quote in parsed_columns.iter_quotes(3333)])
@@ -0,0 +1,129 @@
+from unittest import TestCase
+
+from quote import Quote
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from momentum_strategy import MomentumStrategy
+from trade_situation import TradeSituation
+from top_of_book import TopOfBook
+from portfolio import Portfolio, pair_currencies
+from log_fixtures import generate_rows
+
+
+class FixedPosition:
+    # Stands for a TradeSituation with known prices
+
+    def __init__(self, is_long: bool, amount: float, open_price: float, close_price: float = None):
+        self.is_long = is_long
+        self.traded_amount = amount
+        self.price = open_price
+        self.final_price = close_price
+
+    def is_long_trade(self) -> bool:
+        return self.is_long
+
+    def amount(self) -> float:
+        return self.traded_amount
+
+    def open_price(self) -> float:
+        return self.price
+
+    def close_price(self) -> float:
+        return self.final_price
+
+
+def top_of_book(bid_price: float, offer_price: float) -> TopOfBook:
+    return TopOfBook(1, bid_price, 1000000.00, offer_price, 1000000.00, (bid_price + offer_price) / 2.0,
+                     offer_price - bid_price, True, True)
+
+
+class TestPortfolio(TestCase):
+
+    def test_pair_currencies(self):
+        self.assertEqual(("EUR", "USD"), pair_currencies(CurrPair.EURUSD))
+        self.assertEqual(("USD", "CHF"), pair_currencies(CurrPair.USDCHF))
+
+    def test_netting(self):
+        portfolio = Portfolio("USD")
+        long_position = FixedPosition(True, 1000000.00, 1.20000)
+        short_position = FixedPosition(False, 1000000.00, 1.20010)
+        portfolio.on_open(long_position, CurrPair.EURUSD)
+        portfolio.on_open(short_position, CurrPair.EURUSD)
+        # The EUR flows of the two positions cancel out
+        self.assertEqual(0.0, portfolio.exposure("EUR"))
+        self.assertAlmostEqual(100.0, portfolio.exposure("USD"), 6)
+        self.assertEqual(2, portfolio.open_positions_count())
+        long_position.final_price = 1.20020
+        portfolio.on_close(long_position)
+        self.assertEqual(-1000000.00, portfolio.exposure("EUR"))
+        self.assertEqual(1, portfolio.open_positions_count())
+        # The open SHORT position is valued at the mid
+        portfolio.on_book_update(CurrPair.EURUSD, top_of_book(1.20000, 1.20010))
+        # Realized 200.00 USD and unrealized 50.00 USD
+        self.assertAlmostEqual(250.0, portfolio.total_pnl(), 4)
+
+    def test_exposure_limits(self):
+        portfolio = Portfolio("USD", {"USD": 1500000.00})
+        self.assertTrue(portfolio.can_open(CurrPair.USDCHF, True, 1000000.00, 0.89150))
+        portfolio.on_open(FixedPosition(True, 1000000.00, 0.89150), CurrPair.USDCHF)
+        self.assertFalse(portfolio.can_open(CurrPair.USDCHF, True, 1000000.00, 0.89150))
+        # Selling EUR/USD buys USD: rejected too
+        self.assertFalse(portfolio.can_open(CurrPair.EURUSD, False, 1000000.00, 1.20000))
+        # Buying EUR/USD reduces the USD exposure
+        self.assertTrue(portfolio.can_open(CurrPair.EURUSD, True, 1000000.00, 1.20000))
+        self.assertTrue(portfolio.can_open(CurrPair.USDCHF, False, 1000000.00, 0.89150))
+        self.assertEqual(2, portfolio.rejected_count())
+
+    def test_rates(self):
+        portfolio = Portfolio("EUR")
+        self.assertIsNone(portfolio.rate("CHF"))
+        portfolio.on_book_update(CurrPair.USDCHF, top_of_book(0.89140, 0.89160))
+        portfolio.on_book_update(CurrPair.EURUSD, top_of_book(1.19990, 1.20010))
+        self.assertEqual(1.0, portfolio.rate("EUR"))
+        self.assertAlmostEqual(1.0 / 1.20000, portfolio.rate("USD"), 12)
+        # Through USD
+        self.assertAlmostEqual(1.0 / 0.89150 / 1.20000, portfolio.rate("CHF"), 12)
+        portfolio.on_open(FixedPosition(True, 1000000.00, 0.89150), CurrPair.USDCHF)
+        self.assertAlmostEqual(0.0, portfolio.total_pnl(), 6)
+        portfolio.on_open(FixedPosition(True, 1000000.00, 110.000), CurrPair.USDJPY)
+        with self.assertRaises(RuntimeError):
+            portfolio.total_pnl()
+
+    def test_check_rates(self):
+        Portfolio("USD").check_rates([CurrPair.EURUSD, CurrPair.USDCHF])
+        # EUR/CHF is valued through USD
+        Portfolio("CHF").check_rates([CurrPair.EURUSD, CurrPair.USDCHF])
+        Portfolio("USD").check_rates([CurrPair.EURUSD])
+        with self.assertRaisesRegex(Exception, "^Please add a pair of NOK with USD"):
+            Portfolio("USD").check_rates([CurrPair.NOKSEK])
+        with self.assertRaisesRegex(Exception, "^Please add a pair of USD with EUR to value"):
+            Portfolio("EUR").check_rates([CurrPair.USDCHF])
+
+    def test_pnl_of_closed_positions(self):
+        rows = generate_rows(3000, 42)
+        MomentumStrategy.set_last_generated_id(0)
+        TradeSituation.set_last_generated_id(0)
+        limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+        portfolio = Portfolio("CHF")
+        strategy = MomentumStrategy(6, 2, 0.00002, 1000000.00, True, max_open_positions=3,
+                                    limit_order_book=limit_order_book, portfolio=portfolio)
+        quote = None
+        for row in rows:
+            quote = Quote(row)
+            if quote.type() == NewCancel.NEW:
+                limit_order_book.on_new_order(quote)
+                top = limit_order_book.top_of_book()
+                portfolio.on_book_update(CurrPair.USDCHF, top)
+                strategy.step(quote, top)
+            else:
+                limit_order_book.on_cancel_order(quote)
+        strategy.close_pending_position(quote)
+        positions = strategy.all_positions()
+        self.assertGreater(len(positions), 0)
+        self.assertEqual(0, portfolio.open_positions_count())
+        self.assertEqual(len(positions), portfolio.opened_count())
+        # Every position is closed: the flows are the sum of the PnL of the positions
+        self.assertAlmostEqual(0.0, portfolio.exposure("USD"), 4)
+        self.assertAlmostEqual(sum(position.return_current_pnl() * position.amount() for position in positions),
+                               portfolio.total_pnl(), 4)
@@ -0,0 +1,49 @@
+from unittest import TestCase
+from quote import Quote
+from curr_pair import CurrPair
+from limit_order_book import LimitOrderBook
+from quote_conflator import QuoteConflator
+
+
+class TestQuoteConflator(TestCase):
+
+    def setUp(self) -> None:
+        self.order_book = LimitOrderBook(CurrPair.USDCHF)
+
+    def apply(self, conflator: QuoteConflator, row: str) -> bool:
+        quote = Quote(row)
+        self.order_book.on_new_order(quote)
+        return conflator.on_book_update(quote)
+
+    def test_top_of_book_conflation(self):
+        conflator = QuoteConflator(self.order_book)
+        self.assertTrue(self.apply(conflator, "N;1;USD/CHF;1000000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0"))
+        self.assertTrue(self.apply(conflator, "N;2;USD/CHF;2000000;1610963536459;1000000.00;0.00;0.00;0.89173;S;0"))
+        # Deeper levels: nothing to do for the strategies
+        self.assertFalse(self.apply(conflator, "N;3;USD/CHF;3000000;1610963536459;1000000.00;0.00;0.00;0.89150;B;0"))
+        self.assertFalse(self.apply(conflator, "N;4;USD/CHF;4000000;1610963536459;1000000.00;0.00;0.00;0.89180;S;0"))
+        # More amount on the best bid level
+        self.assertTrue(self.apply(conflator, "N;5;USD/CHF;5000000;1610963536459;2000000.00;0.00;0.00;0.89153;B;0"))
+        self.assertEqual(0.89153, self.order_book.get_best_bid_price())
+        self.assertEqual(3000000.00, self.order_book.get_best_bid_amount())
+
+        self.assertEqual(5, conflator.events_received())
+        self.assertEqual(3, conflator.events_emitted())
+        self.assertEqual(2, conflator.events_saved())
+
+    def test_depth_and_price_only(self):
+        conflator = QuoteConflator(self.order_book, depth=2, is_price_only=True)
+        self.assertTrue(self.apply(conflator, "N;1;USD/CHF;1000000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0"))
+        # Second bid level
+        self.assertTrue(self.apply(conflator, "N;2;USD/CHF;2000000;1610963536459;1000000.00;0.00;0.00;0.89150;B;0"))
+        # Third bid level and amounts are not observed
+        self.assertFalse(self.apply(conflator, "N;3;USD/CHF;3000000;1610963536459;1000000.00;0.00;0.00;0.89140;B;0"))
+        self.assertFalse(self.apply(conflator, "N;4;USD/CHF;4000000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0"))
+
+    def test_time_conflation(self):
+        # At most one update per 10 microseconds (10000 nanoseconds)
+        conflator = QuoteConflator(self.order_book, min_interval_us=10)
+        self.assertTrue(self.apply(conflator, "N;1;USD/CHF;1000000;1610963536459;1000000.00;0.00;0.00;0.89153;B;0"))
+        self.assertFalse(self.apply(conflator, "N;2;USD/CHF;1005000;1610963536459;1000000.00;0.00;0.00;0.89155;B;0"))
+        # The held back change is emitted by the first event after the interval, even a deep one
+        self.assertTrue(self.apply(conflator, "N;3;USD/CHF;1012000;1610963536459;1000000.00;0.00;0.00;0.89100;B;0"))
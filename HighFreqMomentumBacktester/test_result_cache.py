@@ -0,0 +1,46 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from performance_summary import LedgerEntry
+from result_cache import ResultCache, RESULT_MODULES
+
+
+class TestResultCache(TestCase):
+
+    def test_hit_miss_and_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, "log.csv")
+            with open(log_file_name, 'w') as file_writer:
+                file_writer.write("C;1;USD/CHF;39136466000000;1610963536459\n")
+            ledger = [LedgerEntry(1, True, 0.0002, 0.0001), LedgerEntry(2, False, -0.0001, 0.0003)]
+            parameters = {"pair": "USD/CHF", "ma_slow": 10, "ma_fast": 2}
+
+            result_cache = ResultCache(os.path.join(directory, "cache"))
+            self.assertIsNone(result_cache.get(log_file_name, parameters, 300000.00, 10.00))
+            result_cache.put(log_file_name, parameters, ledger)
+            cached_ledger, summary = ResultCache(os.path.join(directory, "cache"))\
+                .get(log_file_name, parameters, 300000.00, 10.00)
+            self.assertEqual(ledger, cached_ledger)
+            self.assertEqual(2, summary.positions_opened)
+            self.assertAlmostEqual(0.0003, summary.maximal_draw_down)
+            # Other parameters or another content: miss
+            self.assertIsNone(result_cache.get(log_file_name, dict(parameters, ma_slow=20), 300000.00, 10.00))
+            with open(log_file_name, 'a') as file_writer:
+                file_writer.write("C;2;USD/CHF;39136466001000;1610963536459\n")
+            self.assertIsNone(result_cache.get(log_file_name, parameters, 300000.00, 10.00))
+
+            # Only the most recently used entries are kept
+            entry_size = result_cache.size()
+            small_cache = ResultCache(os.path.join(directory, "cache"), max_size=2 * entry_size)
+            for ma_slow in (30, 40, 50):
+                small_cache.put(log_file_name, dict(parameters, ma_slow=ma_slow), ledger)
+            self.assertLessEqual(small_cache.size(), 2 * entry_size)
+            self.assertIsNotNone(small_cache.get(log_file_name, dict(parameters, ma_slow=50), 300000.00, 10.00))
+
+    def test_code_version_covers_the_replay_loop(self):
+        source_directory = os.path.dirname(os.path.abspath(__file__))
+        for module_file_name in ("main.py", "curr_pair.py", "buy_sell.py", "new_cancel.py", "parallel_parser.py"):
+            self.assertIn(module_file_name, RESULT_MODULES)
+        for module_file_name in RESULT_MODULES:
+            self.assertTrue(os.path.exists(os.path.join(source_directory, module_file_name)))
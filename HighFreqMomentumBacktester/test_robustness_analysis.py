@@ -0,0 +1,72 @@
+from random import Random
+from unittest import TestCase
+
+import numpy as np
+
+from performance_summary import LedgerEntry, summarize_ledger
+from resampling_method import ResamplingMethod
+from robustness_analysis import path_statistics, resample_indices, run_robustness_analysis
+
+
+def random_ledger(position_count: int, seed: int) -> list:
+    random_generator = Random(seed)
+    return [LedgerEntry(position_id, random_generator.random() < 0.5, random_generator.gauss(0.00001, 0.00003),
+                        random_generator.expovariate(50000.0)) for position_id in range(position_count)]
+
+
+class TestRobustnessAnalysis(TestCase):
+
+    def test_path_statistics_as_a_loop(self):
+        ledger = random_ledger(300, 4)
+        pnl = np.array([[entry.pnl_bps for entry in ledger]])
+        draw_down = np.array([[entry.draw_down_bps for entry in ledger]])
+        total_pnl, maximal_draw_downs, calmar_ratios = path_statistics(pnl, draw_down)
+
+        cumulated_pnl = 0.0
+        peak = 0.0
+        maximal_draw_down = 0.0
+        for entry in ledger:
+            maximal_draw_down = max(maximal_draw_down, peak - (cumulated_pnl - entry.draw_down_bps))
+            cumulated_pnl += entry.pnl_bps
+            maximal_draw_down = max(maximal_draw_down, peak - cumulated_pnl)
+            peak = max(peak, cumulated_pnl)
+        self.assertAlmostEqual(cumulated_pnl, total_pnl[0], 12)
+        self.assertAlmostEqual(maximal_draw_down, maximal_draw_downs[0], 12)
+        self.assertAlmostEqual(cumulated_pnl / maximal_draw_down, calmar_ratios[0], 6)
+        # Never lower than the draw down of one position
+        self.assertGreaterEqual(maximal_draw_downs[0], summarize_ledger(ledger, 1.0, 0.0).maximal_draw_down)
+
+    def test_resample_indices(self):
+        random_generator = np.random.default_rng(3)
+        indices = resample_indices(random_generator, ResamplingMethod.REORDER, 20, 101, 5)
+        for row in indices:
+            self.assertEqual(list(range(101)), sorted(row))
+        indices = resample_indices(random_generator, ResamplingMethod.BLOCK_BOOTSTRAP, 20, 101, 5)
+        self.assertEqual((20, 101), indices.shape)
+        self.assertTrue(np.all((indices >= 0) & (indices < 101)))
+        # Consecutive positions inside a block
+        self.assertTrue(np.all(np.diff(indices.reshape(20, -1)[:, :100].reshape(20, 20, 5), axis=2) == 1))
+
+    def test_block_length_higher_than_0(self):
+        ledger = random_ledger(50, 7)
+        for block_length in (0, -3):
+            with self.assertRaisesRegex(Exception, "^Please provide a block length higher than 0"):
+                run_robustness_analysis(ledger, sample_count=10, block_length=block_length, max_workers=1)
+            with self.assertRaisesRegex(Exception, "^Please provide a block length higher than 0"):
+                resample_indices(np.random.default_rng(3), ResamplingMethod.BLOCK_BOOTSTRAP, 5, 50, block_length)
+
+    def test_reorder_keeps_the_total(self):
+        ledger = random_ledger(500, 5)
+        report = run_robustness_analysis(ledger, ResamplingMethod.REORDER, 600, seed=1, max_workers=1)
+        self.assertAlmostEqual(report.total_pnl.observed, report.total_pnl.lower, 9)
+        self.assertAlmostEqual(report.total_pnl.observed, report.total_pnl.upper, 9)
+        self.assertLessEqual(report.maximal_draw_down.lower, report.maximal_draw_down.median)
+        self.assertLessEqual(report.maximal_draw_down.median, report.maximal_draw_down.upper)
+
+    def test_same_result_with_processes(self):
+        ledger = random_ledger(400, 6)
+        in_process_report = run_robustness_analysis(ledger, sample_count=700, seed=2, max_workers=1)
+        pool_report = run_robustness_analysis(ledger, sample_count=700, seed=2, max_workers=2)
+        self.assertEqual(in_process_report, pool_report)
+        self.assertLessEqual(in_process_report.total_pnl.lower, in_process_report.total_pnl.upper)
+        self.assertTrue(0.0 <= in_process_report.probability_of_loss <= 1.0)
@@ -0,0 +1,83 @@
+from random import Random
+from unittest import TestCase
+
+from quote import Quote
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from momentum_strategy import MomentumStrategy
+from trade_situation import TradeSituation
+from take_profit_index import TakeProfitIndex
+from log_fixtures import generate_rows
+
+
+class RecordingPosition:
+    # Stands for a TradeSituation: keeps the prices given by the index
+
+    def __init__(self, open_price: float):
+        self.price = open_price
+        self.last_price = None
+        self.worst_price = None
+
+    def open_price(self) -> float:
+        return self.price
+
+    def update_reference_prices(self, last_price: float, worst_price: float):
+        self.last_price = last_price
+        self.worst_price = worst_price
+
+
+class TestTakeProfitIndex(TestCase):
+
+    def test_same_prices_as_polling(self):
+        random_generator = Random(8)
+        for is_long in (True, False):
+            take_profit = 0.00004
+            positions = TakeProfitIndex(is_long)
+            # Polling: position -> prices seen since the opening
+            seen_prices = {}
+            price = 0.89150
+            for tick in range(1, 3000):
+                price = round(price + random_generator.choice((-0.00001, 0.0, 0.00001)), 5)
+                for position in seen_prices:
+                    seen_prices[position].append(price)
+                closed_positions = positions.on_reference_price(tick, price, take_profit)
+                expected_closed_positions = [position for position, prices in seen_prices.items()
+                                             if (prices[-1] - position.open_price() if is_long
+                                                 else position.open_price() - prices[-1]) >= take_profit]
+                self.assertEqual(set(expected_closed_positions), set(closed_positions))
+                if random_generator.random() < 0.02:
+                    closed_positions += positions.pop_all()
+                for position in closed_positions:
+                    prices = seen_prices.pop(position)
+                    self.assertEqual(prices[-1], position.last_price)
+                    self.assertEqual(min(prices) if is_long else max(prices), position.worst_price)
+                if random_generator.random() < 0.3:
+                    position = RecordingPosition(round(price + random_generator.choice((-0.00001, 0.00001)), 5))
+                    positions.add(position, tick)
+                    seen_prices[position] = []
+                self.assertEqual(len(seen_prices), len(positions))
+
+    def test_pyramiding(self):
+        rows = generate_rows(3000, 42)
+        position_counts = []
+        for max_open_positions in (1, 3):
+            MomentumStrategy.set_last_generated_id(0)
+            TradeSituation.set_last_generated_id(0)
+            limit_order_book = LimitOrderBook(CurrPair.USDCHF)
+            MomentumStrategy.set_limit_order_book(limit_order_book)
+            TradeSituation.set_limit_order_book(limit_order_book)
+            strategy = MomentumStrategy(6, 2, 0.00002, 1000000.00, True, max_open_positions=max_open_positions)
+            quote = None
+            for row in rows:
+                quote = Quote(row)
+                if quote.type() == NewCancel.NEW:
+                    limit_order_book.on_new_order(quote)
+                    strategy.step(quote)
+                    self.assertLessEqual(strategy.open_positions_count(), max_open_positions)
+                else:
+                    limit_order_book.on_cancel_order(quote)
+            strategy.close_pending_position(quote)
+            self.assertEqual(0, strategy.open_positions_count())
+            position_counts.append(len(strategy.all_positions()))
+        self.assertGreater(position_counts[1], position_counts[0])
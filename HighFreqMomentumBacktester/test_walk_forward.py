@@ -0,0 +1,104 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+from quote import Quote
+from curr_pair import CurrPair
+from limit_order_book import LimitOrderBook
+from book_recovery_policy import BookRecoveryPolicy
+from momentum_strategy import MomentumStrategy
+from trade_situation import TradeSituation
+from performance_summary import build_ledger, summarize_ledger
+from fix_log_generator import FixLogGenerator
+from log_fixtures import generate_rows
+from walk_forward import WalkForwardWindow, build_parameter_grid, plan_windows, precompute_book_snapshots, \
+    evaluate_window, replay_strategies, run_walk_forward, _init_worker, _update_book
+
+PARAMETER_GRID = build_parameter_grid([6, 10], [2], [0.00002, 0.00003])
+TRADED_AMOUNT = 1000000.00
+
+
+def generate_quotes(row_count: int, seed: int) -> list:
+    return [Quote(row) for row in generate_rows(row_count, seed)]
+
+
+def replay_book(quotes: list) -> LimitOrderBook:
+    limit_order_book = LimitOrderBook(CurrPair.USDCHF, BookRecoveryPolicy.COUNT_AND_SKIP)
+    for quote in quotes:
+        _update_book(limit_order_book, quote)
+    return limit_order_book
+
+
+def book_state(limit_order_book: LimitOrderBook) -> tuple:
+    return (limit_order_book.sequence(), limit_order_book.count_bids(), limit_order_book.count_offers(),
+            limit_order_book.top_of_book())
+
+
+class TestWalkForward(TestCase):
+
+    def test_plan_windows(self):
+        windows = plan_windows(1, 100, 30, 20)
+        self.assertEqual([WalkForwardWindow(1, 0, 30, 50), WalkForwardWindow(1, 20, 50, 70),
+                          WalkForwardWindow(1, 40, 70, 90)], windows)
+        for window in windows:
+            # In-sample [start, split) is followed by out-of-sample [split, end)
+            self.assertEqual(30, window.split - window.start)
+            self.assertEqual(20, window.end - window.split)
+        # The out-of-sample periods follow each other without overlapping
+        for window, next_window in zip(windows, windows[1:]):
+            self.assertEqual(window.end, next_window.split)
+        self.assertEqual([WalkForwardWindow(0, 0, 30, 50)], plan_windows(0, 50, 30, 20))
+        self.assertEqual([], plan_windows(0, 49, 30, 20))
+        self.assertRaises(Exception, plan_windows, 0, 100, 0, 20)
+        self.assertRaises(Exception, plan_windows, 0, 100, 30, 0)
+
+    def test_book_snapshots(self):
+        quotes = generate_quotes(5000, 1)
+        snapshots = precompute_book_snapshots(quotes, CurrPair.USDCHF, [3000, 0, 1234, 3000, 9000])
+        self.assertEqual([0, 1234, 3000, 9000], sorted(snapshots))
+        for start in (0, 1234, 3000, 9000):
+            self.assertEqual(book_state(replay_book(quotes[:start])), book_state(pickle.loads(snapshots[start])))
+
+    def test_out_of_sample_equals_a_straight_replay(self):
+        quotes = generate_quotes(12000, 2)
+        window = plan_windows(0, len(quotes), 6000, 3000)[1]
+        snapshots = precompute_book_snapshots(quotes, CurrPair.USDCHF, [window.start])
+        _init_worker([(quotes, snapshots)])
+        result = evaluate_window(window, PARAMETER_GRID, TRADED_AMOUNT, True, 10.00, "net_profit")
+        self.assertIn(result.best_parameters, PARAMETER_GRID)
+
+        # Straight replay: the book from the first event, the retained strategy from the split
+        limit_order_book = replay_book(quotes[:window.split])
+        MomentumStrategy.set_limit_order_book(limit_order_book)
+        TradeSituation.set_limit_order_book(limit_order_book)
+        strategy = MomentumStrategy(*result.best_parameters, TRADED_AMOUNT, True)
+        replay_strategies(quotes[window.split:window.end], limit_order_book, [strategy])
+        self.assertGreater(len(strategy.all_positions()), 0)
+        self.assertEqual(summarize_ledger(build_ledger(strategy.all_positions()), TRADED_AMOUNT, 10.00),
+                         result.out_of_sample)
+
+    def test_in_sample_ignores_the_out_of_sample_events(self):
+        quotes = generate_quotes(9000, 3)
+        window = plan_windows(0, len(quotes), 6000, 3000)[0]
+        snapshots = precompute_book_snapshots(quotes, CurrPair.USDCHF, [window.start])
+        _init_worker([(quotes, snapshots)])
+        result = evaluate_window(window, PARAMETER_GRID, TRADED_AMOUNT, True, 10.00, "net_profit")
+        # Other out-of-sample events: same in-sample optimisation
+        _init_worker([(quotes[:window.split] + generate_quotes(3000, 4), snapshots)])
+        other_result = evaluate_window(window, PARAMETER_GRID, TRADED_AMOUNT, True, 10.00, "net_profit")
+        self.assertEqual(result.best_parameters, other_result.best_parameters)
+        self.assertEqual(result.in_sample, other_result.in_sample)
+
+    def test_same_results_with_one_or_many_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = []
+            for seed in (5, 6):
+                file_name = os.path.join(directory, "session-{0}.csv".format(seed))
+                FixLogGenerator(["USD/CHF"], depth=4, cancel_ratio=0.7, seed=seed).write(file_name, 8000)
+                file_names.append(file_name)
+            results = run_walk_forward(file_names, CurrPair.USDCHF, PARAMETER_GRID, 3000, 1500, TRADED_AMOUNT,
+                                       max_workers=1)
+            self.assertEqual(2 * len(plan_windows(0, 8000, 3000, 1500)), len(results))
+            self.assertEqual(results, run_walk_forward(file_names, CurrPair.USDCHF, PARAMETER_GRID, 3000, 1500,
+                                                       TRADED_AMOUNT, max_workers=2))
@@ -0,0 +1,18 @@
+from typing import NamedTuple
+
+
+class TopOfBook(NamedTuple):
+    # Immutable view of the best prices of a LimitOrderBook after one change of the book. All the consumers of an
+    # event (strategies, positions) read the same figures without calling the book again.
+    # Number of changes of the book (NEW and CANCEL applied) when the view was built
+    sequence: int
+    # Best prices and total amounts of the best levels (0.00 when a side is empty)
+    bid_price: float
+    bid_amount: float
+    offer_price: float
+    offer_amount: float
+    # (bid_price + offer_price) / 2 and offer_price - bid_price, computed with the 0.00 of an empty side
+    mid_price: float
+    spread: float
+    is_bid_set: bool
+    is_offer_set: bool
@@ -2,6 +2,7 @@ import warnings
 
 from quote import Quote
 from limit_order_book import LimitOrderBook
+from top_of_book import TopOfBook
 from buy_sell import BuySell
 
 
@@ -11,6 +12,8 @@ class TradeSituation:
     __common_trade_situation_id: int = 0
     # This is a global reference to the order book
     __common_order_book: LimitOrderBook
+    # Order book of this position (None: the common order book)
+    __order_book: LimitOrderBook
     # Instance attributes
     # Unique ID of the trade_situation
     __trade_situation_id: int
@@ -36,13 +39,28 @@ class TradeSituation:
     __amount: float
     # This variable describes that we are using the best BID and best OFFER to calculate PnL
     __is_best_price_calculation: bool
+    # Spread of the book when the position was opened and closed (0.00 if a side of the book was empty)
+    __open_spread: float
+    __close_spread: float
 
     def __init__(self, open_order_arg: Quote, is_long_trade_arg: bool, take_profit_in_bps_arg: float, amount: float,
-                 is_best_px_calc: bool):
+                 is_best_px_calc: bool, limit_order_book: LimitOrderBook = None):
+        """
+        Creates and opens a position
+        :param open_order_arg: the quote that triggered the opening
+        :param is_long_trade_arg: True for a LONG (BUY) position
+        :param take_profit_in_bps_arg: take profit
+        :param amount: traded amount
+        :param is_best_px_calc: calculate the PnL with the best BID/OFFER (instead of the best order for the amount)
+        :param limit_order_book: the order book of the traded pair (default: the common order book)
+        """
+        self.__order_book = limit_order_book
         # Init locals
         self.__max_dd_in_bps = 0.00
         self.__pnl_bps = 0.00
         self.__is_closed = True
+        self.__executed_close_quote = None
+        self.__close_spread = 0.00
         # Update and set the __trade_situation_id
         self.__trade_situation_id = TradeSituation.generate_next_id()
         # Check arguments sanity.
@@ -65,9 +83,9 @@ class TradeSituation:
         """
         # Sets the __executed_open_quote to argument's value and flags __is_closed to FALSE
         opening_quote_way: BuySell = BuySell.SELL if self.__is_long_trade else BuySell.BUY
-        self.__executed_open_quote = TradeSituation.__common_order_book.get_best_orders_by_amount(opening_quote_way,
-                                                                                                  self.__amount)
+        self.__executed_open_quote = self._order_book().get_best_orders_by_amount(opening_quote_way, self.__amount)
         self.__arrived_open_quote = quote_arg
+        self.__open_spread = self._current_spread()
         self.__is_closed = False
 
     def close_position(self, quote_arg: Quote):
@@ -80,11 +98,9 @@ class TradeSituation:
         self.__arrived_close_quote = quote_arg
         # Sets the __executed_close_quote to argument's value, flags __is_closed to TRUE
         if self.__is_long_trade:
-            self.__executed_close_quote = TradeSituation.__common_order_book.get_best_orders_by_amount(BuySell.BUY,
-                                                                                                       self.__amount)
+            self.__executed_close_quote = self._order_book().get_best_orders_by_amount(BuySell.BUY, self.__amount)
         else:
-            self.__executed_close_quote = TradeSituation.__common_order_book.get_best_orders_by_amount(BuySell.SELL,
-                                                                                                       self.__amount)
+            self.__executed_close_quote = self._order_book().get_best_orders_by_amount(BuySell.SELL, self.__amount)
         if self.__executed_close_quote is not None:
             if self.__is_long_trade:
                 # Buy with Offer, close the position with Bid
@@ -96,19 +112,21 @@ class TradeSituation:
         else:
             warnings.warn("Could not retrieve the corresponding order to close the position", RuntimeWarning)
 
+        self.__close_spread = self._current_spread()
         self.__is_closed = True
 
-    def update_on_order(self, quote_arg: Quote) -> bool:
+    def update_on_order(self, quote_arg: Quote, top_of_book: TopOfBook = None) -> bool:
         """
         Updates all the variables in the position. Calculates the PnL.
         :param quote_arg: the latest quote
+        :param top_of_book: the best prices after the latest quote (read from the common book if None)
         :return: returns True if the position was closed (target profit reached)
         """
         # Check if the position is alive. Return false if the position is dormant
         if self.__is_closed:
             return False
         # Check/update current pnl and draw down
-        self.calculate_pnl_and_dd()
+        self.calculate_pnl_and_dd(top_of_book)
         # Check if target pnl was reached
         if self.__pnl_bps >= self.__take_profit_in_bps:
             # Target pnl reached: close position
@@ -118,10 +136,10 @@ class TradeSituation:
         # PnL target not reached: return false
         return False
 
-    def calculate_pnl_and_dd(self) -> float:
+    def calculate_pnl_and_dd(self, top_of_book: TopOfBook = None) -> float:
         """
         Calculates (and updates) the PnL and draw down for the position
-        :param quote_arg: the current quote. Given only for statistics purpose. The best price is kept in the order book
+        :param top_of_book: the best prices of the current event (read from the common book if None)
         :return: current pnl
         """
         # In case the position is not opened (not alive) return the value stored in __pnl_bps
@@ -131,26 +149,26 @@ class TradeSituation:
         # Calculate pnl (different for LONG and SHORT; if we use the best price or not)
         if self.__is_best_price_calculation:
             # Get the best price on market (faster)
+            if top_of_book is None:
+                top_of_book = self._order_book().top_of_book()
             if self.__is_long_trade:
-                if TradeSituation.__common_order_book.get_best_bid() is not None:
-                    price_reference = TradeSituation.__common_order_book.get_best_bid_price()
+                if top_of_book.is_bid_set:
+                    price_reference = top_of_book.bid_price
                 else:
                     # No price available
                     return self.__pnl_bps
             else:
-                if TradeSituation.__common_order_book.get_best_offer() is not None:
-                    price_reference = TradeSituation.__common_order_book.get_best_offer_price()
+                if top_of_book.is_offer_set:
+                    price_reference = top_of_book.offer_price
                 else:
                     # No price available
                     return self.__pnl_bps
         else:
             # Get the price by amount (slower)
             if self.__is_long_trade:
-                corresponding_order = TradeSituation.__common_order_book.get_best_orders_by_amount(BuySell.BUY,
-                                                                                                   self.__amount)
+                corresponding_order = self._order_book().get_best_orders_by_amount(BuySell.BUY, self.__amount)
             else:
-                corresponding_order = TradeSituation.__common_order_book.get_best_orders_by_amount(BuySell.SELL,
-                                                                                                   self.__amount)
+                corresponding_order = self._order_book().get_best_orders_by_amount(BuySell.SELL, self.__amount)
             if corresponding_order is not None:
                 price_reference = corresponding_order.price()
             else:
@@ -171,6 +189,71 @@ class TradeSituation:
         # return __pnl_bps
         return self.__pnl_bps
 
+    def update_reference_prices(self, last_price: float, worst_price: float):
+        """
+        Sets the PnL and draw down from prices tracked outside of the position (TakeProfitIndex). Same result as
+        calling calculate_pnl_and_dd on every tick since the opening.
+        :param last_price: latest reference price (best BID for a LONG position, best OFFER for a SHORT one)
+        :param worst_price: lowest BID (LONG) or highest OFFER (SHORT) since the opening
+        :return:
+        """
+        if self.__is_closed:
+            return
+        if self.__is_long_trade:
+            self.__pnl_bps = last_price - self.__executed_open_quote.price()
+            draw_down = self.__executed_open_quote.price() - worst_price
+        else:
+            self.__pnl_bps = self.__executed_open_quote.price() - last_price
+            draw_down = worst_price - self.__executed_open_quote.price()
+        if draw_down > self.__max_dd_in_bps:
+            self.__max_dd_in_bps = draw_down
+
+    def close_price(self) -> float:
+        """
+        Returns the price at which the position was closed (derived from the final PnL when no order was found)
+        :return:
+        """
+        if self.__executed_close_quote is not None:
+            return self.__executed_close_quote.price()
+        if self.__is_long_trade:
+            return self.__executed_open_quote.price() + self.__pnl_bps
+        return self.__executed_open_quote.price() - self.__pnl_bps
+
+    def amount(self) -> float:
+        """
+        Returns the traded amount (in the base currency of the pair)
+        :return:
+        """
+        return self.__amount
+
+    def _current_spread(self) -> float:
+        top_of_book = self._order_book().top_of_book()
+        return top_of_book.spread if top_of_book.is_bid_set and top_of_book.is_offer_set else 0.00
+
+    def open_spread(self) -> float:
+        """
+        Returns the spread of the book when the position was opened (0.00 if a side of the book was empty)
+        :return:
+        """
+        return self.__open_spread
+
+    def close_spread(self) -> float:
+        """
+        Returns the spread of the book when the position was closed (0.00 if it is open or a side was empty)
+        :return:
+        """
+        return self.__close_spread
+
+    def _order_book(self) -> LimitOrderBook:
+        return self.__order_book if self.__order_book is not None else TradeSituation.__common_order_book
+
+    def open_price(self) -> float:
+        """
+        Returns the price of the order executed to open the position
+        :return:
+        """
+        return self.__executed_open_quote.price()
+
     def return_current_pnl(self) -> float:
         """
         Returns the current (or final if the position is closed) pnl.
@@ -192,6 +275,13 @@ class TradeSituation:
         """
         return self.__trade_situation_id
 
+    def is_long_trade(self) -> bool:
+        """
+        Returns True for a LONG (BUY) position, False for a SHORT (SELL) position
+        :return:
+        """
+        return self.__is_long_trade
+
     def is_closed(self):
         """
         Returns true if the position was closed previously
@@ -204,6 +294,23 @@ class TradeSituation:
         TradeSituation.__common_trade_situation_id += 1
         return TradeSituation.__common_trade_situation_id
 
+    @staticmethod
+    def get_last_generated_id() -> int:
+        """
+        Returns the last trade situation ID handed out by generate_next_id(). Used to snapshot the ID generator.
+        :return:
+        """
+        return TradeSituation.__common_trade_situation_id
+
+    @staticmethod
+    def set_last_generated_id(last_generated_id: int):
+        """
+        Restores the ID generator (after a snapshot was loaded). The next generated ID will be last_generated_id + 1.
+        :param last_generated_id: the value returned by get_last_generated_id() at the time of the snapshot
+        :return:
+        """
+        TradeSituation.__common_trade_situation_id = last_generated_id
+
     @staticmethod
     def set_limit_order_book(limit_order_book: LimitOrderBook):
         TradeSituation.__common_order_book = limit_order_book
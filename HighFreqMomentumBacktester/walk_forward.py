@@ -0,0 +1,234 @@
+# Walk-forward optimisation of the MomentumStrategy parameters.
+#
+# Every session (log file) is parsed once. A single sequential pass over the session records the order book state at
+# the start of every window, so a window is replayed from its own book snapshot without re-parsing or re-replaying
+# the events that precede it. Windows are independent and are evaluated in parallel processes.
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from quote import Quote
+from curr_pair import CurrPair
+from new_cancel import NewCancel
+from limit_order_book import LimitOrderBook
+from book_recovery_policy import BookRecoveryPolicy
+from momentum_strategy import MomentumStrategy
+from indicator_registry import IndicatorRegistry
+from trade_situation import TradeSituation
+from log_reader import LogReader
+from performance_summary import PerformanceSummary, build_ledger, summarize_ledger
+
+
+class WalkForwardWindow(NamedTuple):
+    # Index of the session (in the list of files given to run_walk_forward)
+    session_index: int
+    # Event indexes: in-sample is [start, split), out-of-sample is [split, end)
+    start: int
+    split: int
+    end: int
+
+
+class WalkForwardResult(NamedTuple):
+    window: WalkForwardWindow
+    # (ma_slow, ma_fast, target_profit) retained in-sample
+    best_parameters: tuple
+    in_sample: PerformanceSummary
+    out_of_sample: PerformanceSummary
+
+
+# Data of the worker processes (set once per process by _init_worker)
+_worker_sessions: list = []
+
+
+def load_session_quotes(file_name: str, curr_pair: CurrPair) -> list:
+    """
+    Parses a log file once and keeps the quotes of the given currency pair
+    :param file_name: the log file (plain or compressed)
+    :param curr_pair: the replayed currency pair
+    :return: list of Quote, in the order of the file
+    """
+    quotes = []
+    with LogReader(file_name) as reader_obj:
+        for row in reader_obj:
+            if row.strip() == b'':
+                continue
+            quote = Quote(row.decode())
+            if quote.currency_pair() == curr_pair:
+                quotes.append(quote)
+    return quotes
+
+
+def build_parameter_grid(ma_slow_values: list, ma_fast_values: list, target_profit_values: list) -> list:
+    """
+    Builds all the valid (ma_slow, ma_fast, target_profit) combinations (ma_fast has to be lower than ma_slow)
+    :return: list of tuples
+    """
+    return [(ma_slow, ma_fast, target_profit)
+            for ma_slow in ma_slow_values
+            for ma_fast in ma_fast_values
+            for target_profit in target_profit_values
+            if 0 < ma_fast < ma_slow]
+
+
+def plan_windows(session_index: int, event_count: int, in_sample_length: int, out_of_sample_length: int) -> list:
+    """
+    Splits a session into rolling windows. Each window is moved forward by the out-of-sample length so the
+    out-of-sample periods cover the session without overlapping.
+    :param session_index: index of the session
+    :param event_count: number of events (quotes) in the session
+    :param in_sample_length: number of events used to optimise the parameters
+    :param out_of_sample_length: number of events used to evaluate the retained parameters
+    :return: list of WalkForwardWindow
+    """
+    if in_sample_length <= 0 or out_of_sample_length <= 0:
+        raise Exception("The in-sample ({0}) and out-of-sample ({1}) lengths have to be more than 0"
+                        .format(in_sample_length, out_of_sample_length))
+    windows = []
+    start = 0
+    while start + in_sample_length + out_of_sample_length <= event_count:
+        windows.append(WalkForwardWindow(session_index, start, start + in_sample_length,
+                                         start + in_sample_length + out_of_sample_length))
+        start += out_of_sample_length
+    return windows
+
+
+def precompute_book_snapshots(quotes: list, curr_pair: CurrPair, window_starts: list) -> dict:
+    """
+    Replays the order book once over the whole session and saves (pickled) its state at every window start.
+    :param quotes: the session quotes
+    :param curr_pair: the replayed currency pair
+    :param window_starts: event indexes where a snapshot is needed
+    :return: dictionary event index -> pickled LimitOrderBook
+    """
+    snapshots = {}
+    pending_starts = sorted(set(window_starts))
+    # The windows may start in the middle of the life of the orders: skip the inconsistent events
+    limit_order_book = LimitOrderBook(curr_pair, BookRecoveryPolicy.COUNT_AND_SKIP)
+    for event_index, quote in enumerate(quotes):
+        while pending_starts and pending_starts[0] == event_index:
+            snapshots[pending_starts.pop(0)] = pickle.dumps(limit_order_book, protocol=pickle.HIGHEST_PROTOCOL)
+        if not pending_starts:
+            break
+        _update_book(limit_order_book, quote)
+    for start in pending_starts:
+        snapshots[start] = pickle.dumps(limit_order_book, protocol=pickle.HIGHEST_PROTOCOL)
+    return snapshots
+
+
+def replay_strategies(quotes: list, limit_order_book: LimitOrderBook, strategies: list):
+    """
+    Replays the quotes once: the book is updated once per event and every strategy is stepped on the NEW orders.
+    Pending positions are closed with the last quote.
+    :param quotes: the replayed quotes
+    :param limit_order_book: the book (already set as the common book of MomentumStrategy and TradeSituation)
+    :param strategies: list of MomentumStrategy
+    :return:
+    """
+    quote: Quote = None
+    strategy: MomentumStrategy
+    for quote in quotes:
+        if _update_book(limit_order_book, quote):
+            # One view of the best prices for all the candidates
+            top_of_book = limit_order_book.top_of_book()
+            for strategy in strategies:
+                strategy.step(quote, top_of_book)
+    if quote is not None:
+        for strategy in strategies:
+            strategy.close_pending_position(quote)
+
+
+def evaluate_window(window: WalkForwardWindow, parameter_grid: list, traded_amount: float, is_best_px_calc: bool,
+                    price_per_mil: float, objective: str) -> WalkForwardResult:
+    """
+    Optimises the parameters in-sample (all the candidates share one replay) and evaluates the best candidate
+    out-of-sample, starting from the book state reached at the end of the in-sample period.
+    :param window: the evaluated window
+    :param parameter_grid: list of (ma_slow, ma_fast, target_profit)
+    :param traded_amount: traded amount
+    :param is_best_px_calc: use the best BID/OFFER to calculate the PnL
+    :param price_per_mil: transaction price per million (used for the summaries)
+    :param objective: PerformanceSummary field maximised in-sample (e.g. "net_profit" or "calmar_ratio")
+    :return: WalkForwardResult
+    """
+    quotes, snapshots = _worker_sessions[window.session_index]
+    limit_order_book: LimitOrderBook = pickle.loads(snapshots[window.start])
+    MomentumStrategy.set_limit_order_book(limit_order_book)
+    TradeSituation.set_limit_order_book(limit_order_book)
+
+    # In-sample: one replay for all the candidates. Candidates with the same window lengths share their averages.
+    indicator_registry = IndicatorRegistry(limit_order_book.currency_pair())
+    candidates = [MomentumStrategy(ma_slow, ma_fast, target_profit, traded_amount, is_best_px_calc,
+                                   indicator_registry=indicator_registry)
+                  for ma_slow, ma_fast, target_profit in parameter_grid]
+    replay_strategies(quotes[window.start:window.split], limit_order_book, candidates)
+    in_sample_summaries = [summarize_ledger(build_ledger(candidate.all_positions()), traded_amount, price_per_mil)
+                           for candidate in candidates]
+    best_index = max(range(len(candidates)), key=lambda index: getattr(in_sample_summaries[index], objective))
+    best_parameters = parameter_grid[best_index]
+
+    # Out-of-sample: the book continues from the end of the in-sample replay
+    retained_strategy = MomentumStrategy(best_parameters[0], best_parameters[1], best_parameters[2], traded_amount,
+                                         is_best_px_calc)
+    replay_strategies(quotes[window.split:window.end], limit_order_book, [retained_strategy])
+    out_of_sample_summary = summarize_ledger(build_ledger(retained_strategy.all_positions()), traded_amount,
+                                             price_per_mil)
+    return WalkForwardResult(window, best_parameters, in_sample_summaries[best_index], out_of_sample_summary)
+
+
+def run_walk_forward(file_names: list, curr_pair: CurrPair, parameter_grid: list, in_sample_length: int,
+                     out_of_sample_length: int, traded_amount: float, is_best_px_calc: bool = True,
+                     price_per_mil: float = 10.00, objective: str = "net_profit", max_workers: int = None) -> list:
+    """
+    Runs the walk-forward optimisation on one or many sessions.
+    :param file_names: list of log files (one session per file)
+    :param curr_pair: the replayed currency pair
+    :param parameter_grid: list of (ma_slow, ma_fast, target_profit), see build_parameter_grid()
+    :param in_sample_length: in-sample length (number of events of the pair)
+    :param out_of_sample_length: out-of-sample length (number of events of the pair)
+    :param traded_amount: traded amount
+    :param is_best_px_calc: use the best BID/OFFER to calculate the PnL
+    :param price_per_mil: transaction price per million
+    :param objective: PerformanceSummary field maximised in-sample
+    :param max_workers: number of processes. 1 evaluates the windows in the current process.
+    :return: list of WalkForwardResult ordered by session then window
+    """
+    if len(parameter_grid) == 0:
+        raise Exception("Please provide at least one valid (ma_slow, ma_fast, target_profit) combination")
+    if objective not in PerformanceSummary._fields:
+        raise Exception("Unknown objective {0}. Please use one of {1}".format(objective, PerformanceSummary._fields))
+
+    sessions = []
+    windows = []
+    for session_index, file_name in enumerate(file_names):
+        quotes = load_session_quotes(file_name, curr_pair)
+        session_windows = plan_windows(session_index, len(quotes), in_sample_length, out_of_sample_length)
+        snapshots = precompute_book_snapshots(quotes, curr_pair, [window.start for window in session_windows])
+        sessions.append((quotes, snapshots))
+        windows.extend(session_windows)
+
+    arguments = (parameter_grid, traded_amount, is_best_px_calc, price_per_mil, objective)
+    if max_workers == 1:
+        _init_worker(sessions)
+        return [evaluate_window(window, *arguments) for window in windows]
+
+    # The sessions are sent once per process (initializer), not once per window
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(sessions,)) as executor:
+        futures = [executor.submit(evaluate_window, window, *arguments) for window in windows]
+        return [future.result() for future in futures]
+
+
+def _init_worker(sessions: list):
+    global _worker_sessions
+    _worker_sessions = sessions
+
+
+def _update_book(limit_order_book: LimitOrderBook, quote: Quote) -> bool:
+    """
+    Applies a quote to the book
+    :return: True for a NEW order (the strategies are stepped on NEW orders only)
+    """
+    if quote.type() == NewCancel.NEW:
+        limit_order_book.on_new_order(quote)
+        return True
+    limit_order_book.on_cancel_order(quote)
+    return False